@@ -0,0 +1,577 @@
+"""
+Benchmark every API route in-process against generated databases of
+increasing size. Each route is called through the app with a TestClient
+against a copy of a `datagen.py` database, as the most active climber.
+For each route this reports latency percentiles, the number of SQL
+statements per request and the peak Python memory one request allocates.
+
+Results can be saved as JSON. `--compare BASELINE` flags routes that got
+slower, run more SQL or allocate more than in a stored run. It exits
+with status 1 if any did.
+
+Usage: python benchmarks/bench_api.py [--scales N ...] [--requests N]
+       [--output FILE] [--compare BASELINE] [--results FILE]
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.datagen import BULK_PRAGMAS, DatasetSpec, generate
+from src.auth import create_access_token
+from src.cache import identity_cache, stats_cache, token_cache
+from src.database import (
+    configure_sqlite,
+    create_read_engine,
+    create_write_engine,
+    get_read_db,
+    get_write_db,
+)
+from src.main import app
+from src.registry import location_registry
+from src.streaming import NDJSON_MEDIA_TYPE
+
+SCALES = (1_000, 100_000, 1_000_000)
+# Fewer requests for routes that take most of a second or more: registering
+# and logging in hash a password with bcrypt on purpose, and the expanded
+# progress format returns one item per send, so it grows with the dataset
+SLOW_REQUESTS = 5
+
+
+@dataclass
+class Context:
+    client: TestClient
+    headers: dict[str, str]
+    user_id: int
+    location_id: int
+    slug: str
+    session_id: int
+    problem_id: int
+    iteration: int = 0
+
+    def create_session(self) -> dict:
+        response = self.client.post(
+            "/sessions",
+            json={
+                "location_id": self.location_id,
+                "problems": [{"grade": "V3", "attempts": 2, "sends": 1}],
+            },
+            headers=self.headers,
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+@dataclass(frozen=True)
+class Case:
+    """One benchmarked request; `build` runs untimed before each one."""
+
+    name: str
+    route: str
+    build: Callable[[Context], dict]
+    max_requests: int | None = None
+
+
+def _get(
+    url: str, auth: bool = True, accept: str | None = None
+) -> Callable[[Context], dict]:
+    def build(ctx: Context) -> dict:
+        headers = dict(ctx.headers) if auth else {}
+        if accept:
+            headers["Accept"] = accept
+        return {"method": "GET", "url": url.format(ctx=ctx), "headers": headers}
+
+    return build
+
+
+def _import_csv(ctx: Context) -> dict:
+    rows = ["date,location_id,rating,grade,attempts,sends,notes"] + [
+        f"2024-01-{day:02d},{ctx.location_id},7,{grade},3,1,"
+        for day in range(1, 11)
+        for grade in ("V0", "V3", "V4-V6")
+    ]
+    return {
+        "method": "POST",
+        "url": "/sessions/import",
+        "content": "\n".join(rows),
+        "headers": {**ctx.headers, "Content-Type": "text/csv"},
+    }
+
+
+def _delete_session(ctx: Context) -> dict:
+    session_id = ctx.create_session()["id"]
+    return {
+        "method": "DELETE",
+        "url": f"/sessions/{session_id}",
+        "headers": ctx.headers,
+    }
+
+
+def _delete_problem(ctx: Context) -> dict:
+    response = ctx.client.post(
+        f"/sessions/{ctx.session_id}/problems",
+        json={"grade": "V0", "attempts": 1},
+        headers=ctx.headers,
+    )
+    response.raise_for_status()
+    return {
+        "method": "DELETE",
+        "url": f"/sessions/problems/{response.json()['id']}",
+        "headers": ctx.headers,
+    }
+
+
+CASES = [
+    Case(
+        "POST /auth/register",
+        "POST /auth/register",
+        lambda ctx: {
+            "method": "POST",
+            "url": "/auth/register",
+            "json": {
+                "username": f"bench{ctx.iteration}",
+                "password": "password123",
+                "home_location_id": ctx.location_id,
+            },
+        },
+        max_requests=SLOW_REQUESTS,
+    ),
+    Case(
+        "POST /auth/login",
+        "POST /auth/login",
+        lambda ctx: {
+            "method": "POST",
+            "url": "/auth/login",
+            "data": {"username": f"climber{ctx.user_id}", "password": "password123"},
+        },
+        max_requests=SLOW_REQUESTS,
+    ),
+    Case("GET /auth/me", "GET /auth/me", _get("/auth/me")),
+    Case(
+        "PATCH /auth/me",
+        "PATCH /auth/me",
+        lambda ctx: {
+            "method": "PATCH",
+            "url": "/auth/me",
+            "json": {"default_grade": ("V0", "V3")[ctx.iteration % 2]},
+            "headers": ctx.headers,
+        },
+    ),
+    Case("GET /locations", "GET /locations", _get("/locations", auth=False)),
+    Case(
+        "GET /locations/{slug}",
+        "GET /locations/{slug}",
+        _get("/locations/{ctx.slug}", auth=False),
+    ),
+    Case(
+        "POST /sessions",
+        "POST /sessions",
+        lambda ctx: {
+            "method": "POST",
+            "url": "/sessions",
+            "json": {
+                "location_id": ctx.location_id,
+                "problems": [
+                    {"grade": grade, "attempts": 3, "sends": 1}
+                    for grade in ("V0", "V3", "V3", "V4-V6", "V6-V8")
+                ],
+            },
+            "headers": ctx.headers,
+        },
+    ),
+    Case("POST /sessions/import (30 rows)", "POST /sessions/import", _import_csv),
+    Case("GET /sessions", "GET /sessions", _get("/sessions")),
+    Case("GET /sessions?limit=50", "GET /sessions", _get("/sessions?limit=50")),
+    Case(
+        "GET /sessions (NDJSON)",
+        "GET /sessions",
+        _get("/sessions", accept=NDJSON_MEDIA_TYPE),
+    ),
+    Case(
+        "GET /sessions/{session_id}",
+        "GET /sessions/{session_id}",
+        _get("/sessions/{ctx.session_id}"),
+    ),
+    Case(
+        "PUT /sessions/{session_id}",
+        "PUT /sessions/{session_id}",
+        lambda ctx: {
+            "method": "PUT",
+            "url": f"/sessions/{ctx.session_id}",
+            "json": {"rating": 1 + ctx.iteration % 10},
+            "headers": ctx.headers,
+        },
+    ),
+    Case(
+        "DELETE /sessions/{session_id}",
+        "DELETE /sessions/{session_id}",
+        _delete_session,
+    ),
+    Case(
+        "POST /sessions/{session_id}/problems",
+        "POST /sessions/{session_id}/problems",
+        lambda ctx: {
+            "method": "POST",
+            "url": f"/sessions/{ctx.session_id}/problems",
+            "json": {"grade": "V3", "attempts": 2, "sends": 1},
+            "headers": ctx.headers,
+        },
+    ),
+    Case(
+        "PUT /sessions/problems/{problem_id}",
+        "PUT /sessions/problems/{problem_id}",
+        lambda ctx: {
+            "method": "PUT",
+            "url": f"/sessions/problems/{ctx.problem_id}",
+            "json": {"attempts": 5 + ctx.iteration % 5},
+            "headers": ctx.headers,
+        },
+    ),
+    Case(
+        "POST /sessions/problems/{problem_id}/increment",
+        "POST /sessions/problems/{problem_id}/increment",
+        lambda ctx: {
+            "method": "POST",
+            "url": f"/sessions/problems/{ctx.problem_id}/increment",
+            "json": {"attempts": 1},
+            "headers": ctx.headers,
+        },
+    ),
+    Case(
+        "DELETE /sessions/problems/{problem_id}",
+        "DELETE /sessions/problems/{problem_id}",
+        _delete_problem,
+    ),
+    Case(
+        "GET /stats/user/progress",
+        "GET /stats/user/progress",
+        _get("/stats/user/progress"),
+    ),
+    Case(
+        "GET /stats/user/distribution",
+        "GET /stats/user/distribution",
+        _get("/stats/user/distribution"),
+    ),
+    Case(
+        "GET /stats/location/{location_id}",
+        "GET /stats/location/{location_id}",
+        _get("/stats/location/{ctx.location_id}", auth=False),
+    ),
+    Case(
+        "GET /stats/aggregate",
+        "GET /stats/aggregate",
+        _get("/stats/aggregate", auth=False),
+    ),
+    Case(
+        "GET /stats/aggregate?period=month",
+        "GET /stats/aggregate",
+        _get("/stats/aggregate?period=month", auth=False),
+    ),
+    Case(
+        "GET /stats/aggregate/progress",
+        "GET /stats/aggregate/progress",
+        _get("/stats/aggregate/progress", auth=False),
+        max_requests=SLOW_REQUESTS,
+    ),
+    Case(
+        "GET /stats/aggregate/progress (NDJSON)",
+        "GET /stats/aggregate/progress",
+        _get("/stats/aggregate/progress", auth=False, accept=NDJSON_MEDIA_TYPE),
+        max_requests=SLOW_REQUESTS,
+    ),
+    Case(
+        "GET /stats/aggregate/progress?format=counts",
+        "GET /stats/aggregate/progress",
+        _get("/stats/aggregate/progress?format=counts", auth=False),
+    ),
+]
+
+
+def router_routes() -> set[str]:
+    return {
+        f"{method} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        and route.endpoint.__module__.startswith("src.routers")
+        for method in route.methods
+    }
+
+
+def missing_routes() -> set[str]:
+    return router_routes() - {case.route for case in CASES}
+
+
+def scale_label(problems: int) -> str:
+    for unit, size in (("M", 1_000_000), ("k", 1_000)):
+        if problems >= size and problems % size == 0:
+            return f"{problems // size}{unit}"
+    return str(problems)
+
+
+def dataset(data_dir: Path, problems: int, seed: int) -> tuple[Path, dict]:
+    # Generated once per scale, seed and day and reused; runs work on a copy
+    spec = DatasetSpec.for_problems(problems, seed=seed, end=date.today())
+    path = data_dir / f"{scale_label(problems)}-seed{seed}-{spec.end}.db"
+    counts_path = path.with_suffix(".json")
+    if not path.exists():
+        data_dir.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix(".partial")
+        partial.unlink(missing_ok=True)
+        engine = create_engine(f"sqlite:///{partial}")
+        configure_sqlite(engine, BULK_PRAGMAS)
+        counts = generate(engine, spec)
+        engine.dispose()
+        counts_path.write_text(json.dumps(counts))
+        partial.rename(path)
+    return path, json.loads(counts_path.read_text())
+
+
+def percentile(timings: list[float], q: float) -> float:
+    return timings[min(len(timings) - 1, int(len(timings) * q))]
+
+
+def _context(client: TestClient, path: Path) -> Context:
+    # The busiest climber, their latest session and one of its problems
+    with sqlite3.connect(path) as conn:
+        user_id, location_id = conn.execute(
+            "SELECT user_id, min(location_id) FROM sessions"
+            " GROUP BY user_id ORDER BY count(*) DESC LIMIT 1"
+        ).fetchone()
+        session_id, problem_id = conn.execute(
+            "SELECT s.id, p.id FROM sessions s JOIN problems p ON p.session_id = s.id"
+            " WHERE s.user_id = ? ORDER BY s.date DESC, p.id LIMIT 1",
+            (user_id,),
+        ).fetchone()
+        (slug,) = conn.execute(
+            "SELECT slug FROM locations WHERE id = ?", (location_id,)
+        ).fetchone()
+    token = create_access_token({"sub": f"climber{user_id}"})
+    return Context(
+        client=client,
+        headers={"Authorization": f"Bearer {token}"},
+        user_id=user_id,
+        location_id=location_id,
+        slug=slug,
+        session_id=session_id,
+        problem_id=problem_id,
+    )
+
+
+def measure(ctx: Context, case: Case, requests: int, statements: list[int]) -> dict:
+    def call() -> float:
+        ctx.iteration += 1
+        request = case.build(ctx)
+        # Measure the database path, not a stats cache hit
+        stats_cache.clear()
+        statements[0] = 0
+        start = time.perf_counter()
+        response = ctx.client.request(**request)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f"{case.name}: {response.status_code} {response.text[:200]}"
+            )
+        return elapsed
+
+    # Warm up statement caches, then one traced request for peak memory
+    call()
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timings, counts = [], []
+    for _ in range(min(requests, case.max_requests or requests)):
+        timings.append(call())
+        counts.append(statements[0])
+    timings.sort()
+    counts.sort()
+    return {
+        "requests": len(timings),
+        "mean_ms": sum(timings) / len(timings),
+        "p50_ms": percentile(timings, 0.5),
+        "p95_ms": percentile(timings, 0.95),
+        "p99_ms": percentile(timings, 0.99),
+        "sql_statements": counts[len(counts) // 2],
+        "peak_kib": peak / 1024,
+    }
+
+
+def run_scale(path: Path, requests: int) -> dict[str, dict]:
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = Path(tmp) / "bench.db"
+        shutil.copyfile(path, copy)
+        url = f"sqlite:///{copy}"
+        write_engine = create_write_engine(url)
+        read_engine = create_read_engine(url)
+        statements = [0]
+
+        def count(*args) -> None:
+            statements[0] += 1
+
+        for engine in (write_engine, read_engine):
+            event.listen(engine, "before_cursor_execute", count)
+        with write_engine.connect() as conn:
+            # Connect once up front so switching to WAL isn't timed
+            conn.execute(text("SELECT 1"))
+
+        def session_for(engine):
+            factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+            def get_db():
+                db = factory()
+                try:
+                    yield db
+                finally:
+                    db.close()
+
+            return get_db
+
+        overrides = dict(app.dependency_overrides)
+        app.dependency_overrides[get_read_db] = session_for(read_engine)
+        app.dependency_overrides[get_write_db] = session_for(write_engine)
+        for cache in (stats_cache, identity_cache, token_cache, location_registry):
+            cache.clear()
+        try:
+            ctx = _context(TestClient(app), copy)
+            results = {}
+            for case in CASES:
+                results[case.name] = measure(ctx, case, requests, statements)
+                print(
+                    f"  {case.name:<48}"
+                    f" p50 {results[case.name]['p50_ms']:8.2f} ms"
+                    f"  p99 {results[case.name]['p99_ms']:8.2f} ms"
+                    f"  {results[case.name]['sql_statements']:3d} sql"
+                    f"  {results[case.name]['peak_kib']:9,.0f} KiB"
+                )
+            return results
+        finally:
+            app.dependency_overrides = overrides
+            write_engine.dispose()
+            read_engine.dispose()
+
+
+def run(scales: list[int], requests: int, data_dir: Path, seed: int) -> dict:
+    results = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "requests": requests,
+            "seed": seed,
+        },
+        "scales": {},
+    }
+    for problems in scales:
+        path, counts = dataset(data_dir, problems, seed)
+        print(f"\n{scale_label(problems)} problems ({counts['problems']:,} generated)")
+        results["scales"][scale_label(problems)] = {
+            "dataset": counts,
+            "routes": run_scale(path, requests),
+        }
+    return results
+
+
+# Regressions smaller than these are noise at these request counts
+MIN_LATENCY_MS = 0.5
+MIN_MEMORY_KIB = 64
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list[str]:
+    regressions = []
+    for scale, current in results["scales"].items():
+        before = baseline["scales"].get(scale, {}).get("routes", {})
+        for name, now in current["routes"].items():
+            if name not in before:
+                continue
+            then = before[name]
+            changes = []
+            for key in ("p50_ms", "p95_ms"):
+                if (
+                    now[key] > then[key] * (1 + threshold)
+                    and now[key] - then[key] > MIN_LATENCY_MS
+                ):
+                    changes.append(f"{key} {then[key]:.2f} -> {now[key]:.2f}")
+            if now["sql_statements"] > then["sql_statements"]:
+                changes.append(
+                    f"sql {then['sql_statements']} -> {now['sql_statements']}"
+                )
+            if (
+                now["peak_kib"] > then["peak_kib"] * (1 + threshold)
+                and now["peak_kib"] - then["peak_kib"] > MIN_MEMORY_KIB
+            ):
+                changes.append(
+                    f"peak {then['peak_kib']:,.0f} -> {now['peak_kib']:,.0f} KiB"
+                )
+            if changes:
+                regressions.append(f"{scale} {name}: {', '.join(changes)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES))
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=Path(tempfile.gettempdir()) / "overhang-bench",
+        help="where generated databases are kept between runs",
+    )
+    parser.add_argument("--output", type=Path, help="save results as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline results to check")
+    parser.add_argument(
+        "--results", type=Path, help="compare these saved results instead of running"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="relative slowdown or memory growth that counts as a regression",
+    )
+    args = parser.parse_args()
+
+    missing = missing_routes()
+    if missing:
+        sys.exit(f"No benchmark case for: {', '.join(sorted(missing))}")
+
+    if args.results:
+        results = json.loads(args.results.read_text())
+    else:
+        results = run(args.scales, args.requests, args.data_dir, args.seed)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nSaved results to {args.output}")
+
+    if args.compare:
+        regressions = compare(
+            json.loads(args.compare.read_text()), results, args.threshold
+        )
+        print(f"\n{len(regressions)} regressions against {args.compare}")
+        for regression in regressions:
+            print(f"  {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
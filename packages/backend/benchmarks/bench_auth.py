@@ -0,0 +1,72 @@
+"""
+Benchmark per-request JWT verification with and without the claims cache.
+Replays a skewed token reuse pattern: a few hundred active users, some of
+them polling far more often than others.
+
+Usage: python benchmarks/bench_auth.py [--requests N] [--users N]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.auth import create_access_token, decode_access_token, verify_access_token
+from src.cache import token_cache
+
+
+def token_stream(users: int, requests: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    tokens = [create_access_token({"sub": f"climber{i}"}) for i in range(users)]
+    # Zipf-like weights: the busiest dashboards poll the most
+    weights = [1 / (rank + 1) for rank in range(users)]
+    return rng.choices(tokens, weights=weights, k=requests)
+
+
+def run(label: str, decode, stream: list[str]) -> dict:
+    timings = []
+    for token in stream:
+        start = time.perf_counter()
+        decode(token)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+
+    timings.sort()
+    result = {
+        "label": label,
+        "mean_us": statistics.fmean(timings),
+        "p50_us": timings[len(timings) // 2],
+        "p99_us": timings[int(len(timings) * 0.99)],
+        "per_sec": len(timings) / (sum(timings) / 1_000_000),
+    }
+    print(
+        f"{label:<22} mean {result['mean_us']:8.1f} µs  "
+        f"p50 {result['p50_us']:8.1f} µs  p99 {result['p99_us']:8.1f} µs  "
+        f"{result['per_sec']:>10,.0f} req/s"
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    stream = token_stream(args.users, args.requests, args.seed)
+    print(f"{args.requests:,} requests over {args.users} tokens\n")
+
+    before = run("verify every request", verify_access_token, stream)
+    token_cache.clear()
+    after = run("claims cache", decode_access_token, stream)
+
+    print(f"\nspeedup: {before['mean_us'] / after['mean_us']:.1f}x")
+    print(f"cache: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark mixed read/write concurrency on SQLite with and without the
+connection pragma profile (WAL, synchronous, cache, mmap, busy timeout).
+Reader threads run the queries behind GET /stats/aggregate and a page of
+GET /sessions while writer threads log sessions, on a fresh file database
+per profile.
+
+Usage: python benchmarks/bench_sqlite.py [--seconds N] [--readers N] [--writers N]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src import crud
+from src.database import Base, configure_sqlite, sqlite_pragmas
+from src.models import Location, Problem, User
+from src.models import Session as SessionModel
+from src.registry import location_registry
+from src.schemas import ProblemCreate, SessionCreate
+
+GRADES = ["VB", "V0", "V3", "V4-V6", "V6-V8", "V7-V10"]
+
+
+def seed(SessionLocal, sessions: int, rng: random.Random) -> None:
+    db = SessionLocal()
+    db.add(Location(name="Bench Gym", slug="bench-gym"))
+    db.add(User(username="bench", password_hash="x", home_location_id=1))
+    db.flush()
+    start = date.today() - timedelta(days=365)
+    for _ in range(sessions):
+        session = SessionModel(
+            user_id=1, location_id=1, date=start + timedelta(days=rng.randrange(365))
+        )
+        session.problems = [
+            Problem(grade=rng.choice(GRADES), attempts=3, sends=rng.randrange(4))
+            for _ in range(rng.randint(3, 8))
+        ]
+        db.add(session)
+    db.commit()
+    crud.rebuild_daily_grade_rollup(db)
+    db.close()
+
+
+def reader(SessionLocal, stop: threading.Event, results: dict) -> None:
+    while not stop.is_set():
+        db = SessionLocal()
+        start = time.perf_counter()
+        try:
+            crud.get_aggregate_stats(db)
+            crud.get_sessions_page(db, user_id=1, limit=50)
+            results["read"].append((time.perf_counter() - start) * 1000)
+        except OperationalError:
+            results["read_errors"] += 1
+        finally:
+            db.close()
+
+
+def writer(SessionLocal, stop: threading.Event, results: dict, seed: int) -> None:
+    rng = random.Random(seed)
+    while not stop.is_set():
+        db = SessionLocal()
+        data = SessionCreate(
+            location_id=1,
+            date=date.today(),
+            problems=[
+                ProblemCreate(grade=rng.choice(GRADES), attempts=2, sends=1)
+                for _ in range(5)
+            ],
+        )
+        start = time.perf_counter()
+        try:
+            crud.create_session(db, data, user_id=1)
+            results["write"].append((time.perf_counter() - start) * 1000)
+        except OperationalError:
+            db.rollback()
+            results["write_errors"] += 1
+        finally:
+            db.close()
+
+
+def summarize(label: str, timings: list[float], errors: int, seconds: float) -> None:
+    timings.sort()
+    if not timings:
+        print(f"  {label:<6} no completed operations, {errors} errors")
+        return
+    print(
+        f"  {label:<6} {len(timings) / seconds:>8,.0f} ops/s  "
+        f"p50 {timings[len(timings) // 2]:7.1f} ms  "
+        f"p99 {timings[int(len(timings) * 0.99)]:8.1f} ms  "
+        f"{errors} locked"
+    )
+
+
+def run(label: str, pragmas: dict | None, args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{tmp}/bench.db",
+            connect_args={"check_same_thread": False},
+            pool_size=args.readers + args.writers,
+        )
+        if pragmas:
+            configure_sqlite(engine, pragmas)
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        location_registry.clear()
+        seed(SessionLocal, args.sessions, random.Random(args.seed))
+
+        results: dict = {"read": [], "write": [], "read_errors": 0, "write_errors": 0}
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=reader, args=(SessionLocal, stop, results))
+            for _ in range(args.readers)
+        ] + [
+            threading.Thread(target=writer, args=(SessionLocal, stop, results, i))
+            for i in range(args.writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    print(label)
+    summarize("reads", results["read"], results["read_errors"], args.seconds)
+    summarize("writes", results["write"], results["write_errors"], args.seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(
+        f"{args.readers} readers, {args.writers} writers, "
+        f"{args.sessions:,} seeded sessions, {args.seconds:g}s per profile\n"
+    )
+    run("default (rollback journal)", None, args)
+    run("tuned profile", sqlite_pragmas(), args)
+
+
+if __name__ == "__main__":
+    main()
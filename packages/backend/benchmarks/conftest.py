@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from benchmarks.datagen import DatasetSpec, generate
+from src.database import configure_sqlite, connection_pragmas
+
+
+@pytest.fixture(scope="session")
+def synthetic_db(tmp_path_factory):
+    """Build a generated database per spec, once per test run.
+
+    Returns a function taking a DatasetSpec and returning an engine with the
+    app's connection pragmas.
+    """
+    engines: dict[DatasetSpec, Engine] = {}
+
+    def build(spec: DatasetSpec) -> Engine:
+        if spec not in engines:
+            path = tmp_path_factory.mktemp("datagen") / "synthetic.db"
+            engine = create_engine(
+                f"sqlite:///{path}", connect_args={"check_same_thread": False}
+            )
+            configure_sqlite(engine, connection_pragmas())
+            generate(engine, spec)
+            engines[spec] = engine
+        return engines[spec]
+
+    yield build
+    for engine in engines.values():
+        engine.dispose()
@@ -0,0 +1,308 @@
+"""
+Generate a deterministic synthetic dataset for load tests and benchmarks:
+users with a skill level that improves over time and their own training
+frequency, spread over a handful of gyms of different sizes, logging
+sessions of V-scale problems for a number of years up to `--end`.
+
+The same seed, sizes and end date always produce the same rows. Rows are
+written with bulk inserts in one transaction: a million problems take
+seconds, where logging them a session at a time through crud takes hours.
+The daily grade rollup is rebuilt afterwards. `benchmarks/conftest.py`
+wraps `generate` as a pytest fixture.
+
+Usage: python benchmarks/datagen.py PATH [--users N | --problems N]
+       [--locations N] [--years N] [--seed N] [--end YYYY-MM-DD]
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from src import crud
+from src.database import configure_sqlite
+from src.grades import V_SCALE, grade_registry
+from src.migrations import migrate
+from src.models import Location, User
+from src.models import Session as SessionModel
+
+# Everyone's password is password123. A fixed hash, since hashing per user
+# would dominate and a fresh salt would make runs differ
+PASSWORD_HASH = "$2b$12$v9WPxWo8uyQ/Zlc20zk1pO.Tk0oCbM4PA75wJghYmjSPXyirgMfYi"
+GRADE_CODES = [grade_registry.code(grade) for grade in V_SCALE.grades]
+# Session ratings lean towards 6-8 out of 10
+RATING_WEIGHTS = [1, 1, 2, 3, 5, 8, 8, 5, 3, 2]
+# For the CLI's one-off load: nothing to recover if it's interrupted, and a
+# page cache big enough to keep the indexes in memory while they grow
+BULK_PRAGMAS: dict[str, str | int] = {
+    "journal_mode": "MEMORY",
+    "synchronous": "OFF",
+    "cache_size": -256_000,
+}
+GRADE_OFFSETS = [-3, -2, -1, 0, 1, 2]
+GRADE_OFFSET_WEIGHTS = [1, 6, 24, 38, 23, 8]
+BATCH_PROBLEMS = 50_000
+# Roughly what one user logs in a year with the distributions below
+PROBLEMS_PER_USER_YEAR = 370
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    users: int = 100
+    locations: int = 5
+    years: float = 2.0
+    seed: int = 1
+    end: date = field(default_factory=date.today)
+
+    @classmethod
+    def for_problems(cls, problems: int, **kwargs) -> "DatasetSpec":
+        # Approximate: the problem count varies with the seed by a few percent
+        spec = cls(**kwargs)
+        per_user = PROBLEMS_PER_USER_YEAR * spec.years
+        return replace(spec, users=max(1, round(problems / per_user)))
+
+
+@dataclass
+class _Climber:
+    id: int
+    home_location_id: int
+    joined: date
+    skill: float
+    progress_per_year: float
+    sessions_per_week: float
+
+
+def _start(spec: DatasetSpec) -> date:
+    return spec.end - timedelta(days=round(spec.years * 365))
+
+
+def _timestamp(day: date, minutes: int = 0) -> str:
+    return str(datetime.combine(day, datetime.min.time()) + timedelta(minutes=minutes))
+
+
+def _climbers(
+    rng: random.Random, spec: DatasetSpec, first_id: int, location_ids: list[int]
+) -> list[_Climber]:
+    start = _start(spec)
+    window = (spec.end - start).days
+    # A few big gyms and a tail of small ones
+    gym_weights = [1 / (rank + 1) for rank in range(len(location_ids))]
+    climbers = []
+    for offset in range(spec.users):
+        # A third of the users were already climbing when the window opens
+        joined = start
+        if rng.random() > 1 / 3:
+            joined += timedelta(days=rng.randrange(window))
+        climbers.append(
+            _Climber(
+                id=first_id + offset,
+                home_location_id=rng.choices(location_ids, gym_weights)[0],
+                joined=joined,
+                skill=rng.triangular(0, len(GRADE_CODES) - 1, 1.5),
+                progress_per_year=rng.uniform(0, 0.6),
+                sessions_per_week=min(rng.lognormvariate(0.3, 0.5), 5),
+            )
+        )
+    return climbers
+
+
+def _problems(
+    rng: random.Random, session_id: int, skill: float, created_at: str
+) -> list[tuple]:
+    # Mostly around the climber's level, a little below more often than above
+    top = len(GRADE_CODES) - 1
+    offsets = rng.choices(GRADE_OFFSETS, GRADE_OFFSET_WEIGHTS, k=rng.randint(3, 12))
+    problems = []
+    for offset in offsets:
+        index = min(max(round(skill) + offset, 0), top)
+        difficulty = index - skill
+        # Harder problems take more goes and are sent less often
+        mean_extra = 1 + max(difficulty + 1, 0)
+        attempts = 1 + min(int(-mean_extra * math.log(1 - rng.random())), 19)
+        send_chance = 1 / (1 + math.exp(1.5 * difficulty))
+        # The expected number of sends, rounded up or down at random
+        sends = int(attempts * send_chance + rng.random())
+        problems.append((session_id, GRADE_CODES[index], attempts, sends, created_at))
+    return problems
+
+
+def _rows(
+    rng: random.Random,
+    spec: DatasetSpec,
+    climbers: list[_Climber],
+    location_ids: list[int],
+    first_session_id: int,
+) -> Iterator[tuple[tuple, list[tuple]]]:
+    session_id = first_session_id
+    for climber in climbers:
+        day = climber.joined
+        while True:
+            gap = rng.expovariate(climber.sessions_per_week / 7)
+            day += timedelta(days=max(1, round(gap)))
+            if day > spec.end:
+                break
+            location_id = climber.home_location_id
+            if rng.random() > 0.75:
+                location_id = rng.choice(location_ids)
+            rating = None
+            if rng.random() < 0.7:
+                rating = rng.choices(range(1, 11), RATING_WEIGHTS)[0]
+            skill = climber.skill + climber.progress_per_year * (
+                (day - climber.joined).days / 365
+            )
+            created_at = _timestamp(day, 16 * 60 + rng.randrange(300))
+            session = (
+                session_id,
+                climber.id,
+                location_id,
+                day.isoformat(),
+                rating,
+                created_at,
+            )
+            yield session, _problems(rng, session_id, skill, created_at)
+            session_id += 1
+
+
+def _next_id(conn: Connection, model) -> int:
+    return (conn.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def _insert(conn: Connection, table: str, columns: str, rows: list[tuple]) -> None:
+    placeholders = ", ".join("?" * len(columns.split(",")))
+    conn.exec_driver_sql(
+        f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows
+    )
+
+
+def generate(engine: Engine, spec: DatasetSpec) -> dict[str, int]:
+    """Write the dataset described by `spec` into a database with no users.
+
+    Returns the number of rows written per table.
+    """
+    rng = random.Random(spec.seed)
+    # Stamps a new database with the schema version, so the app doesn't
+    # take it for a legacy one and migrate it again
+    migrate(engine)
+    counts = {"locations": spec.locations, "users": spec.users}
+    with engine.begin() as conn:
+        if conn.scalar(select(func.count()).select_from(User)):
+            raise ValueError("generate() expects a database without users")
+
+        opened = _timestamp(_start(spec))
+        first_location = _next_id(conn, Location)
+        location_ids = list(range(first_location, first_location + spec.locations))
+        _insert(
+            conn,
+            "locations",
+            "id, name, slug, grade_scales, created_at",
+            [
+                (i, f"Synthetic Gym {i}", f"synthetic-gym-{i}", V_SCALE.key, opened)
+                for i in location_ids
+            ],
+        )
+
+        climbers = _climbers(rng, spec, _next_id(conn, User), location_ids)
+        _insert(
+            conn,
+            "users",
+            "id, username, password_hash, home_location_id, default_grade,"
+            " created_at",
+            [
+                (
+                    c.id,
+                    f"climber{c.id}",
+                    PASSWORD_HASH,
+                    c.home_location_id,
+                    "V0",
+                    _timestamp(c.joined),
+                )
+                for c in climbers
+            ],
+        )
+
+        sessions: list[tuple] = []
+        problems: list[tuple] = []
+        counts.update(sessions=0, problems=0)
+
+        def write() -> None:
+            _insert(
+                conn,
+                "sessions",
+                "id, user_id, location_id, date, rating, created_at",
+                sessions,
+            )
+            _insert(
+                conn,
+                "problems",
+                "session_id, grade, attempts, sends, created_at",
+                problems,
+            )
+            counts["sessions"] += len(sessions)
+            counts["problems"] += len(problems)
+            sessions.clear()
+            problems.clear()
+
+        first_session = _next_id(conn, SessionModel)
+        for session, session_problems in _rows(
+            rng, spec, climbers, location_ids, first_session
+        ):
+            sessions.append(session)
+            problems.extend(session_problems)
+            if len(problems) >= BATCH_PROBLEMS:
+                write()
+        write()
+
+    with Session(engine) as db:
+        crud.rebuild_daily_grade_rollup(db)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", type=Path, help="SQLite file to create")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--users", type=int, default=DatasetSpec.users)
+    size.add_argument("--problems", type=int, help="approximate problem count")
+    parser.add_argument("--locations", type=int, default=DatasetSpec.locations)
+    parser.add_argument("--years", type=float, default=DatasetSpec.years)
+    parser.add_argument("--seed", type=int, default=DatasetSpec.seed)
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today())
+    args = parser.parse_args()
+
+    options = {
+        "locations": args.locations,
+        "years": args.years,
+        "seed": args.seed,
+        "end": args.end,
+    }
+    if args.problems:
+        spec = DatasetSpec.for_problems(args.problems, **options)
+    else:
+        spec = DatasetSpec(users=args.users, **options)
+
+    engine = create_engine(f"sqlite:///{args.path}")
+    configure_sqlite(engine, BULK_PRAGMAS)
+    start = time.perf_counter()
+    counts = generate(engine, spec)
+    engine.dispose()
+    print(
+        ", ".join(f"{count:,} {table}" for table, count in counts.items())
+        + f" in {time.perf_counter() - start:.1f}s -> {args.path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+from datetime import date
+
+from benchmarks.datagen import DatasetSpec
+
+SPEC = DatasetSpec.for_problems(50_000, locations=4, end=date(2025, 6, 30))
+
+ROLLUP = """
+    SELECT location_id, date, grade, attempts, sends
+    FROM daily_grade_rollup
+    ORDER BY location_id, date, grade
+"""
+FROM_PROBLEMS = """
+    SELECT s.location_id, s.date, p.grade, sum(p.attempts), sum(p.sends)
+    FROM problems p JOIN sessions s ON s.id = p.session_id
+    GROUP BY s.location_id, s.date, p.grade
+    ORDER BY s.location_id, s.date, p.grade
+"""
+
+
+def test_rollup_matches_problems_at_scale(synthetic_db):
+    engine = synthetic_db(SPEC)
+    with engine.connect() as conn:
+        problems = conn.exec_driver_sql("SELECT count(*) FROM problems").scalar_one()
+        rollup = conn.exec_driver_sql(ROLLUP).all()
+        expected = conn.exec_driver_sql(FROM_PROBLEMS).all()
+    assert 40_000 < problems < 60_000
+    assert rollup == expected
+
+
+def test_datasets_are_built_once_per_spec(synthetic_db):
+    assert synthetic_db(SPEC) is synthetic_db(SPEC)
@@ -0,0 +1,33 @@
+"""
+Rebuild the daily_grade_rollup table from the raw sessions and problems.
+Run after restoring a backup or if the aggregate stats ever look wrong.
+Safe for production.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.crud import rebuild_daily_grade_rollup
+from src.database import SessionLocal, init_db
+
+
+def rebuild_rollup():
+    """Recompute every (location, date, grade) rollup row."""
+    init_db()
+    db = SessionLocal()
+
+    try:
+        rows = rebuild_daily_grade_rollup(db)
+        print(f"✅ Rebuilt daily grade rollup ({rows} rows)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error rebuilding rollup: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild_rollup()
@@ -13,7 +13,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.database import SessionLocal, init_db
 from src.models import Location, User
-from src.schemas import SessionCreate, GradeEntry
+from src.schemas import ProblemCreate, SessionCreate
 
 
 def seed_test_sessions():
@@ -87,7 +87,7 @@ def seed_test_sessions():
                     available_grades, min(num_grades, len(available_grades))
                 )
 
-                grade_entries = []
+                problems = []
                 for grade in grades_to_use:
                     # More attempts on easier grades, fewer on harder grades
                     grade_index = available_grades.index(grade)
@@ -100,12 +100,12 @@ def seed_test_sessions():
                     success_rate = 0.8 - (
                         grade_index * 0.2
                     )  # 80% for easiest, lower for harder
-                    completed = sum(
+                    sends = sum(
                         1 for _ in range(attempts) if random.random() < success_rate
                     )
 
-                    grade_entries.append(
-                        GradeEntry(grade=grade, attempts=attempts, completed=completed)
+                    problems.append(
+                        ProblemCreate(grade=grade, attempts=attempts, sends=sends)
                     )
 
                 # Add session rating (1-10, weighted toward 6-8)
@@ -114,7 +114,7 @@ def seed_test_sessions():
                     weights=[1, 1, 2, 3, 5, 8, 8, 5, 3, 2],  # Bell curve around 6-7
                 )[0]
 
-                # Create session notes (sometimes)
+                # Add notes to the last problem (sometimes)
                 notes_options = [
                     "Great session! Felt strong today.",
                     "Struggled on overhangs but nailed the slabs.",
@@ -125,7 +125,7 @@ def seed_test_sessions():
                     None,
                     None,  # 60% chance of no notes
                 ]
-                notes = random.choice(notes_options)
+                problems[-1].notes = random.choice(notes_options)
 
                 # Create the session
                 from src.crud import create_session
@@ -133,9 +133,8 @@ def seed_test_sessions():
                 session_data = SessionCreate(
                     location_id=location_id,
                     date=session_date,
-                    grades=grade_entries,
+                    problems=problems,
                     rating=rating,
-                    notes=notes,
                 )
 
                 create_session(db, session_data, user.id)
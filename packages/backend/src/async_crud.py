@@ -0,0 +1,236 @@
+"""Async counterparts of `crud` for DATABASE_MODE=async.
+
+Each function runs the sync implementation on the AsyncSession's connection
+with `run_sync`, so the SQL lives in one place. Results are converted to
+schemas inside that call, so nothing lazy-loads back on the event loop.
+"""
+
+from collections.abc import AsyncIterator, Callable
+from datetime import date
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+from .schemas import Location as LocationSchema
+from .schemas import Problem as ProblemSchema
+from .schemas import (
+    ProblemCreate,
+    ProblemIncrement,
+    ProblemUpdate,
+    SessionCreate,
+    SessionUpdate,
+)
+from .schemas import Session as SessionSchema
+from .schemas import User as UserSchema
+
+
+def _validated(schema: type[BaseModel], fn: Callable) -> Callable:
+    def call(db, *args, **kwargs):
+        result = fn(db, *args, **kwargs)
+        return None if result is None else schema.model_validate(result)
+
+    return call
+
+
+async def get_user_by_username(db: AsyncSession, username: str) -> UserSchema | None:
+    return await db.run_sync(
+        _validated(UserSchema, crud.get_user_by_username), username
+    )
+
+
+async def get_location_by_id(
+    db: AsyncSession, location_id: int
+) -> LocationSchema | None:
+    return await db.run_sync(crud.get_location_by_id, location_id)
+
+
+async def create_session(
+    db: AsyncSession, session_data: SessionCreate, user_id: int
+) -> SessionSchema:
+    return await db.run_sync(
+        _validated(SessionSchema, crud.create_session), session_data, user_id
+    )
+
+
+def _session_list(db, *args, **kwargs) -> list[SessionSchema]:
+    return [
+        SessionSchema.model_validate(s) for s in crud.get_sessions(db, *args, **kwargs)
+    ]
+
+
+def _session_page(db, *args, **kwargs) -> tuple[list[SessionSchema], str | None]:
+    sessions, next_cursor = crud.get_sessions_page(db, *args, **kwargs)
+    return [SessionSchema.model_validate(s) for s in sessions], next_cursor
+
+
+async def get_sessions(
+    db: AsyncSession,
+    user_id: int,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[SessionSchema]:
+    return await db.run_sync(
+        _session_list,
+        user_id=user_id,
+        location_id=location_id,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+
+async def get_sessions_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int,
+    cursor: str | None = None,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> tuple[list[SessionSchema], str | None]:
+    return await db.run_sync(
+        _session_page,
+        user_id=user_id,
+        limit=limit,
+        cursor=cursor,
+        location_id=location_id,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+
+async def iter_sessions(
+    db: AsyncSession,
+    user_id: int,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    batch_size: int = 500,
+) -> AsyncIterator[SessionSchema]:
+    # A server-side cursor can't be held across run_sync calls, so stream by
+    # walking keyset pages instead; each batch is one index range scan
+    cursor = None
+    while True:
+        sessions, cursor = await get_sessions_page(
+            db,
+            user_id=user_id,
+            limit=batch_size,
+            cursor=cursor,
+            location_id=location_id,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        for session in sessions:
+            yield session
+        if cursor is None:
+            return
+
+
+async def get_session_by_id(
+    db: AsyncSession, session_id: int, user_id: int
+) -> SessionSchema | None:
+    return await db.run_sync(
+        _validated(SessionSchema, crud.get_session_by_id), session_id, user_id
+    )
+
+
+async def update_session(
+    db: AsyncSession, session_id: int, user_id: int, session_data: SessionUpdate
+) -> SessionSchema | None:
+    return await db.run_sync(
+        _validated(SessionSchema, crud.update_session),
+        session_id,
+        user_id,
+        session_data,
+    )
+
+
+async def delete_session(db: AsyncSession, session_id: int, user_id: int) -> bool:
+    return await db.run_sync(crud.delete_session, session_id, user_id)
+
+
+async def create_problem(
+    db: AsyncSession, session_id: int, user_id: int, problem_data: ProblemCreate
+) -> ProblemSchema | None:
+    return await db.run_sync(
+        _validated(ProblemSchema, crud.create_problem),
+        session_id,
+        user_id,
+        problem_data,
+    )
+
+
+async def update_problem(
+    db: AsyncSession, problem_id: int, user_id: int, problem_data: ProblemUpdate
+) -> ProblemSchema | None:
+    return await db.run_sync(
+        _validated(ProblemSchema, crud.update_problem),
+        problem_id,
+        user_id,
+        problem_data,
+    )
+
+
+async def increment_problem(
+    db: AsyncSession, problem_id: int, user_id: int, deltas: ProblemIncrement
+) -> ProblemSchema | None:
+    return await db.run_sync(crud.increment_problem, problem_id, user_id, deltas)
+
+
+async def delete_problem(db: AsyncSession, problem_id: int, user_id: int) -> bool:
+    return await db.run_sync(crud.delete_problem, problem_id, user_id)
+
+
+async def get_user_progress_counts(
+    db: AsyncSession,
+    user_id: int,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[tuple[str, str, int]]:
+    return await db.run_sync(
+        crud.get_user_progress_counts,
+        user_id=user_id,
+        location_id=location_id,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+
+async def get_user_distribution(
+    db: AsyncSession,
+    user_id: int,
+    location_id: int | None = None,
+    period: str = "all",
+) -> dict:
+    return await db.run_sync(
+        crud.get_user_distribution,
+        user_id=user_id,
+        location_id=location_id,
+        period=period,
+    )
+
+
+async def get_location_stats(db: AsyncSession, location_id: int) -> dict:
+    return await db.run_sync(crud.get_location_stats, location_id)
+
+
+async def get_aggregate_stats(
+    db: AsyncSession, period: str = "all", location_id: int | None = None
+) -> dict:
+    return await db.run_sync(crud.get_aggregate_stats, period, location_id)
+
+
+async def get_aggregate_progress_counts(
+    db: AsyncSession,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[tuple[str, str, int]]:
+    return await db.run_sync(
+        crud.get_aggregate_progress_counts,
+        location_id=location_id,
+        start_date=start_date,
+        end_date=end_date,
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from .config import settings
+from .database import configure_sqlite, connection_pragmas
+from .timing import instrument_engine
+
+
+def async_database_url(url: str) -> str:
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url.removeprefix("sqlite:")
+    return url
+
+
+async_engine = create_async_engine(
+    async_database_url(settings.database_url), pool_pre_ping=True
+)
+if async_engine.dialect.name == "sqlite":
+    configure_sqlite(async_engine.sync_engine, connection_pragmas())
+instrument_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,25 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import async_crud, timing
+from .async_database import get_async_db
+from .dependencies import _identity, _remember, credentials_exception, oauth2_scheme
+from .schemas import User as UserSchema
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> UserSchema:
+    with timing.phase("auth"):
+        identity = _identity(token)
+        if identity.cached is not None:
+            return identity.cached
+
+        username = identity.token_data.username
+        assert username is not None
+        snapshot = await async_crud.get_user_by_username(db, username)
+        if snapshot is None:
+            raise credentials_exception
+
+        _remember(identity, snapshot)
+        return snapshot
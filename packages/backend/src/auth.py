@@ -1,9 +1,12 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 
 import bcrypt
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
+from .cache import token_cache
 from .config import settings
 from .models import User
 from .schemas import TokenData
@@ -11,7 +14,7 @@ from .schemas import TokenData
 
 def get_password_hash(password: str) -> str:
     password_bytes = password.encode("utf-8")
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode("utf-8")
 
@@ -37,7 +40,11 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> TokenData | None:
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def verify_access_token(token: str) -> TokenData | None:
     try:
         payload = jwt.decode(
             token, settings.get_secret_key(), algorithms=[settings.algorithm]
@@ -45,11 +52,27 @@ def decode_access_token(token: str) -> TokenData | None:
         username: str | None = payload.get("sub")
         if username is None:
             return None
-        return TokenData(username=username)
+        return TokenData(username=username, exp=payload.get("exp"))
     except JWTError:
         return None
 
 
+def decode_access_token(token: str) -> TokenData | None:
+    # Clients resend the same few tokens constantly, so remember the verified
+    # claims until the token expires instead of re-checking the signature
+    key = token_digest(token)
+    token_data = token_cache.get(key)
+    if token_data is not None:
+        return token_data
+
+    token_data = verify_access_token(token)
+    if token_data is not None and token_data.exp is not None:
+        ttl = min(settings.token_cache_ttl_seconds, token_data.exp - time.time())
+        if ttl > 0:
+            token_cache.set(key, token_data, ttl=ttl)
+    return token_data
+
+
 def authenticate_user(db: Session, username: str, password: str) -> User | None:
     user = db.query(User).filter(User.username == username).first()
     if not user:
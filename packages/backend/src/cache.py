@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+from . import metrics
+from .config import settings
+from .schemas import TokenData
+from .schemas import User as UserSchema
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _Missing:
+    pass
+
+
+_MISSING = _Missing()
+
+
+class TTLCache(Generic[K, V]):
+    """Thread-safe LRU cache whose entries also expire after a TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a value computed from rows read
+        # before a write isn't stored after the write has invalidated it
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: K) -> V | None:
+        value = self._get(key)
+        return None if isinstance(value, _Missing) else value
+
+    def _get(self, key: K) -> V | _Missing:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key: K, value: V, ttl: float | None = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def set_unless_invalidated(
+        self, key: K, value: V, generation: int, ttl: float | None = None
+    ) -> None:
+        # For values computed outside get_or_set: read `generation` before
+        # loading the value, and it's dropped if anything was invalidated since
+        with self._lock:
+            if self._generation == generation:
+                self._store(key, value, ttl)
+
+    def get_or_set(self, key: K, compute: Callable[[], V]) -> V:
+        generation = self._generation
+        value = self._get(key)
+        if isinstance(value, _Missing):
+            value = compute()
+            self.set_unless_invalidated(key, value, generation)
+        return value
+
+    async def aget_or_set(self, key: K, compute: Callable[[], Awaitable[V]]) -> V:
+        generation = self._generation
+        value = self._get(key)
+        if isinstance(value, _Missing):
+            value = await compute()
+            self.set_unless_invalidated(key, value, generation)
+        return value
+
+    def invalidate(self, predicate: Callable[[K], bool]) -> int:
+        with self._lock:
+            self._generation += 1
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Public stats results, keyed by (endpoint, location_id, *params). A
+# location_id of None means the entry covers every location.
+stats_cache: TTLCache[tuple[Any, ...], Any] = TTLCache(
+    maxsize=settings.stats_cache_max_entries, ttl=settings.stats_cache_ttl_seconds
+)
+metrics.register("stats_cache", stats_cache.stats)
+
+
+def invalidate_stats(*location_ids: int) -> None:
+    affected = set(location_ids)
+    stats_cache.invalidate(lambda key: key[1] is None or key[1] in affected)
+
+
+# Verified JWT claims, keyed by token digest
+token_cache: TTLCache[bytes, TokenData] = TTLCache(
+    maxsize=settings.token_cache_max_entries, ttl=settings.token_cache_ttl_seconds
+)
+metrics.register("token_cache", token_cache.stats)
+
+
+# Authenticated user snapshots, keyed by (username, token digest)
+IdentityKey = tuple[str, bytes]
+identity_cache: TTLCache[IdentityKey, UserSchema] = TTLCache(
+    maxsize=settings.identity_cache_max_entries,
+    ttl=settings.identity_cache_ttl_seconds,
+)
+metrics.register("identity_cache", identity_cache.stats)
+
+
+def invalidate_identity(username: str) -> None:
+    identity_cache.invalidate(lambda key: key[0] == username)
@@ -1,4 +1,5 @@
 import secrets
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -12,6 +13,36 @@ class Settings(BaseSettings):
     )
 
     database_url: str = "sqlite:///./overhang.db"
+    # "async" serves sessions and stats from an aiosqlite engine instead of
+    # the threadpool; auth and locations stay on the sync engine either way
+    database_mode: Literal["sync", "async"] = "sync"
+    database_read_pool_size: int = 8
+    database_write_timeout_seconds: float = 10.0
+    database_retry_after_seconds: int = 1
+    import_chunk_size: int = 500
+    # Group commit for session/problem writes (see write_pipeline.py)
+    write_pipeline_enabled: bool = False
+    write_pipeline_max_batch: int = 64
+    write_pipeline_max_delay_ms: float = 2.0
+    # Write-behind for problem increments (see counter_buffer.py); the flush
+    # interval is the most committed counts can lag behind the API
+    counter_buffer_enabled: bool = False
+    counter_buffer_flush_interval_ms: float = 1000.0
+    counter_buffer_max_pending: int = 500
+    # Per-request db/auth/serialize timings (see timing.py); requests running
+    # more statements than the warning limit are logged at WARNING. The
+    # header is off by default: its auth time shows whether a login hashed a
+    # password, which gives away which usernames exist
+    server_timing_header: bool = False
+    request_statement_warning: int = 20
+    # Applied to every new SQLite connection; see database.sqlite_pragmas
+    sqlite_pragmas_enabled: bool = True
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size_bytes: int = 268435456
+    sqlite_temp_store: str = "MEMORY"
+    sqlite_busy_timeout_ms: int = 5000
     secret_key: str = ""
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 10080
@@ -19,6 +50,20 @@ class Settings(BaseSettings):
     allowed_origins: str = (
         "http://localhost:8000,http://127.0.0.1:8000,http://localhost:3000"
     )
+    stats_cache_ttl_seconds: float = 30.0
+    stats_cache_max_entries: int = 512
+    location_registry_refresh_seconds: float = 30.0
+    identity_cache_ttl_seconds: float = 300.0
+    identity_cache_max_entries: int = 4096
+    token_cache_ttl_seconds: float = 3600.0
+    token_cache_max_entries: int = 4096
+    bcrypt_rounds: int = 12
+    bcrypt_target_ms: float | None = None
+    # Calibration never goes below this cost, however slow the host
+    bcrypt_min_rounds: int = 10
+    password_hash_workers: int = 2
+    password_hash_queue: int = 16
+    password_hash_retry_after_seconds: int = 1
     _cached_secret_key: str | None = None
 
     def get_allowed_origins_list(self) -> list[str]:
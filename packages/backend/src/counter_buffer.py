@@ -0,0 +1,285 @@
+import logging
+import threading
+import time
+from collections.abc import Callable, Collection
+from typing import Any, TypeVar
+
+from sqlalchemy.orm import sessionmaker
+
+from . import crud, metrics
+from .cache import invalidate_stats
+from .config import settings
+from .database import SessionLocal
+from .schemas import Problem as ProblemSchema
+from .schemas import ProblemIncrement
+from .schemas import Session as SessionSchema
+from .versions import GLOBAL, data_versions, location_scope, user_scope
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+FLUSH_SIZE_BUCKETS = (1, 4, 16, 64, 256, 1024, 4096)
+
+
+class CounterBuffer:
+    """Write-behind buffer for problem attempt/send increments.
+
+    Increments are summed per problem in memory and written in one
+    transaction every `flush_interval_ms` (the most a committed count can
+    lag), as soon as `max_pending` problems have deltas, and on shutdown.
+    Reads of problems overlay the pending deltas, so clients see their taps
+    straight away.
+
+    Overlaying is only correct if the database read and the pending deltas
+    are from the same side of a flush, so reads go through `_read`: a
+    seqlock that re-runs the read if a flush started or finished meanwhile.
+
+    Edits and deletes of problems go through `update_*` and `delete`, which
+    hold off flushes while they run. An edit writes the problem's pending
+    deltas first, since it may set the counts outright, and a delete drops
+    them, since the problem's id can be reused.
+    """
+
+    def __init__(
+        self, session_factory: sessionmaker, flush_interval_ms: float, max_pending: int
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self._pending: dict[int, tuple[int, int]] = {}
+        self._changed = threading.Condition()
+        self._flushing = False
+        self._generation = 0
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.flush_size = metrics.Histogram(FLUSH_SIZE_BUCKETS)
+        self.flush_ms = metrics.Histogram()
+        self.increments = 0
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="counter-buffer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        # Whatever is still pending is flushed before this returns
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _read(self, load: Callable[[], T], then: Callable[[T], T]) -> T:
+        # `then` runs under the lock with the pending deltas matching `load`
+        while True:
+            with self._changed:
+                while self._flushing:
+                    self._changed.wait()
+                generation = self._generation
+            result = load()
+            with self._changed:
+                if not self._flushing and self._generation == generation:
+                    return then(result)
+
+    def _overlay_problem(self, problem: ProblemSchema) -> ProblemSchema:
+        delta = self._pending.get(problem.id)
+        if delta is None:
+            return problem
+        return problem.model_copy(
+            update={
+                "attempts": problem.attempts + delta[0],
+                "sends": problem.sends + delta[1],
+            }
+        )
+
+    def _overlay_session(self, session: object) -> SessionSchema:
+        validated = SessionSchema.model_validate(session)
+        problems = [self._overlay_problem(p) for p in validated.problems]
+        return validated.model_copy(update={"problems": problems})
+
+    def read_session(self, load: Callable[[], T]) -> T:
+        # `load` returns a session, a list of them, a (list, cursor) page or
+        # None; the NDJSON export streams straight from the database instead
+        if not self.running:
+            return load()
+
+        def overlay(result: Any) -> Any:
+            if not self._pending or result is None:
+                return result
+            if isinstance(result, tuple):
+                return overlay(result[0]), result[1]
+            if isinstance(result, list):
+                return [self._overlay_session(session) for session in result]
+            return self._overlay_session(result)
+
+        result: T = self._read(load, overlay)
+        return result
+
+    def update_problem(
+        self, problem_id: int, write: Callable[[], ProblemSchema | None]
+    ) -> ProblemSchema | None:
+        if not self.running:
+            return write()
+        with self._flush_lock:
+            self._flush([problem_id])
+            problem = write()
+            with self._changed:
+                # Increments that loaded the old counts load them again
+                self._generation += 1
+                return None if problem is None else self._overlay_problem(problem)
+
+    def update_session(
+        self, write: Callable[[], SessionSchema | None]
+    ) -> SessionSchema | None:
+        # Session edits don't touch counts, so the deltas only need adding
+        if not self.running:
+            return write()
+        with self._flush_lock:
+            session = write()
+            with self._changed:
+                return None if session is None else self._overlay_session(session)
+
+    def delete(self, problem_ids: Collection[int], write: Callable[[], bool]) -> bool:
+        if not self.running:
+            return write()
+        with self._flush_lock:
+            deleted = write()
+            if deleted:
+                with self._changed:
+                    for problem_id in problem_ids:
+                        self._pending.pop(problem_id, None)
+                    self._generation += 1
+            return deleted
+
+    def increment(
+        self,
+        load: Callable[[], ProblemSchema | None],
+        user_id: int,
+        deltas: ProblemIncrement,
+    ) -> ProblemSchema | None:
+        # `load` is the ownership-checked read of the problem
+        def add(problem: ProblemSchema | None) -> ProblemSchema | None:
+            if problem is None:
+                return None
+            current = self._overlay_problem(problem)
+            attempts = current.attempts + deltas.attempts
+            sends = current.sends + deltas.sends
+            if attempts < 0 or sends < 0:
+                raise ValueError("Counts can't go below zero")
+            pending = self._pending.get(problem.id, (0, 0))
+            self._pending[problem.id] = (
+                pending[0] + deltas.attempts,
+                pending[1] + deltas.sends,
+            )
+            self.increments += 1
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+            return current.model_copy(update={"attempts": attempts, "sends": sends})
+
+        problem = self._read(load, add)
+        if problem is not None:
+            # Reads already include the delta, so their ETags move now
+            data_versions.bump(user_scope(user_id))
+        return problem
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            try:
+                return self._flush()
+            except Exception:
+                self.failures += 1
+                logger.exception(
+                    "Flushing %d problem counters failed", len(self._pending)
+                )
+                return 0
+
+    def _take(self, problem_ids: Collection[int] | None) -> dict[int, tuple[int, int]]:
+        if problem_ids is None:
+            batch, self._pending = self._pending, {}
+            return batch
+        return {
+            problem_id: self._pending.pop(problem_id)
+            for problem_id in problem_ids
+            if problem_id in self._pending
+        }
+
+    def _flush(self, problem_ids: Collection[int] | None = None) -> int:
+        # Writes the pending deltas, or only those of `problem_ids`, and
+        # raises if that fails. Called with the flush lock held.
+        with self._changed:
+            if not self._pending:
+                return 0
+
+        start = time.perf_counter()
+        db = self.session_factory()
+        try:
+            # Wait for the writer connection before holding reads back, so
+            # they never queue behind the pool timeout
+            db.connection()
+            with self._changed:
+                batch = self._take(problem_ids)
+                if not batch:
+                    return 0
+                self._flushing = True
+            try:
+                location_ids = crud.apply_problem_deltas(db, batch)
+            except Exception:
+                db.rollback()
+                # Keep the deltas for the next attempt
+                with self._changed:
+                    for problem_id, (attempts, sends) in batch.items():
+                        pending = self._pending.get(problem_id, (0, 0))
+                        self._pending[problem_id] = (
+                            pending[0] + attempts,
+                            pending[1] + sends,
+                        )
+                raise
+            finally:
+                with self._changed:
+                    self._flushing = False
+                    self._generation += 1
+                    self._changed.notify_all()
+        finally:
+            db.close()
+
+        self.flush_ms.observe((time.perf_counter() - start) * 1000)
+        self.flush_size.observe(len(batch))
+        invalidate_stats(*location_ids)
+        data_versions.bump(GLOBAL, *(location_scope(i) for i in location_ids))
+        return len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "increments": self.increments,
+            "failures": self.failures,
+            "flush_size": self.flush_size.stats(),
+            "flush_ms": self.flush_ms.stats(),
+        }
+
+
+counter_buffer = CounterBuffer(
+    SessionLocal,
+    flush_interval_ms=settings.counter_buffer_flush_interval_ms,
+    max_pending=settings.counter_buffer_max_pending,
+)
+metrics.register("counter_buffer", counter_buffer.stats)
@@ -1,23 +1,45 @@
+import base64
+import binascii
+from collections.abc import Callable, Iterable, Iterator
 from datetime import date, timedelta
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
+from sqlalchemy.sql import Executable
 
 from .auth import get_password_hash
-from .models import Location, Problem, User
+from .cache import invalidate_identity, invalidate_stats, stats_cache
+from .grades import grade_registry
+from .models import DailyGradeRollup, Location, Problem, User
 from .models import Session as SessionModel
+from .registry import location_registry
+from .schemas import Location as LocationSchema
 from .schemas import (
+    LocationCreate,
     ProblemCreate,
+    ProblemIncrement,
     ProblemUpdate,
     SessionCreate,
     SessionUpdate,
     UserUpdate,
 )
+from .schemas import Problem as ProblemSchema
+from .schemas import Session as SessionSchema
+from .versions import GLOBAL, data_versions, location_scope, user_scope
 
 
 def create_user(
     db: Session, username: str, password: str, home_location_id: int
 ) -> User:
-    password_hash = get_password_hash(password)
+    return create_user_with_hash(
+        db, username, get_password_hash(password), home_location_id
+    )
+
+
+def create_user_with_hash(
+    db: Session, username: str, password_hash: str, home_location_id: int
+) -> User:
     user = User(
         username=username,
         password_hash=password_hash,
@@ -47,48 +69,265 @@ def update_user(db: Session, user_id: int, user_data: UserUpdate) -> User | None
         setattr(user, key, value)
 
     db.commit()
+    invalidate_identity(user.username)
     db.refresh(user)
     return user
 
 
-def get_locations(db: Session) -> list[Location]:
-    return db.query(Location).all()
+def get_locations(db: Session) -> list[LocationSchema]:
+    return list(location_registry.all(db))
+
+
+def get_location_by_id(db: Session, location_id: int) -> LocationSchema | None:
+    return location_registry.by_id(db, location_id)
+
+
+def get_location_by_slug(db: Session, slug: str) -> LocationSchema | None:
+    return location_registry.by_slug(db, slug)
+
+
+def create_location(db: Session, location_data: LocationCreate) -> LocationSchema:
+    location = Location(
+        name=location_data.name,
+        slug=location_data.slug,
+        grade_scales=",".join(location_data.grade_scales),
+    )
+    db.add(location)
+    db.commit()
+    location_registry.load(db)
+    return LocationSchema.model_validate(location)
+
+
+_ROLLUP_COLUMNS = [
+    "location_id",
+    "date",
+    "grade",
+    "sends",
+    "attempts",
+]
 
 
-def get_location_by_id(db: Session, location_id: int) -> Location | None:
-    return db.query(Location).filter(Location.id == location_id).first()
+def _rollup_select():
+    return (
+        select(
+            SessionModel.location_id,
+            SessionModel.date,
+            Problem.grade,
+            func.sum(Problem.sends),
+            func.sum(Problem.attempts),
+        )
+        .join(Problem, Problem.session_id == SessionModel.id)
+        .group_by(SessionModel.location_id, SessionModel.date, Problem.grade)
+    )
+
+
+# Each bucket adds a level to the OR chain below, and SQLite rejects
+# expressions more than 1000 levels deep
+_BUCKETS_PER_STATEMENT = 500
+
+
+def _in_buckets(model, buckets: list[tuple[int, date]]):
+    # SQLite only uses an index for a row-value IN with a single row, but
+    # it does search each branch of an OR
+    return or_(
+        *(
+            and_(model.location_id == location_id, model.date == day)
+            for location_id, day in buckets
+        )
+    )
 
 
-def get_location_by_slug(db: Session, slug: str) -> Location | None:
-    return db.query(Location).filter(Location.slug == slug).first()
+def _refresh_rollup(db: Session, buckets: Iterable[tuple[int, date]]) -> None:
+    # Recompute the (location, date) buckets touched by a write, inside the
+    # caller's transaction so the rollup never disagrees with the raw rows
+    db.flush()
+    buckets = list(set(buckets))
+    for start in range(0, len(buckets), _BUCKETS_PER_STATEMENT):
+        batch = buckets[start : start + _BUCKETS_PER_STATEMENT]
+        db.execute(delete(DailyGradeRollup).where(_in_buckets(DailyGradeRollup, batch)))
+        db.execute(
+            insert(DailyGradeRollup).from_select(
+                _ROLLUP_COLUMNS,
+                _rollup_select().where(_in_buckets(SessionModel, batch)),
+            )
+        )
+
+
+def _commit(db: Session, after_commit: Callable[[], None]) -> None:
+    # Inside the write pipeline many calls share one transaction, so only
+    # flush here and let the pipeline run `after_commit` once it commits
+    if db.info.get("deferred_commit"):
+        db.flush()
+        db.info["after_commit"].append(after_commit)
+        return
+    db.commit()
+    after_commit()
+
+
+def stats_written(user_id: int, location_ids: Iterable[int]) -> None:
+    location_ids = set(location_ids)
+    invalidate_stats(*location_ids)
+    data_versions.bump(
+        GLOBAL, user_scope(user_id), *(location_scope(i) for i in location_ids)
+    )
+
+
+def _commit_stats_write(
+    db: Session, buckets: list[tuple[int, date]], user_id: int
+) -> None:
+    _refresh_rollup(db, buckets)
+    location_ids = {location_id for location_id, _ in buckets}
+    _commit(db, lambda: stats_written(user_id, location_ids))
+
+
+def rebuild_daily_grade_rollup(db: Session) -> int:
+    db.execute(delete(DailyGradeRollup))
+    db.execute(insert(DailyGradeRollup).from_select(_ROLLUP_COLUMNS, _rollup_select()))
+    db.commit()
+    stats_cache.clear()
+    return db.query(DailyGradeRollup).count()
+
+
+def ensure_daily_grade_rollup(db: Session) -> None:
+    # Backfill databases created before the rollup table existed
+    if db.query(DailyGradeRollup).first() is None and db.query(Problem).first():
+        rebuild_daily_grade_rollup(db)
+
+
+def _location_for_grades(
+    db: Session, location_id: int, grades: list[str]
+) -> LocationSchema:
+    # The location, once it's known to offer all of `grades`
+    location = location_registry.by_id(db, location_id)
+    if location is None:
+        raise ValueError("Invalid location")
+    errors = grade_registry.offered(location.grade_scales, grades)
+    if errors:
+        raise ValueError(errors[0])
+    return location
+
+
+def session_errors(db: Session, session_data: SessionCreate) -> list[str]:
+    location = location_registry.by_id(db, session_data.location_id)
+    if location is None:
+        return ["location_id: Invalid location"]
+    return grade_registry.offered(
+        location.grade_scales, [problem.grade for problem in session_data.problems]
+    )
 
 
 def create_session(
     db: Session, session_data: SessionCreate, user_id: int
-) -> SessionModel:
-    session = SessionModel(
+) -> SessionSchema:
+    # A fixed number of statements however many problems are logged: one
+    # INSERT ... RETURNING for the session, one executemany for its problems,
+    # and the rollup refresh. The response is built from what's in memory.
+    location = _location_for_grades(
+        db,
+        session_data.location_id,
+        [problem.grade for problem in session_data.problems],
+    )
+
+    values = {
+        "user_id": user_id,
+        "location_id": session_data.location_id,
+        "date": session_data.date,
+        "rating": session_data.rating,
+    }
+    session_id, created_at = db.execute(
+        insert(SessionModel)
+        .values(values)
+        .returning(SessionModel.id, SessionModel.created_at)
+    ).one()
+
+    problems: list[Row] = []
+    if session_data.problems:
+        # RETURNING order isn't guaranteed for a multi-row insert, so read
+        # back whole rows; ids still follow VALUES order, hence the sort
+        rows = db.execute(
+            insert(Problem.__table__).returning(*Problem.__table__.c),
+            [
+                {"session_id": session_id, **problem.model_dump()}
+                for problem in session_data.problems
+            ],
+        ).all()
+        problems = sorted(rows, key=lambda row: row.id)
+
+    _commit_stats_write(db, [(session_data.location_id, session_data.date)], user_id)
+    return SessionSchema(
+        id=session_id,
+        user_id=user_id,
         location_id=session_data.location_id,
         date=session_data.date,
         rating=session_data.rating,
-        user_id=user_id,
+        created_at=created_at,
+        location_name=location.name,
+        problems=[ProblemSchema.model_validate(row._mapping) for row in problems],
     )
-    db.add(session)
-    db.flush()  # Get session.id before adding problems
-
-    # Create problems associated with this session
-    for problem_data in session_data.problems:
-        problem = Problem(
-            session_id=session.id,
-            grade=problem_data.grade,
-            attempts=problem_data.attempts,
-            sends=problem_data.sends,
-            notes=problem_data.notes,
-        )
-        db.add(problem)
 
+
+def import_sessions(db: Session, sessions: list[SessionCreate], user_id: int) -> int:
+    # Core executemany inserts, one transaction per chunk. The rollup is
+    # refreshed with the chunk; caches are left to the caller, which calls
+    # stats_written once the whole import is done. Returned ids follow
+    # VALUES order, as in create_session.
+    session_ids = db.scalars(
+        insert(SessionModel.__table__).returning(SessionModel.id),
+        [
+            {
+                "user_id": user_id,
+                "location_id": session.location_id,
+                "date": session.date,
+                "rating": session.rating,
+            }
+            for session in sessions
+        ],
+    ).all()
+    problems = [
+        {"session_id": session_id, **problem.model_dump()}
+        for session_id, session in zip(sorted(session_ids), sessions, strict=True)
+        for problem in session.problems
+    ]
+    if problems:
+        db.execute(insert(Problem.__table__), problems)
+
+    _refresh_rollup(db, {(session.location_id, session.date) for session in sessions})
     db.commit()
-    db.refresh(session)
-    return session
+    return len(problems)
+
+
+def _filter_sessions(
+    query: Query[SessionModel],
+    user_id: int,
+    location_id: int | None,
+    start_date: date | None,
+    end_date: date | None,
+) -> Query[SessionModel]:
+    query = query.filter(SessionModel.user_id == user_id)
+
+    if location_id:
+        query = query.filter(SessionModel.location_id == location_id)
+    if start_date:
+        query = query.filter(SessionModel.date >= start_date)
+    if end_date:
+        query = query.filter(SessionModel.date <= end_date)
+
+    # id breaks ties between sessions on the same date for keyset paging
+    return query.order_by(SessionModel.date.desc(), SessionModel.id.desc())
+
+
+def encode_session_cursor(session: SessionModel) -> str:
+    raw = f"{session.date.isoformat()}|{session.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_session_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        day, session_id = raw.split("|")
+        return date.fromisoformat(day), int(session_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
 
 
 def get_sessions(
@@ -98,20 +337,56 @@ def get_sessions(
     start_date: date | None = None,
     end_date: date | None = None,
 ) -> list[SessionModel]:
-    query = (
-        db.query(SessionModel)
-        .options(joinedload(SessionModel.location), joinedload(SessionModel.problems))
-        .filter(SessionModel.user_id == user_id)
+    query = db.query(SessionModel).options(
+        joinedload(SessionModel.location), joinedload(SessionModel.problems)
     )
+    return _filter_sessions(query, user_id, location_id, start_date, end_date).all()
 
-    if location_id:
-        query = query.filter(SessionModel.location_id == location_id)
-    if start_date:
-        query = query.filter(SessionModel.date >= start_date)
-    if end_date:
-        query = query.filter(SessionModel.date <= end_date)
 
-    return query.order_by(SessionModel.date.desc()).all()
+def get_sessions_page(
+    db: Session,
+    user_id: int,
+    limit: int,
+    cursor: str | None = None,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> tuple[list[SessionModel], str | None]:
+    query = db.query(SessionModel).options(
+        joinedload(SessionModel.location), selectinload(SessionModel.problems)
+    )
+    query = _filter_sessions(query, user_id, location_id, start_date, end_date)
+
+    if cursor:
+        # Seek past the last row of the previous page instead of OFFSET, so
+        # every page is an index range scan of the same cost
+        query = query.filter(
+            tuple_(SessionModel.date, SessionModel.id) < decode_session_cursor(cursor)
+        )
+
+    # Fetch one extra row to learn whether there is another page
+    sessions = query.limit(limit + 1).all()
+    if len(sessions) <= limit:
+        return sessions, None
+    sessions = sessions[:limit]
+    return sessions, encode_session_cursor(sessions[-1])
+
+
+def iter_sessions(
+    db: Session,
+    user_id: int,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    batch_size: int = 500,
+) -> Iterator[SessionModel]:
+    # Joined collections can't be combined with yield_per, so problems are
+    # loaded with one SELECT ... IN per batch instead
+    query = db.query(SessionModel).options(
+        joinedload(SessionModel.location), selectinload(SessionModel.problems)
+    )
+    query = _filter_sessions(query, user_id, location_id, start_date, end_date)
+    yield from query.yield_per(batch_size)
 
 
 def get_session_by_id(
@@ -125,103 +400,298 @@ def get_session_by_id(
     )
 
 
+def _session_bucket(
+    db: Session, session_id: int, user_id: int
+) -> tuple[int, date] | None:
+    row = (
+        db.query(SessionModel.location_id, SessionModel.date)
+        .filter(*_owns_session(session_id, user_id))
+        .first()
+    )
+    return None if row is None else (row.location_id, row.date)
+
+
+def _parent_bucket(db: Session, session_id: int) -> tuple[int, date]:
+    # For a session known to exist, such as the one a problem belongs to
+    row = (
+        db.query(SessionModel.location_id, SessionModel.date)
+        .filter(SessionModel.id == session_id)
+        .one()
+    )
+    return row.location_id, row.date
+
+
+def _owns_session(session_id: int, user_id: int) -> tuple:
+    return (SessionModel.id == session_id, SessionModel.user_id == user_id)
+
+
+def _owns_problem(problem_id: int, user_id: int) -> tuple:
+    return (
+        Problem.id == problem_id,
+        select(SessionModel.id)
+        .where(SessionModel.id == Problem.session_id, SessionModel.user_id == user_id)
+        .exists(),
+    )
+
+
 def update_session(
     db: Session, session_id: int, user_id: int, session_data: SessionUpdate
-) -> SessionModel | None:
-    session = get_session_by_id(db, session_id, user_id)
-    if not session:
-        return None
-
+) -> SessionSchema | None:
+    # One ownership-checked UPDATE ... RETURNING; rows that aren't the
+    # user's simply don't match. The response is built from the returned
+    # row, the session's problems and the location registry.
     update_data = session_data.model_dump(exclude_unset=True)
+    table = SessionModel.__table__
+    buckets = []
+    statement: Executable
+    if update_data.keys() & {"location_id", "date"}:
+        # RETURNING only sees the new values, so note the bucket being left
+        old_bucket = _session_bucket(db, session_id, user_id)
+        if old_bucket is None:
+            return None
+        buckets.append(old_bucket)
+
+    if update_data:
+        statement = (
+            update(table)
+            .where(*_owns_session(session_id, user_id))
+            .values(update_data)
+            .returning(*table.c)
+        )
+    else:
+        statement = select(*table.c).where(*_owns_session(session_id, user_id))
+    row = db.execute(statement).first()
+    if row is None:
+        return None
+    if buckets:
+        buckets.append((row.location_id, row.date))
+
+    problems = db.execute(
+        select(*Problem.__table__.c)
+        .where(Problem.session_id == session_id)
+        .order_by(Problem.id)
+    ).all()
+    # A new location must offer the grades already logged; nothing is
+    # committed yet, so the caller's rollback undoes the UPDATE
+    location = _location_for_grades(
+        db,
+        row.location_id,
+        [p.grade for p in problems] if "location_id" in update_data else [],
+    )
 
-    # Update fields
-    for key, value in update_data.items():
-        setattr(session, key, value)
-
-    db.commit()
-    db.refresh(session)
-    return session
+    _commit_stats_write(db, buckets, user_id)
+    return SessionSchema(
+        **row._mapping,
+        location_name=location.name,
+        problems=[ProblemSchema.model_validate(p._mapping) for p in problems],
+    )
 
 
 def delete_session(db: Session, session_id: int, user_id: int) -> bool:
-    session = get_session_by_id(db, session_id, user_id)
-    if not session:
+    # Problems go with the session through ON DELETE CASCADE
+    row = db.execute(
+        delete(SessionModel.__table__)
+        .where(*_owns_session(session_id, user_id))
+        .returning(SessionModel.location_id, SessionModel.date)
+    ).first()
+    if row is None:
         return False
 
-    db.delete(session)
-    db.commit()
+    _commit_stats_write(db, [(row.location_id, row.date)], user_id)
     return True
 
 
 def create_problem(
     db: Session, session_id: int, user_id: int, problem_data: ProblemCreate
-) -> Problem | None:
+) -> ProblemSchema | None:
     # Verify session belongs to user
-    session = get_session_by_id(db, session_id, user_id)
-    if not session:
+    bucket = _session_bucket(db, session_id, user_id)
+    if bucket is None:
         return None
+    _location_for_grades(db, bucket[0], [problem_data.grade])
 
-    problem = Problem(
-        session_id=session_id,
-        grade=problem_data.grade,
-        attempts=problem_data.attempts,
-        sends=problem_data.sends,
-        notes=problem_data.notes,
-    )
-    db.add(problem)
-    db.commit()
-    db.refresh(problem)
-    return problem
+    row = db.execute(
+        insert(Problem.__table__)
+        .values(session_id=session_id, **problem_data.model_dump())
+        .returning(*Problem.__table__.c)
+    ).one()
+    _commit_stats_write(db, [bucket], user_id)
+    return ProblemSchema.model_validate(row._mapping)
 
 
 def update_problem(
     db: Session, problem_id: int, user_id: int, problem_data: ProblemUpdate
-) -> Problem | None:
-    # Get problem and verify it belongs to user's session
-    problem = (
-        db.query(Problem)
-        .join(SessionModel)
-        .filter(Problem.id == problem_id, SessionModel.user_id == user_id)
-        .first()
-    )
-    if not problem:
+) -> ProblemSchema | None:
+    update_data = problem_data.model_dump(exclude_unset=True)
+    table = Problem.__table__
+    statement: Executable
+    if update_data:
+        statement = (
+            update(table)
+            .where(*_owns_problem(problem_id, user_id))
+            .values(update_data)
+            .returning(*table.c)
+        )
+    else:
+        statement = select(*table.c).where(*_owns_problem(problem_id, user_id))
+    row = db.execute(statement).first()
+    if row is None:
         return None
 
-    update_data = problem_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(problem, key, value)
+    # Notes aren't part of the rollup
+    buckets = []
+    if update_data.keys() - {"notes"}:
+        bucket = _parent_bucket(db, row.session_id)
+        if "grade" in update_data:
+            # Not committed yet, so the caller's rollback undoes the UPDATE
+            _location_for_grades(db, bucket[0], [row.grade])
+        buckets.append(bucket)
+    _commit_stats_write(db, buckets, user_id)
+    return ProblemSchema.model_validate(row._mapping)
+
+
+def get_problem_ids(db: Session, session_id: int) -> list[int]:
+    return list(db.scalars(select(Problem.id).where(Problem.session_id == session_id)))
+
+
+def get_problem(db: Session, problem_id: int, user_id: int) -> ProblemSchema | None:
+    row = db.execute(
+        select(*Problem.__table__.c).where(*_owns_problem(problem_id, user_id))
+    ).first()
+    return None if row is None else ProblemSchema.model_validate(row._mapping)
+
+
+def _bump_rollup(
+    db: Session, session_id: int, grade: str, attempts: int, sends: int
+) -> int | None:
+    # Counter deltas don't move problems between buckets, so the rollup row
+    # takes the same deltas instead of a recount
+    return db.scalar(
+        update(DailyGradeRollup.__table__)
+        .where(
+            DailyGradeRollup.grade == grade,
+            tuple_(DailyGradeRollup.location_id, DailyGradeRollup.date).in_(
+                select(SessionModel.location_id, SessionModel.date).where(
+                    SessionModel.id == session_id
+                )
+            ),
+        )
+        .values(
+            attempts=DailyGradeRollup.attempts + attempts,
+            sends=DailyGradeRollup.sends + sends,
+        )
+        .returning(DailyGradeRollup.location_id)
+    )
+
+
+def _add_to_counts(problem_id: int, attempts: int, sends: int):
+    table = Problem.__table__
+    return (
+        update(table)
+        .where(
+            Problem.id == problem_id,
+            Problem.attempts + attempts >= 0,
+            Problem.sends + sends >= 0,
+        )
+        .values(attempts=Problem.attempts + attempts, sends=Problem.sends + sends)
+        .returning(*table.c)
+    )
+
 
+def increment_problem(
+    db: Session, problem_id: int, user_id: int, deltas: ProblemIncrement
+) -> ProblemSchema | None:
+    # attempts = attempts + :delta in the database, so taps from several
+    # devices can't overwrite each other
+    row = db.execute(
+        _add_to_counts(problem_id, deltas.attempts, deltas.sends).where(
+            *_owns_problem(problem_id, user_id)
+        )
+    ).first()
+    if row is None:
+        if db.query(Problem.id).filter(*_owns_problem(problem_id, user_id)).first():
+            raise ValueError("Counts can't go below zero")
+        return None
+
+    location_id = _bump_rollup(
+        db, row.session_id, row.grade, deltas.attempts, deltas.sends
+    )
+    location_ids = [] if location_id is None else [location_id]
+    _commit(db, lambda: stats_written(user_id, location_ids))
+    return ProblemSchema.model_validate(row._mapping)
+
+
+def apply_problem_deltas(db: Session, deltas: dict[int, tuple[int, int]]) -> set[int]:
+    # Flushes the counter buffer: (attempts, sends) deltas per problem id,
+    # already ownership-checked when they were buffered. A problem deleted
+    # since, or edited so a delta would go below zero, is skipped.
+    location_ids = set()
+    for problem_id, (attempts, sends) in deltas.items():
+        row = db.execute(_add_to_counts(problem_id, attempts, sends)).first()
+        if row is None:
+            continue
+        location_id = _bump_rollup(db, row.session_id, row.grade, attempts, sends)
+        if location_id is not None:
+            location_ids.add(location_id)
     db.commit()
-    db.refresh(problem)
-    return problem
+    return location_ids
 
 
 def delete_problem(db: Session, problem_id: int, user_id: int) -> bool:
-    problem = (
-        db.query(Problem)
-        .join(SessionModel)
-        .filter(Problem.id == problem_id, SessionModel.user_id == user_id)
-        .first()
+    session_id = db.scalar(
+        delete(Problem.__table__)
+        .where(*_owns_problem(problem_id, user_id))
+        .returning(Problem.session_id)
     )
-    if not problem:
+    if session_id is None:
         return False
 
-    db.delete(problem)
-    db.commit()
+    _commit_stats_write(db, [_parent_bucket(db, session_id)], user_id)
     return True
 
 
-def get_user_progress(
+def _group_progress(query, day, grade, sends):
+    return query.group_by(day, grade).having(func.sum(sends) > 0).order_by(day, grade)
+
+
+def _progress_counts(query, day, grade, sends) -> list[tuple[str, str, int]]:
+    rows = _group_progress(query, day, grade, sends).all()
+    return [(str(day), grade, count) for day, grade, count in rows]
+
+
+def expand_progress(rows: Iterable[tuple[str, str, int]]) -> Iterator[dict]:
+    # One entry for each send
+    for day, grade, count in rows:
+        for _ in range(count):
+            yield {"date": day, "grade": grade}
+
+
+def format_progress(
+    rows: list[tuple[str, str, int]], fmt: str = "expanded"
+) -> list[list] | dict[str, list] | list[dict]:
+    if fmt == "counts":
+        return [list(row) for row in rows]
+    if fmt == "columns":
+        return {
+            "date": [day for day, _, _ in rows],
+            "grade": [grade for _, grade, _ in rows],
+            "count": [count for _, _, count in rows],
+        }
+
+    return list(expand_progress(rows))
+
+
+def get_user_progress_counts(
     db: Session,
     user_id: int,
     location_id: int | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
-) -> list[dict]:
-    # Query sessions with problems
+) -> list[tuple[str, str, int]]:
     query = (
-        db.query(SessionModel)
-        .options(joinedload(SessionModel.problems))
+        db.query(SessionModel.date, Problem.grade, func.sum(Problem.sends))
+        .select_from(SessionModel)
+        .join(SessionModel.problems)
         .filter(SessionModel.user_id == user_id)
     )
 
@@ -232,16 +702,21 @@ def get_user_progress(
     if end_date:
         query = query.filter(SessionModel.date <= end_date)
 
-    sessions = query.order_by(SessionModel.date).all()
+    return _progress_counts(query, SessionModel.date, Problem.grade, Problem.sends)
 
-    results = []
-    for session in sessions:
-        for problem in session.problems:
-            # Add one entry for each send
-            for _ in range(problem.sends):
-                results.append({"date": str(session.date), "grade": problem.grade})
 
-    return results
+def get_user_progress(
+    db: Session,
+    user_id: int,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[dict]:
+    return list(
+        expand_progress(
+            get_user_progress_counts(db, user_id, location_id, start_date, end_date)
+        )
+    )
 
 
 def get_user_distribution(
@@ -250,10 +725,10 @@ def get_user_distribution(
     location_id: int | None = None,
     period: str = "all",
 ) -> dict:
-    # Query sessions with problems
+    # Sum sends per grade in SQL rather than hydrating every session
     query = (
-        db.query(SessionModel)
-        .options(joinedload(SessionModel.problems))
+        db.query(Problem.grade, func.sum(Problem.sends))
+        .join(SessionModel)
         .filter(SessionModel.user_id == user_id)
     )
 
@@ -269,119 +744,137 @@ def get_user_distribution(
         month_ago = date.today() - timedelta(days=30)
         query = query.filter(SessionModel.date >= month_ago)
 
-    sessions = query.all()
-
-    grade_counts: dict[str, int] = {}
-    for session in sessions:
-        for problem in session.problems:
-            # Count each send
-            grade_counts[problem.grade] = (
-                grade_counts.get(problem.grade, 0) + problem.sends
-            )
-
-    return grade_counts
+    return dict(query.group_by(Problem.grade).all())
 
 
 def get_location_stats(db: Session, location_id: int) -> dict:
-    sessions = (
-        db.query(SessionModel)
-        .options(joinedload(SessionModel.problems))
-        .filter(SessionModel.location_id == location_id)
+    rows = (
+        db.query(
+            DailyGradeRollup.grade,
+            func.sum(DailyGradeRollup.attempts),
+            func.sum(DailyGradeRollup.sends),
+        )
+        .filter(DailyGradeRollup.location_id == location_id)
+        .group_by(DailyGradeRollup.grade)
         .all()
     )
 
-    total_climbs = 0
-    grade_distribution: dict[str, int] = {}
-
-    for session in sessions:
-        for problem in session.problems:
-            # Count attempts for total climbs
-            total_climbs += problem.attempts
-            # Count sends for grade distribution
-            grade_distribution[problem.grade] = (
-                grade_distribution.get(problem.grade, 0) + problem.sends
-            )
-
     return {
-        "total_climbs": total_climbs,
-        "grade_distribution": grade_distribution,
+        # Attempts count towards total climbs, sends towards the distribution
+        "total_climbs": sum(attempts for _, attempts, _ in rows),
+        "grade_distribution": {grade: sends for grade, _, sends in rows},
     }
 
 
-def get_aggregate_stats(
-    db: Session, period: str = "all", location_id: int | None = None
-) -> dict:
-    query = db.query(SessionModel).options(
-        joinedload(SessionModel.problems), joinedload(SessionModel.location)
-    )
-
+def _filter_aggregate(query, model, period: str, location_id: int | None):
     if location_id:
-        query = query.filter(SessionModel.location_id == location_id)
+        query = query.filter(model.location_id == location_id)
 
     if period == "week":
         week_ago = date.today() - timedelta(days=7)
-        query = query.filter(SessionModel.date >= week_ago)
+        query = query.filter(model.date >= week_ago)
     elif period == "month":
         month_ago = date.today() - timedelta(days=30)
-        query = query.filter(SessionModel.date >= month_ago)
+        query = query.filter(model.date >= month_ago)
 
-    sessions = query.all()
+    return query
 
-    total_climbs = 0
-    grade_distribution: dict[str, int] = {}
-    location_counts: dict[int, dict[str, str | int]] = {}
 
-    for session in sessions:
-        for problem in session.problems:
-            # Count attempts for total climbs
-            total_climbs += problem.attempts
-            # Count sends for grade distribution
-            grade_distribution[problem.grade] = (
-                grade_distribution.get(problem.grade, 0) + problem.sends
-            )
+def get_aggregate_stats(
+    db: Session, period: str = "all", location_id: int | None = None
+) -> dict:
+    grade_rows = (
+        _filter_aggregate(
+            db.query(
+                DailyGradeRollup.grade,
+                func.sum(DailyGradeRollup.attempts),
+                func.sum(DailyGradeRollup.sends),
+            ),
+            DailyGradeRollup,
+            period,
+            location_id,
+        )
+        .group_by(DailyGradeRollup.grade)
+        .all()
+    )
 
-        # Count sessions by location
-        loc_id = session.location_id
-        loc_name = session.location.name
-        if loc_id not in location_counts:
-            location_counts[loc_id] = {"name": loc_name, "count": 0}
-        count_val = location_counts[loc_id]["count"]
-        if isinstance(count_val, int):
-            location_counts[loc_id]["count"] = count_val + 1
+    # Count sessions by location; names come from the location registry
+    location_rows = (
+        _filter_aggregate(
+            db.query(SessionModel.location_id, func.count()),
+            SessionModel,
+            period,
+            location_id,
+        )
+        .group_by(SessionModel.location_id)
+        .order_by(SessionModel.location_id)
+        .all()
+    )
+    names = {location.id: location.name for location in location_registry.all(db)}
 
     return {
-        "total_climbs": total_climbs,
+        "total_climbs": sum(attempts for _, attempts, _ in grade_rows),
         "by_location": [
-            {"location_id": loc_id, "name": data["name"], "count": data["count"]}
-            for loc_id, data in location_counts.items()
+            {"location_id": loc_id, "name": names.get(loc_id), "count": count}
+            for loc_id, count in location_rows
         ],
-        "grade_distribution": grade_distribution,
+        "grade_distribution": {grade: sends for grade, _, sends in grade_rows},
     }
 
 
-def get_aggregate_progress(
+def _aggregate_progress_query(
     db: Session,
-    location_id: int | None = None,
-    start_date: date | None = None,
-    end_date: date | None = None,
-) -> list[dict]:
-    # Query all sessions with problems (across all users)
-    query = db.query(SessionModel).options(joinedload(SessionModel.problems))
+    location_id: int | None,
+    start_date: date | None,
+    end_date: date | None,
+):
+    # Sends per date and grade across all users
+    query = db.query(
+        DailyGradeRollup.date, DailyGradeRollup.grade, func.sum(DailyGradeRollup.sends)
+    )
 
     if location_id:
-        query = query.filter(SessionModel.location_id == location_id)
+        query = query.filter(DailyGradeRollup.location_id == location_id)
     if start_date:
-        query = query.filter(SessionModel.date >= start_date)
+        query = query.filter(DailyGradeRollup.date >= start_date)
     if end_date:
-        query = query.filter(SessionModel.date <= end_date)
+        query = query.filter(DailyGradeRollup.date <= end_date)
+
+    return _group_progress(
+        query, DailyGradeRollup.date, DailyGradeRollup.grade, DailyGradeRollup.sends
+    )
 
-    sessions = query.order_by(SessionModel.date).all()
 
-    results = []
-    for session in sessions:
-        for problem in session.problems:
-            # Add one entry for each send
-            for _ in range(problem.sends):
-                results.append({"date": str(session.date), "grade": problem.grade})
+def get_aggregate_progress_counts(
+    db: Session,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[tuple[str, str, int]]:
+    query = _aggregate_progress_query(db, location_id, start_date, end_date)
+    return [(str(day), grade, count) for day, grade, count in query.all()]
+
 
-    return results
+def iter_aggregate_progress_counts(
+    db: Session,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    batch_size: int = 1000,
+) -> Iterator[tuple[str, str, int]]:
+    query = _aggregate_progress_query(db, location_id, start_date, end_date)
+    for day, grade, count in query.yield_per(batch_size):
+        yield str(day), grade, count
+
+
+def get_aggregate_progress(
+    db: Session,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[dict]:
+    return list(
+        expand_progress(
+            get_aggregate_progress_counts(db, location_id, start_date, end_date)
+        )
+    )
@@ -1,22 +1,153 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import threading
+import time
+from typing import ClassVar
 
+from sqlalchemy import Table, create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from . import metrics
 from .config import settings
+from .timing import instrument_engine
+
+
+def sqlite_pragmas() -> dict[str, str | int]:
+    # busy_timeout goes first so switching the journal mode waits on locks
+    return {
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        # Negative cache_size is in KiB rather than pages
+        "cache_size": -settings.sqlite_cache_size_kib,
+        "mmap_size": settings.sqlite_mmap_size_bytes,
+        "temp_store": settings.sqlite_temp_store,
+    }
+
+
+def configure_sqlite(engine: Engine, pragmas: dict[str, str | int]) -> None:
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    event.listen(engine, "connect", apply_pragmas)
+
+
+class ContentionStats:
+    """Writer checkout waits/timeouts and "database is locked" errors."""
+
+    def __init__(self):
+        self.checkout_wait_ms = metrics.Histogram()
+        self.checkout_timeouts = 0
+        self.locked = {"read": 0, "write": 0}
+        self._lock = threading.Lock()
+
+    def record_locked(self, role: str) -> None:
+        with self._lock:
+            self.locked[role] += 1
+
+    def stats(self) -> dict:
+        return {
+            "writer_checkout_wait_ms": self.checkout_wait_ms.stats(),
+            "writer_checkout_timeouts": self.checkout_timeouts,
+            "locked_errors": dict(self.locked),
+        }
+
+
+contention = ContentionStats()
+metrics.register("database", contention.stats)
+
+
+class WriterPool(QueuePool):
+    # Times how long mutations queue for the single writer connection
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            contention.checkout_timeouts += 1
+            raise
+        finally:
+            contention.checkout_wait_ms.observe((time.perf_counter() - start) * 1000)
+
+
+def is_locked_error(exc: BaseException) -> bool:
+    return isinstance(exc, OperationalError) and "database is locked" in str(exc)
+
+
+def _count_locked(engine: Engine, role: str) -> None:
+    def handle_error(context):
+        if "database is locked" in str(context.original_exception):
+            contention.record_locked(role)
 
-engine = create_engine(
-    settings.database_url,
-    connect_args=(
-        {"check_same_thread": False} if "sqlite" in settings.database_url else {}
-    ),
-    pool_pre_ping=True,
-)
+    event.listen(engine, "handle_error", handle_error)
+
+
+def _connect_args(url: str) -> dict:
+    return {"check_same_thread": False} if url.startswith("sqlite") else {}
+
+
+def connection_pragmas() -> dict[str, str | int]:
+    # foreign_keys isn't tuning: deleting a session relies on ON DELETE CASCADE
+    # to remove its problems, so it's on even without the pragma profile
+    profile = sqlite_pragmas() if settings.sqlite_pragmas_enabled else {}
+    return {**profile, "foreign_keys": "ON"}
+
+
+def create_write_engine(url: str) -> Engine:
+    # Mutations share one connection, so they queue in the pool (measured
+    # above) instead of racing each other into SQLite's busy handler
+    engine = create_engine(
+        url,
+        connect_args=_connect_args(url),
+        poolclass=WriterPool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.database_write_timeout_seconds,
+        pool_pre_ping=True,
+    )
+    if url.startswith("sqlite"):
+        configure_sqlite(engine, connection_pragmas())
+    _count_locked(engine, "write")
+    return engine
+
+
+def create_read_engine(url: str) -> Engine:
+    # GET routes read through their own pool; in WAL mode these never block,
+    # or get blocked by, the writer
+    engine = create_engine(
+        url,
+        connect_args=_connect_args(url),
+        pool_size=settings.database_read_pool_size,
+        pool_pre_ping=True,
+    )
+    if url.startswith("sqlite"):
+        configure_sqlite(engine, {**connection_pragmas(), "query_only": 1})
+    _count_locked(engine, "read")
+    return engine
+
+
+engine = create_write_engine(settings.database_url)
+read_engine = create_read_engine(settings.database_url)
+instrument_engine(engine)
+instrument_engine(read_engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 
-Base = declarative_base()
+class Base(DeclarativeBase):
+    # Every model maps a plain table, which Core statements are built on
+    __table__: ClassVar[Table]
 
 
-def get_db():
+def get_write_db():
     db = SessionLocal()
     try:
         yield db
@@ -24,5 +155,16 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    # The migrations import the models, which import Base from here
+    from .migrations import migrate
+
+    migrate(engine)
@@ -1,33 +1,78 @@
+import time
+from typing import NamedTuple
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
-from .auth import decode_access_token
-from .database import get_db
+from . import timing
+from .auth import decode_access_token, token_digest
+from .cache import IdentityKey, identity_cache
+from .config import settings
+from .database import get_read_db
 from .models import User
+from .schemas import TokenData
+from .schemas import User as UserSchema
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
 
+class _Identity(NamedTuple):
+    token_data: TokenData
+    key: IdentityKey
+    # Read before the lookup, so a snapshot loaded across a user update
+    # isn't cached after the update invalidated it
+    generation: int
+    cached: UserSchema | None
+
+
+def _identity(token: str) -> _Identity:
     token_data = decode_access_token(token)
     if token_data is None or token_data.username is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
-        raise credentials_exception
+    # Reuse the user snapshot for as long as this token is valid, so routes
+    # only touch the users table when they actually change the user
+    key = (token_data.username, token_digest(token))
+    generation = identity_cache.generation
+    return _Identity(token_data, key, generation, identity_cache.get(key))
+
+
+def _remember(identity: _Identity, snapshot: UserSchema) -> None:
+    ttl = settings.identity_cache_ttl_seconds
+    if identity.token_data.exp is not None:
+        ttl = min(ttl, identity.token_data.exp - time.time())
+    if ttl > 0:
+        identity_cache.set_unless_invalidated(
+            identity.key, snapshot, identity.generation, ttl=ttl
+        )
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_db)
+) -> UserSchema:
+    with timing.phase("auth"):
+        identity = _identity(token)
+        if identity.cached is not None:
+            return identity.cached
+
+        username = identity.token_data.username
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise credentials_exception
 
-    return user
+        snapshot = UserSchema.model_validate(user)
+        _remember(identity, snapshot)
+        return snapshot
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(
+    current_user: UserSchema = Depends(get_current_user),
+) -> UserSchema:
     return current_user
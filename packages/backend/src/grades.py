@@ -0,0 +1,141 @@
+"""Grade scales and the integer codes grades are stored as.
+
+Each scale owns a block of SCALE_SIZE codes numbered in order of
+difficulty, so sorting or comparing codes within a scale sorts or compares
+difficulty, and "grades of at least X" is a range scan. Labels are unique
+across scales, so the API keeps speaking in labels.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from sqlalchemy import Integer
+from sqlalchemy.types import TypeDecorator
+
+SCALE_SIZE = 100
+
+
+@dataclass(frozen=True)
+class GradeScale:
+    id: int
+    key: str
+    name: str
+    grades: tuple[str, ...]
+
+    @property
+    def codes(self) -> range:
+        start = self.id * SCALE_SIZE
+        return range(start, start + len(self.grades))
+
+
+class GradeRegistry:
+    def __init__(self, scales: Iterable[GradeScale]):
+        self.scales: dict[str, GradeScale] = {}
+        self._codes: dict[str, int] = {}
+        self._labels: dict[int, str] = {}
+        self._scale_of: dict[str, GradeScale] = {}
+        for scale in scales:
+            if len(scale.grades) > SCALE_SIZE:
+                raise ValueError(f"Scale {scale.key!r} has too many grades")
+            self.scales[scale.key] = scale
+            for code, grade in zip(scale.codes, scale.grades, strict=True):
+                if grade in self._codes:
+                    raise ValueError(f"Grade {grade!r} is in more than one scale")
+                self._codes[grade] = code
+                self._labels[code] = grade
+                self._scale_of[grade] = scale
+
+    def codes(self) -> dict[str, int]:
+        return dict(self._codes)
+
+    def code(self, grade: str) -> int:
+        return self._codes[grade]
+
+    def label(self, code: int) -> str:
+        return self._labels[code]
+
+    def scale_of(self, grade: str) -> GradeScale:
+        return self._scale_of[grade]
+
+    def validate(self, grade: str) -> str:
+        if grade not in self._codes:
+            raise ValueError(f"Unknown grade {grade!r}")
+        return grade
+
+    def validate_scales(self, keys: list[str]) -> list[str]:
+        unknown = [key for key in keys if key not in self.scales]
+        if unknown:
+            raise ValueError(f"Unknown grade scales: {', '.join(unknown)}")
+        if not keys:
+            raise ValueError("At least one grade scale is required")
+        return keys
+
+    def offered(self, scale_keys: Iterable[str], grades: Iterable[str]) -> list[str]:
+        # Messages for grades outside the given scales (a location's)
+        keys = set(scale_keys)
+        return [
+            f"grade: {grade} isn't used at this location"
+            for grade in dict.fromkeys(grades)
+            if self._scale_of[grade].key not in keys
+        ]
+
+
+V_SCALE = GradeScale(
+    id=0,
+    key="v",
+    name="V-scale bands",
+    grades=("VB", "V0", "V3", "V4-V6", "V6-V8", "V7-V10"),
+)
+FONT = GradeScale(
+    id=1,
+    key="font",
+    name="Fontainebleau",
+    grades=(
+        "3",
+        "4",
+        "4+",
+        "5",
+        "5+",
+        "6A",
+        "6A+",
+        "6B",
+        "6B+",
+        "6C",
+        "6C+",
+        "7A",
+        "7A+",
+        "7B",
+        "7B+",
+        "7C",
+        "7C+",
+        "8A",
+        "8A+",
+        "8B",
+        "8B+",
+        "8C",
+        "8C+",
+        "9A",
+    ),
+)
+COLOURS = GradeScale(
+    id=2,
+    key="colour",
+    name="Colour circuit",
+    grades=("white", "yellow", "green", "blue", "purple", "red", "black"),
+)
+
+grade_registry = GradeRegistry([V_SCALE, FONT, COLOURS])
+DEFAULT_SCALES = [V_SCALE.key]
+
+
+class GradeCode(TypeDecorator):
+    """A grade label in Python, its integer code in the database."""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else grade_registry.code(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else grade_registry.label(value)
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+import bcrypt
+
+from . import metrics, timing
+from .auth import get_password_hash, verify_password
+from .config import settings
+from .metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class HashingOverloaded(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on its own bounded pool, away from the request threadpool.
+
+    At most `workers` hashes run at once and `max_queue` more may wait;
+    anything beyond that is rejected immediately so a login burst can't
+    starve cheap requests.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bcrypt"
+        )
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        self.latency = Histogram()
+
+    def _timed(self, fn: Callable[..., T], *args) -> T:
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.latency.observe((time.perf_counter() - start) * 1000)
+
+    def _done(self, _future) -> None:
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingOverloaded
+        with self._lock:
+            self.pending += 1
+        future = self._executor.submit(self._timed, fn, *args)
+        future.add_done_callback(self._done)
+        with timing.phase("auth"):
+            return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        pending = self.pending
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "active": min(pending, self.workers),
+            "queued": max(pending - self.workers, 0),
+            "rejected": self.rejected,
+            "latency_ms": self.latency.stats(),
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers, max_queue=settings.password_hash_queue
+)
+metrics.register("password_hashing", password_hasher.stats)
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int | None = None) -> int:
+    # Each extra round doubles the cost; take the largest that fits the
+    # target, but never less than the floor (`bcrypt_min_rounds` by default)
+    if min_rounds is None:
+        min_rounds = settings.bcrypt_min_rounds
+    password = b"calibration-password"
+    rounds = min_rounds
+    for candidate in range(min_rounds, 17):
+        start = time.perf_counter()
+        bcrypt.hashpw(password, bcrypt.gensalt(rounds=candidate))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms > target_ms:
+            if candidate == min_rounds:
+                logger.warning(
+                    "bcrypt at the minimum of %d rounds took %.0f ms, over the "
+                    "%.0f ms target; keeping the minimum",
+                    min_rounds,
+                    elapsed_ms,
+                    target_ms,
+                )
+            break
+        rounds = candidate
+    logger.info("bcrypt calibrated to %d rounds (target %.0f ms)", rounds, target_ms)
+    return rounds
@@ -0,0 +1,236 @@
+import csv
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
+
+from pydantic import ValidationError
+
+from .schemas import ImportReport, ImportRowError, ProblemCreate, SessionCreate
+
+CSV_MEDIA_TYPE = "text/csv"
+CSV_COLUMNS = ("date", "location_id", "rating", "grade", "attempts", "sends", "notes")
+_PROBLEM_FIELDS = ("grade", "attempts", "sends", "notes")
+# Rows with the same key values in a row form one session; the rating only
+# needs filling in on one of them
+_SESSION_KEY = ("session", "date", "location_id")
+_SESSION_FIELDS = ("date", "location_id", "rating")
+
+# Keep the report bounded however broken the upload is
+MAX_REPORTED_ERRORS = 1000
+
+# Each parsed item is (row, first row of its session, session or error
+# messages); one invalid row rejects the whole session it belongs to
+Parsed = tuple[int, int, SessionCreate | list[str]]
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8-sig").rstrip("\r")
+
+
+def _messages(e: ValidationError) -> list[str]:
+    return [
+        (
+            ".".join(str(part) for part in error["loc"]) + ": " + error["msg"]
+            if error["loc"]
+            else error["msg"]
+        )
+        for error in e.errors()
+    ]
+
+
+def _in_quotes(line: str, quoted: bool) -> bool:
+    # Whether a CSV record is still inside a quoted field at the end of
+    # `line`, following csv's default dialect: a quote only opens a field
+    # at its start, and "" inside one is a literal quote
+    if '"' not in line:
+        return quoted
+    field_start = not quoted
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if quoted:
+            if char == '"':
+                if line[i + 1 : i + 2] == '"':
+                    i += 1
+                else:
+                    quoted = False
+        elif char == '"' and field_start:
+            quoted = True
+        field_start = char == "," and not quoted
+        i += 1
+    return quoted
+
+
+class _LineFeed:
+    # Input for one csv.reader that's topped up as lines arrive; it only
+    # ever holds whole records, so the reader never runs dry mid-record
+    def __init__(self):
+        self.lines: deque[str] = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def _csv_records(lines: AsyncIterable[str]) -> AsyncIterator[tuple[int, list]]:
+    # (first line number, values) for each record; quoted fields can span
+    # lines, as in spreadsheet exports with multi-line notes
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    row = first_row = 0
+    quoted = False
+    async for line in lines:
+        row += 1
+        if not feed.lines:
+            if not line.strip():
+                continue
+            first_row = row
+        feed.lines.append(line + "\n")
+        quoted = _in_quotes(line, quoted)
+        if quoted:
+            continue
+        try:
+            yield first_row, next(reader)
+        except csv.Error as e:
+            raise ValueError(f"Row {first_row}: {e}") from e
+    if feed.lines:
+        raise ValueError(f"Row {first_row}: unterminated quoted field")
+
+
+async def parse_ndjson(lines: AsyncIterable[str]) -> AsyncIterator[Parsed]:
+    # One session (with its problems) per line
+    row = 0
+    async for line in lines:
+        row += 1
+        if not line.strip():
+            continue
+        try:
+            yield row, row, SessionCreate.model_validate_json(line)
+        except ValidationError as e:
+            yield row, row, _messages(e)
+
+
+async def parse_csv(lines: AsyncIterable[str]) -> AsyncIterator[Parsed]:
+    # One problem per row; consecutive rows with the same date and location
+    # (and `session` value, if that column is present) form one session,
+    # rated by its first row with a rating
+    header: list[str] | None = None
+    key = None
+    first_row = 0
+    fields: dict = {}
+    problems: list[ProblemCreate] = []
+    row_errors: list[Parsed] = []
+
+    def close_group() -> list[Parsed]:
+        if key is None:
+            return []
+        if row_errors:
+            return row_errors
+        try:
+            session = SessionCreate.model_validate({**fields, "problems": problems})
+        except ValidationError as e:
+            return [(first_row, first_row, _messages(e))]
+        return [(first_row, first_row, session)]
+
+    async for row, values in _csv_records(lines):
+        if header is None:
+            header = [name.strip() for name in values]
+            missing = [name for name in CSV_COLUMNS if name not in header]
+            if missing:
+                raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+            continue
+
+        record = {
+            name: value.strip()
+            for name, value in zip(header, values, strict=False)
+            if value.strip()
+        }
+        row_key = tuple(record.get(name) for name in _SESSION_KEY)
+        if row_key != key:
+            for parsed in close_group():
+                yield parsed
+            key, first_row = row_key, row
+            fields = {}
+            problems, row_errors = [], []
+        for name in _SESSION_FIELDS:
+            if name in record:
+                fields.setdefault(name, record[name])
+
+        try:
+            problems.append(
+                ProblemCreate.model_validate(
+                    {name: record[name] for name in _PROBLEM_FIELDS if name in record}
+                )
+            )
+        except ValidationError as e:
+            row_errors.append((row, first_row, _messages(e)))
+
+    for parsed in close_group():
+        yield parsed
+
+
+async def import_sessions(
+    parsed: AsyncIterable[Parsed],
+    check_session: Callable[[SessionCreate], list[str]],
+    insert_chunk: Callable[[list[SessionCreate]], Awaitable[int]],
+    chunk_size: int,
+    on_imported: Callable[[set[int]], None],
+) -> ImportReport:
+    # Each chunk commits on its own. `on_imported` gets the locations of
+    # everything committed once the import ends, however it ends. An upload
+    # that turns out to be unreadable raises ValueError if nothing has been
+    # committed yet; after that the report says where it stopped.
+    report = ImportReport()
+    location_ids: set[int] = set()
+    chunk: list[SessionCreate] = []
+    skipped: set[int] = set()
+
+    def add_error(row: int, messages: list[str]) -> None:
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(ImportRowError(row=row, errors=messages))
+        else:
+            report.errors_truncated = True
+
+    async def flush() -> None:
+        report.imported_problems += await insert_chunk(chunk)
+        report.imported_sessions += len(chunk)
+        location_ids.update(session.location_id for session in chunk)
+        chunk.clear()
+
+    try:
+        try:
+            async for row, session_row, item in parsed:
+                if isinstance(item, list):
+                    add_error(row, item)
+                    skipped.add(session_row)
+                    continue
+                if messages := check_session(item):
+                    add_error(session_row, messages)
+                    skipped.add(session_row)
+                    continue
+                chunk.append(item)
+                if len(chunk) >= chunk_size:
+                    await flush()
+        except ValueError as e:
+            if not report.imported_sessions:
+                raise
+            report.stopped = str(e)
+        else:
+            if chunk:
+                await flush()
+    finally:
+        if location_ids:
+            on_imported(location_ids)
+
+    report.skipped_sessions = len(skipped)
+    return report
@@ -1,9 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
+from . import crud, metrics
 from .config import settings
-from .database import init_db
+from .counter_buffer import counter_buffer
+from .database import SessionLocal, init_db, is_locked_error
+from .hashing import HashingOverloaded, calibrate_bcrypt_rounds
+from .registry import location_registry
 from .routers import auth, locations, sessions, stats
+from .timing import ServerTimingMiddleware
+from .write_pipeline import write_pipeline
 
 app = FastAPI(
     title="Overhang API",
@@ -19,18 +28,77 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(locations.router, prefix="/locations", tags=["locations"])
-app.include_router(sessions.router, prefix="/sessions", tags=["sessions"])
-app.include_router(stats.router, prefix="/stats", tags=["stats"])
+if settings.database_mode == "async":
+    from .routers import async_sessions, async_stats
+
+    app.include_router(async_sessions.router, prefix="/sessions", tags=["sessions"])
+    app.include_router(async_stats.router, prefix="/stats", tags=["stats"])
+else:
+    app.include_router(sessions.router, prefix="/sessions", tags=["sessions"])
+    app.include_router(stats.router, prefix="/stats", tags=["stats"])
+
+
+@app.exception_handler(HashingOverloaded)
+def hashing_overloaded_handler(request: Request, exc: HashingOverloaded):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": str(settings.password_hash_retry_after_seconds)},
+    )
+
+
+def _database_busy() -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database busy, please retry"},
+        headers={"Retry-After": str(settings.database_retry_after_seconds)},
+    )
+
+
+@app.exception_handler(PoolTimeoutError)
+def writer_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return _database_busy()
+
+
+@app.exception_handler(OperationalError)
+def operational_error_handler(request: Request, exc: OperationalError):
+    if is_locked_error(exc):
+        return _database_busy()
+    raise exc
 
 
 @app.on_event("startup")
 def startup_event():
+    if settings.bcrypt_target_ms:
+        settings.bcrypt_rounds = calibrate_bcrypt_rounds(settings.bcrypt_target_ms)
     init_db()
+    db = SessionLocal()
+    try:
+        location_registry.load(db)
+        crud.ensure_daily_grade_rollup(db)
+    finally:
+        db.close()
+    if settings.write_pipeline_enabled:
+        write_pipeline.start()
+    if settings.counter_buffer_enabled:
+        counter_buffer.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    counter_buffer.stop()
+    write_pipeline.stop()
 
 
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+def get_metrics():
+    return metrics.snapshot()
@@ -0,0 +1,45 @@
+import bisect
+import threading
+from collections.abc import Callable
+
+_collectors: dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, collector: Callable[[], dict]) -> None:
+    _collectors[name] = collector
+
+
+def snapshot() -> dict:
+    return {name: collector() for name, collector in _collectors.items()}
+
+
+# Millisecond bucket upper bounds, roughly doubling
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """Fixed-bucket histogram; values above the last bound land in "inf"."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            labels = [f"le_{bound}" for bound in self.buckets] + ["inf"]
+            return {
+                "count": sum(counts),
+                "sum": round(self._sum, 3),
+                "max": round(self._max, 3),
+                "buckets": dict(zip(labels, counts, strict=True)),
+            }
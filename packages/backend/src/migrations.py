@@ -0,0 +1,252 @@
+"""Schema migrations for existing SQLite databases.
+
+`create_all` adds missing tables but never changes existing ones. Changes it
+can't make are listed in MIGRATIONS; the number applied is kept in
+`PRAGMA user_version`. A database created from scratch already has the
+current schema and starts at the latest version.
+
+Each migration spells out the tables and indexes as they were at its
+version rather than reading the models, so later model changes never alter
+what an old migration does. On an existing database the migrations run
+first and `create_all` afterwards, so tables added since the database was
+created start at the current schema.
+"""
+
+import sqlite3
+from collections.abc import Callable
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from .database import Base
+from .grades import DEFAULT_SCALES, grade_registry
+
+# A migration returns the statements to run, given the raw connection to
+# look at the schema it's upgrading
+Migration = Callable[[sqlite3.Connection], list[str]]
+
+_PROBLEM_COLUMNS = [
+    "id",
+    "session_id",
+    "grade",
+    "attempts",
+    "sends",
+    "notes",
+    "created_at",
+]
+
+# Version 1: problems go with their session
+_PROBLEMS_V1 = [
+    "CREATE TABLE problems (id INTEGER NOT NULL, session_id INTEGER NOT NULL,"
+    " grade VARCHAR NOT NULL, attempts INTEGER NOT NULL, sends INTEGER NOT NULL,"
+    " notes TEXT, created_at DATETIME NOT NULL, PRIMARY KEY (id),"
+    " FOREIGN KEY(session_id) REFERENCES sessions (id) ON DELETE CASCADE)",
+    "CREATE INDEX ix_problems_id ON problems (id)",
+    "CREATE INDEX ix_problems_session_id ON problems (session_id)",
+]
+
+# Version 2: grades are stored as integer codes
+_PROBLEMS_V2 = [
+    "CREATE TABLE problems (id INTEGER NOT NULL, session_id INTEGER NOT NULL,"
+    " grade INTEGER NOT NULL, attempts INTEGER NOT NULL, sends INTEGER NOT NULL,"
+    " notes TEXT, created_at DATETIME NOT NULL, PRIMARY KEY (id),"
+    " FOREIGN KEY(session_id) REFERENCES sessions (id) ON DELETE CASCADE)",
+    "CREATE INDEX ix_problems_id ON problems (id)",
+    "CREATE INDEX ix_problems_session_id ON problems (session_id)",
+]
+_ROLLUP_COLUMNS_V2 = [
+    "location_id",
+    "date",
+    "grade",
+    "sends",
+    "attempts",
+    "session_count",
+]
+_ROLLUP_V2 = [
+    "CREATE TABLE daily_grade_rollup (location_id INTEGER NOT NULL,"
+    " date DATE NOT NULL, grade INTEGER NOT NULL, sends INTEGER NOT NULL,"
+    " attempts INTEGER NOT NULL, session_count INTEGER NOT NULL,"
+    " PRIMARY KEY (location_id, date, grade),"
+    " FOREIGN KEY(location_id) REFERENCES locations (id))",
+]
+
+# Version 3: composite indexes replace single-column ones
+_REPLACED_INDEXES = [
+    "ix_sessions_user_id",
+    "ix_sessions_location_id",
+    "ix_problems_session_id",
+]
+_QUERY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_sessions_date ON sessions (date)",
+    "CREATE INDEX IF NOT EXISTS ix_sessions_id ON sessions (id)",
+    "CREATE INDEX IF NOT EXISTS ix_sessions_location_id_date"
+    " ON sessions (location_id, date)",
+    "CREATE INDEX IF NOT EXISTS ix_sessions_user_id_date ON sessions (user_id, date)",
+    "CREATE INDEX IF NOT EXISTS ix_problems_id ON problems (id)",
+    "CREATE INDEX IF NOT EXISTS ix_problems_session_id_grade_sends_attempts"
+    " ON problems (session_id, grade, sends, attempts)",
+]
+_ROLLUP_QUERY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_daily_grade_rollup_date"
+    " ON daily_grade_rollup (date)",
+]
+
+
+def _columns(sqlite: sqlite3.Connection, table: str) -> list[str]:
+    # Empty if the table doesn't exist
+    return [row[1] for row in sqlite.execute(f"PRAGMA table_info({table})")]
+
+
+def _rebuild(
+    sqlite: sqlite3.Connection,
+    table: str,
+    columns: list[str],
+    schema: list[str],
+    where: str = "",
+    expressions: dict[str, str] | None = None,
+) -> list[str]:
+    # SQLite can't alter constraints or column types in place: rename the
+    # old table, create the new one from `schema` (its CREATE TABLE, then
+    # its indexes) and copy `columns` across, computing those listed in
+    # `expressions` from the old row
+    old = f"_{table}_old"
+    values = [(expressions or {}).get(name, name) for name in columns]
+    indexes = [
+        name
+        for (name,) in sqlite.execute(
+            "SELECT name FROM sqlite_master"
+            " WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table,),
+        )
+    ]
+    return [
+        f"ALTER TABLE {table} RENAME TO {old}",
+        *(f"DROP INDEX {name}" for name in indexes),
+        *schema,
+        f"INSERT INTO {table} ({', '.join(columns)})"
+        f" SELECT {', '.join(values)} FROM {old} {where}",
+        f"DROP TABLE {old}",
+    ]
+
+
+def _cascade_problem_deletes(sqlite: sqlite3.Connection) -> list[str]:
+    # Problems now go with their session via ON DELETE CASCADE; orphans left
+    # by earlier bugs would fail the new foreign key, so they aren't copied
+    return _rebuild(
+        sqlite,
+        "problems",
+        _PROBLEM_COLUMNS,
+        _PROBLEMS_V1,
+        where="WHERE session_id IN (SELECT id FROM sessions)",
+    )
+
+
+def _grade_codes(sqlite: sqlite3.Connection) -> list[str]:
+    # Grades were stored as labels; store their codes from grades.py, and
+    # give every existing location the default scale
+    cases = " ".join(
+        f"WHEN '{label}' THEN {code}" for label, code in grade_registry.codes().items()
+    )
+    grade = f"CASE grade {cases} END"
+    statements = []
+    if "grade_scales" not in _columns(sqlite, "locations"):
+        statements.append(
+            "ALTER TABLE locations ADD COLUMN grade_scales VARCHAR NOT NULL"
+            f" DEFAULT '{','.join(DEFAULT_SCALES)}'"
+        )
+    statements += _rebuild(
+        sqlite, "problems", _PROBLEM_COLUMNS, _PROBLEMS_V2, expressions={"grade": grade}
+    )
+    if _columns(sqlite, "daily_grade_rollup"):
+        statements += _rebuild(
+            sqlite,
+            "daily_grade_rollup",
+            _ROLLUP_COLUMNS_V2,
+            _ROLLUP_V2,
+            expressions={"grade": grade},
+        )
+    return statements
+
+
+def _query_indexes(sqlite: sqlite3.Connection) -> list[str]:
+    # Composite indexes for the per-user and per-location date queries and a
+    # covering index for problem aggregates; they lead with the column of the
+    # single-column indexes they replace
+    rollup = _ROLLUP_QUERY_INDEXES if _columns(sqlite, "daily_grade_rollup") else []
+    return [
+        *(f"DROP INDEX IF EXISTS {name}" for name in _REPLACED_INDEXES),
+        *_QUERY_INDEXES,
+        *rollup,
+        "ANALYZE",
+    ]
+
+
+def _drop_rollup_session_count(sqlite: sqlite3.Connection) -> list[str]:
+    # Per-grade session counts can't be summed per location, and sessions
+    # with no problems have no rollup row, so nothing could use them
+    if "session_count" not in _columns(sqlite, "daily_grade_rollup"):
+        return []
+    return ["ALTER TABLE daily_grade_rollup DROP COLUMN session_count"]
+
+
+MIGRATIONS: list[Migration] = [
+    _cascade_problem_deletes,
+    _grade_codes,
+    _query_indexes,
+    _drop_rollup_session_count,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def _apply(engine: Engine, migration: Migration, version: int) -> None:
+    # One transaction per migration, with foreign key checks off while
+    # tables are swapped
+    connection = engine.raw_connection()
+    try:
+        sqlite = connection.driver_connection
+        assert sqlite is not None
+        statements = migration(sqlite)
+        script = [
+            "PRAGMA foreign_keys=OFF",
+            "BEGIN",
+            *statements,
+            f"PRAGMA user_version={version}",
+            "COMMIT",
+        ]
+        try:
+            sqlite.executescript(";\n".join(script) + ";")
+        except Exception:
+            if sqlite.in_transaction:
+                sqlite.execute("ROLLBACK")
+            raise
+        finally:
+            sqlite.execute("PRAGMA foreign_keys=ON")
+    finally:
+        connection.close()
+
+
+def schema_version(engine: Engine) -> int:
+    with engine.connect() as conn:
+        return int(conn.exec_driver_sql("PRAGMA user_version").scalar_one())
+
+
+def _set_schema_version(engine: Engine, version: int) -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version={version}")
+
+
+def migrate(engine: Engine) -> int:
+    if engine.dialect.name != "sqlite":
+        Base.metadata.create_all(bind=engine)
+        return SCHEMA_VERSION
+
+    if not inspect(engine).has_table("sessions"):
+        Base.metadata.create_all(bind=engine)
+        _set_schema_version(engine, SCHEMA_VERSION)
+        return SCHEMA_VERSION
+
+    current = schema_version(engine)
+    for version, migration in enumerate(MIGRATIONS[current:], start=current + 1):
+        _apply(engine, migration, version)
+    Base.metadata.create_all(bind=engine)
+    return schema_version(engine)
@@ -1,10 +1,11 @@
 from datetime import date as date_type
 from datetime import datetime
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Date, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
+from .grades import DEFAULT_SCALES, GradeCode
 
 
 class Location(Base):
@@ -13,6 +14,13 @@ class Location(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String, unique=True, nullable=False)
     slug: Mapped[str] = mapped_column(String, unique=True, nullable=False, index=True)
+    # Comma-separated keys of the grade scales in grades.grade_registry
+    grade_scales: Mapped[str] = mapped_column(
+        String,
+        nullable=False,
+        default=",".join(DEFAULT_SCALES),
+        server_default=",".join(DEFAULT_SCALES),
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     sessions: Mapped[list["Session"]] = relationship(
@@ -43,13 +51,21 @@ class User(Base):
 
 class Session(Base):
     __tablename__ = "sessions"
+    # Every hot query filters on a user or a location, then ranges or sorts
+    # on date. SQLite appends the rowid (id) to every index entry, which
+    # also serves keyset pagination. These replace single-column indexes on
+    # user_id and location_id.
+    __table_args__ = (
+        Index("ix_sessions_user_id_date", "user_id", "date"),
+        Index("ix_sessions_location_id_date", "location_id", "date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("users.id"), nullable=False, index=True
+        Integer, ForeignKey("users.id"), nullable=False
     )
     location_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("locations.id"), nullable=False, index=True
+        Integer, ForeignKey("locations.id"), nullable=False
     )
     date: Mapped[date_type] = mapped_column(Date, default=date_type.today, index=True)
     rating: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -58,7 +74,10 @@ class Session(Base):
     user: Mapped["User"] = relationship("User", back_populates="sessions")
     location: Mapped["Location"] = relationship("Location", back_populates="sessions")
     problems: Mapped[list["Problem"]] = relationship(
-        "Problem", back_populates="session", cascade="all, delete-orphan"
+        "Problem",
+        back_populates="session",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     @property
@@ -68,15 +87,43 @@ class Session(Base):
 
 class Problem(Base):
     __tablename__ = "problems"
+    # Covers the stats queries, which join on session_id and read only
+    # these columns, without touching the table
+    __table_args__ = (
+        Index(
+            "ix_problems_session_id_grade_sends_attempts",
+            "session_id",
+            "grade",
+            "sends",
+            "attempts",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     session_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("sessions.id"), nullable=False, index=True
+        Integer,
+        ForeignKey("sessions.id", ondelete="CASCADE"),
+        nullable=False,
     )
-    grade: Mapped[str] = mapped_column(String, nullable=False)
+    grade: Mapped[str] = mapped_column(GradeCode, nullable=False)
     attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     sends: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     session: Mapped["Session"] = relationship("Session", back_populates="problems")
+
+
+class DailyGradeRollup(Base):
+    __tablename__ = "daily_grade_rollup"
+    # The primary key serves per-location reads; this serves a period
+    # across all locations
+    __table_args__ = (Index("ix_daily_grade_rollup_date", "date"),)
+
+    location_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("locations.id"), primary_key=True
+    )
+    date: Mapped[date_type] = mapped_column(Date, primary_key=True)
+    grade: Mapped[str] = mapped_column(GradeCode, primary_key=True)
+    sends: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,98 @@
+import threading
+import time
+from types import MappingProxyType
+from typing import NamedTuple
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import Location
+from .schemas import Location as LocationSchema
+from .versions import LOCATIONS, data_versions
+
+_location_list = TypeAdapter(list[LocationSchema])
+
+
+class _Snapshot(NamedTuple):
+    locations: tuple[LocationSchema, ...]
+    by_id: MappingProxyType[int, LocationSchema]
+    by_slug: MappingProxyType[str, LocationSchema]
+    json: bytes
+    loaded_at: float
+
+
+class LocationRegistry:
+    """Process-wide, immutable snapshot of the locations table.
+
+    Locations change about once a year, so lookups are served from memory
+    and the snapshot is swapped wholesale by `load` when one is created.
+    """
+
+    def __init__(self):
+        self._snapshot: _Snapshot | None = None
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> None:
+        rows = db.query(Location).order_by(Location.id).all()
+        locations = tuple(LocationSchema.model_validate(row) for row in rows)
+        snapshot = _Snapshot(
+            locations=locations,
+            by_id=MappingProxyType({loc.id: loc for loc in locations}),
+            by_slug=MappingProxyType({loc.slug: loc for loc in locations}),
+            json=_location_list.dump_json(list(locations)),
+            loaded_at=time.monotonic(),
+        )
+        with self._lock:
+            previous, self._snapshot = self._snapshot, snapshot
+        if previous is None or previous.json != snapshot.json:
+            data_versions.bump(LOCATIONS)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    def _get(self, db: Session) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.load(db)
+            snapshot = self._snapshot
+        assert snapshot is not None
+        return snapshot
+
+    def _refresh_on_miss(self, db: Session) -> _Snapshot | None:
+        # Locations seeded by another process (scripts/seed_locations.py)
+        # show up here, at most once per refresh interval
+        snapshot = self._get(db)
+        age = time.monotonic() - snapshot.loaded_at
+        if age < settings.location_registry_refresh_seconds:
+            return None
+        self.load(db)
+        return self._snapshot
+
+    def _get_nonempty(self, db: Session) -> _Snapshot:
+        snapshot = self._get(db)
+        if not snapshot.locations:
+            snapshot = self._refresh_on_miss(db) or snapshot
+        return snapshot
+
+    def all(self, db: Session) -> tuple[LocationSchema, ...]:
+        return self._get_nonempty(db).locations
+
+    def json(self, db: Session) -> bytes:
+        return self._get_nonempty(db).json
+
+    def by_id(self, db: Session, location_id: int) -> LocationSchema | None:
+        location = self._get(db).by_id.get(location_id)
+        if location is None and (snapshot := self._refresh_on_miss(db)):
+            location = snapshot.by_id.get(location_id)
+        return location
+
+    def by_slug(self, db: Session, slug: str) -> LocationSchema | None:
+        location = self._get(db).by_slug.get(slug)
+        if location is None and (snapshot := self._refresh_on_miss(db)):
+            location = snapshot.by_slug.get(slug)
+        return location
+
+
+location_registry = LocationRegistry()
@@ -0,0 +1,257 @@
+from datetime import date
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import async_crud
+from ..async_database import get_async_db
+from ..async_dependencies import get_current_user
+from ..schemas import (
+    ImportReport,
+    ProblemCreate,
+    ProblemIncrement,
+    ProblemUpdate,
+    SessionCreate,
+    SessionPage,
+    SessionUpdate,
+    User,
+)
+from ..schemas import Problem as ProblemSchema
+from ..schemas import Session as SessionSchema
+from ..streaming import NDJSON_MEDIA_TYPE, ndjson_response, wants_ndjson
+from ..timing import TimedRoute
+from ..versions import LOCATIONS, data_versions, not_modified, user_scope
+from . import sessions as sync_sessions
+
+router = APIRouter(route_class=TimedRoute)
+
+# Imports already stream the body and insert chunks off the event loop
+router.post("/import", response_model=ImportReport)(sync_sessions.import_sessions)
+
+
+@router.post("", response_model=SessionSchema, status_code=status.HTTP_201_CREATED)
+async def create_session(
+    session_data: SessionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    location = await async_crud.get_location_by_id(db, session_data.location_id)
+    if not location:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid location"
+        )
+
+    try:
+        return await async_crud.create_session(db, session_data, current_user.id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+
+
+@router.get(
+    "",
+    response_model=list[SessionSchema] | SessionPage,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def get_sessions(
+    request: Request,
+    response: Response,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    limit: int | None = Query(None, ge=1, le=200),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    if limit is not None or cursor is not None:
+        try:
+            items, next_cursor = await async_crud.get_sessions_page(
+                db,
+                user_id=current_user.id,
+                limit=limit or 50,
+                cursor=cursor,
+                location_id=location_id,
+                start_date=start_date,
+                end_date=end_date,
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+            ) from e
+        return SessionPage(items=items, next_cursor=next_cursor)
+
+    if wants_ndjson(request):
+        sessions = async_crud.iter_sessions(
+            db,
+            user_id=current_user.id,
+            location_id=location_id,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        return ndjson_response(session.model_dump_json() async for session in sessions)
+
+    etag = data_versions.etag(
+        user_scope(current_user.id),
+        LOCATIONS,
+        variant=(current_user.id, location_id, start_date, end_date),
+    )
+    if cached := not_modified(request, response, etag, private=True):
+        return cached
+
+    return await async_crud.get_sessions(
+        db,
+        user_id=current_user.id,
+        location_id=location_id,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+
+@router.get("/{session_id}", response_model=SessionSchema)
+async def get_session(
+    session_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    session = await async_crud.get_session_by_id(db, session_id, current_user.id)
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
+        )
+    return session
+
+
+@router.put("/{session_id}", response_model=SessionSchema)
+async def update_session(
+    session_id: int,
+    session_data: SessionUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    if session_data.location_id is not None and not (
+        await async_crud.get_location_by_id(db, session_data.location_id)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid location"
+        )
+
+    try:
+        session = await async_crud.update_session(
+            db, session_id, current_user.id, session_data
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
+        )
+    return session
+
+
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_session(
+    session_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    success = await async_crud.delete_session(db, session_id, current_user.id)
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
+        )
+    return None
+
+
+# Problem endpoints
+@router.post(
+    "/{session_id}/problems",
+    response_model=ProblemSchema,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_problem(
+    session_id: int,
+    problem_data: ProblemCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        problem = await async_crud.create_problem(
+            db, session_id, current_user.id, problem_data
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+    if not problem:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
+        )
+    return problem
+
+
+@router.put("/problems/{problem_id}", response_model=ProblemSchema)
+async def update_problem(
+    problem_id: int,
+    problem_data: ProblemUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        problem = await async_crud.update_problem(
+            db, problem_id, current_user.id, problem_data
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+    if not problem:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Problem not found"
+        )
+    return problem
+
+
+@router.post("/problems/{problem_id}/increment", response_model=ProblemSchema)
+async def increment_problem(
+    problem_id: int,
+    deltas: ProblemIncrement,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        problem = await async_crud.increment_problem(
+            db, problem_id, current_user.id, deltas
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
+    if not problem:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Problem not found"
+        )
+    return problem
+
+
+@router.delete("/problems/{problem_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_problem(
+    problem_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    success = await async_crud.delete_problem(db, problem_id, current_user.id)
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Problem not found"
+        )
+    return None
@@ -0,0 +1,120 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import async_crud, crud
+from ..async_database import get_async_db
+from ..async_dependencies import get_current_user
+from ..cache import stats_cache
+from ..schemas import ProgressFormat, User
+from ..streaming import NDJSON_MEDIA_TYPE, dump_line, ndjson_response, wants_ndjson
+from ..timing import TimedRoute
+from ..versions import GLOBAL, data_versions, location_scope, not_modified
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/user/progress")
+async def get_user_progress(
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    format: ProgressFormat = "expanded",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    rows = await async_crud.get_user_progress_counts(
+        db,
+        user_id=current_user.id,
+        location_id=location_id,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    return crud.format_progress(rows, format)
+
+
+@router.get("/user/distribution")
+async def get_user_distribution(
+    location_id: int | None = None,
+    period: str = "all",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    return await async_crud.get_user_distribution(
+        db, user_id=current_user.id, location_id=location_id, period=period
+    )
+
+
+@router.get("/location/{location_id}")
+async def get_location_stats(
+    location_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
+    etag = data_versions.etag(location_scope(location_id), variant=(location_id,))
+    if cached := not_modified(request, response, etag):
+        return cached
+
+    return await stats_cache.aget_or_set(
+        ("location", location_id),
+        lambda: async_crud.get_location_stats(db, location_id),
+    )
+
+
+@router.get("/aggregate")
+async def get_aggregate_stats(
+    request: Request,
+    response: Response,
+    period: str = "all",
+    location_id: int | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    scope = location_scope(location_id) if location_id else GLOBAL
+    # Other periods count back from today, so they change daily
+    today = None if period == "all" else date.today()
+    etag = data_versions.etag(scope, variant=(period, location_id, today))
+    if cached := not_modified(request, response, etag):
+        return cached
+
+    return await stats_cache.aget_or_set(
+        ("aggregate", location_id, period, date.today()),
+        lambda: async_crud.get_aggregate_stats(db, period, location_id),
+    )
+
+
+@router.get(
+    "/aggregate/progress", responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}}
+)
+async def get_aggregate_progress(
+    request: Request,
+    location_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    format: ProgressFormat = "expanded",
+    db: AsyncSession = Depends(get_async_db),
+):
+    streaming = wants_ndjson(request)
+    if streaming and format == "columns":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The columns format cannot be streamed",
+        )
+
+    # Rows are already one per (day, grade) from the rollup, so the async
+    # path reads them in one go and only streams the encoding
+    rows = await stats_cache.aget_or_set(
+        ("aggregate_progress", location_id, start_date, end_date),
+        lambda: async_crud.get_aggregate_progress_counts(
+            db,
+            location_id=location_id,
+            start_date=start_date,
+            end_date=end_date,
+        ),
+    )
+    if streaming:
+        if format == "counts":
+            return ndjson_response(dump_line(list(row)) for row in rows)
+        return ndjson_response(dump_line(item) for item in crud.expand_progress(rows))
+    return crud.format_progress(rows, format)
@@ -1,24 +1,34 @@
 from datetime import timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from .. import crud
-from ..auth import authenticate_user, create_access_token
+from ..auth import create_access_token
 from ..config import settings
-from ..database import get_db
+from ..database import get_read_db, get_write_db
 from ..dependencies import get_current_user
-from ..models import User
+from ..hashing import password_hasher
 from ..schemas import Token, UserCreate, UserUpdate
 from ..schemas import User as UserSchema
+from ..timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/register", response_model=Token)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_username(db, username=user.username)
+async def register(
+    user: UserCreate,
+    read_db: Session = Depends(get_read_db),
+    db: Session = Depends(get_write_db),
+):
+    # bcrypt runs on its own pool; the quick queries go to the threadpool.
+    # Lookups use the read pool so the writer is only taken for the insert.
+    db_user = await run_in_threadpool(
+        crud.get_user_by_username, read_db, username=user.username
+    )
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,7 +38,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     # If no home_location_id provided, use the first location as default
     home_location_id = user.home_location_id
     if home_location_id is None:
-        locations = crud.get_locations(db)
+        locations = await run_in_threadpool(crud.get_locations, read_db)
         if not locations:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -37,17 +47,21 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         home_location_id = locations[0].id
     else:
         # Validate provided location exists
-        db_location = crud.get_location_by_id(db, home_location_id)
+        db_location = await run_in_threadpool(
+            crud.get_location_by_id, read_db, home_location_id
+        )
         if not db_location:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid home location",
             )
 
-    new_user = crud.create_user(
+    password_hash = await password_hasher.hash(user.password)
+    new_user = await run_in_threadpool(
+        crud.create_user_with_hash,
         db,
         username=user.username,
-        password=user.password,
+        password_hash=password_hash,
         home_location_id=home_location_id,
     )
 
@@ -60,11 +74,14 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-def login(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_read_db),
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+    user = await run_in_threadpool(crud.get_user_by_username, db, form_data.username)
+    if not user or not await password_hasher.verify(
+        form_data.password, user.password_hash
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -80,15 +97,15 @@ def login(
 
 
 @router.get("/me", response_model=UserSchema)
-def read_users_me(current_user: User = Depends(get_current_user)):
+def read_users_me(current_user: UserSchema = Depends(get_current_user)):
     return current_user
 
 
 @router.patch("/me", response_model=UserSchema)
 def update_user_settings(
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: UserSchema = Depends(get_current_user),
+    db: Session = Depends(get_write_db),
 ):
     # Validate home_location_id if provided
     if user_data.home_location_id is not None:
@@ -1,20 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 
 from .. import crud
-from ..database import get_db
+from ..database import get_read_db
+from ..registry import location_registry
 from ..schemas import Location
+from ..timing import TimedRoute
+from ..versions import LOCATIONS, data_versions, not_modified
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("", response_model=list[Location])
-def get_locations(db: Session = Depends(get_db)):
-    return crud.get_locations(db)
+def get_locations(
+    request: Request, response: Response, db: Session = Depends(get_read_db)
+):
+    if cached := not_modified(request, response, data_versions.etag(LOCATIONS)):
+        return cached
+    # Serve the registry's pre-serialized body instead of re-encoding the list
+    return Response(
+        content=location_registry.json(db),
+        media_type="application/json",
+        headers={"ETag": response.headers["ETag"]},
+    )
 
 
 @router.get("/{slug}", response_model=Location)
-def get_location(slug: str, db: Session = Depends(get_db)):
+def get_location(slug: str, db: Session = Depends(get_read_db)):
     location = crud.get_location_by_slug(db, slug=slug)
     if not location:
         raise HTTPException(
@@ -4,14 +4,15 @@ from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 
 from .. import crud
-from ..database import get_db
+from ..database import get_read_db
+from ..timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/", response_class=HTMLResponse)
-async def index(request: Request, db: Session = Depends(get_db)):
+async def index(request: Request, db: Session = Depends(get_read_db)):
     stats = crud.get_aggregate_stats(db, period="week")
     locations = crud.get_locations(db)
     return templates.TemplateResponse(
@@ -25,7 +26,7 @@ async def login_page(request: Request):
 
 
 @router.get("/register", response_class=HTMLResponse)
-async def register_page(request: Request, db: Session = Depends(get_db)):
+async def register_page(request: Request, db: Session = Depends(get_read_db)):
     locations = crud.get_locations(db)
     return templates.TemplateResponse(
         "register.html", {"request": request, "locations": locations}
@@ -33,7 +34,7 @@ async def register_page(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard_page(request: Request, db: Session = Depends(get_db)):
+async def dashboard_page(request: Request, db: Session = Depends(get_read_db)):
     locations = crud.get_locations(db)
     return templates.TemplateResponse(
         "dashboard.html", {"request": request, "locations": locations}
@@ -41,7 +42,9 @@ async def dashboard_page(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/location/{slug}", response_class=HTMLResponse)
-async def location_page(request: Request, slug: str, db: Session = Depends(get_db)):
+async def location_page(
+    request: Request, slug: str, db: Session = Depends(get_read_db)
+):
     location = crud.get_location_by_slug(db, slug)
     if not location:
         return templates.TemplateResponse(
@@ -1,58 +1,193 @@
 from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from .. import crud
-from ..database import get_db
+from .. import crud, importer
+from ..config import settings
+from ..counter_buffer import counter_buffer
+from ..database import get_read_db, get_write_db
 from ..dependencies import get_current_user
-from ..models import User
+from ..schemas import (
+    ImportReport,
+    ProblemCreate,
+    ProblemIncrement,
+    ProblemUpdate,
+    SessionCreate,
+    SessionPage,
+    SessionUpdate,
+    User,
+)
 from ..schemas import Problem as ProblemSchema
-from ..schemas import ProblemCreate, ProblemUpdate, SessionCreate, SessionUpdate
 from ..schemas import Session as SessionSchema
+from ..streaming import NDJSON_MEDIA_TYPE, ndjson_response, wants_ndjson
+from ..timing import TimedRoute
+from ..versions import LOCATIONS, data_versions, not_modified, user_scope
+from ..write_pipeline import run_write
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("", response_model=SessionSchema, status_code=status.HTTP_201_CREATED)
 def create_session(
     session_data: SessionCreate,
-    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_user),
 ):
-    location = crud.get_location_by_id(db, session_data.location_id)
+    location = crud.get_location_by_id(read_db, session_data.location_id)
     if not location:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid location"
         )
 
-    return crud.create_session(db, session_data, current_user.id)
+    try:
+        return run_write(
+            db, crud.create_session, session_data, current_user.id, schema=SessionSchema
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+
+
+@router.post(
+    "/import",
+    response_model=ImportReport,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {importer.CSV_MEDIA_TYPE: {}, NDJSON_MEDIA_TYPE: {}},
+        }
+    },
+)
+async def import_sessions(
+    request: Request,
+    read_db: Session = Depends(get_read_db),
+    db: Session = Depends(get_write_db),
+    current_user: User = Depends(get_current_user),
+):
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if media_type == importer.CSV_MEDIA_TYPE:
+        parse = importer.parse_csv
+    elif media_type == NDJSON_MEDIA_TYPE:
+        parse = importer.parse_ndjson
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Send {importer.CSV_MEDIA_TYPE} or {NDJSON_MEDIA_TYPE}",
+        )
+
+    # Rows are validated as the body streams in and inserted a chunk at a
+    # time; caches and ETags are invalidated once, after the last chunk
+    try:
+        return await importer.import_sessions(
+            parse(importer.iter_lines(request.stream())),
+            check_session=lambda session: crud.session_errors(read_db, session),
+            insert_chunk=lambda chunk: run_in_threadpool(
+                crud.import_sessions, db, chunk, current_user.id
+            ),
+            chunk_size=settings.import_chunk_size,
+            on_imported=lambda location_ids: crud.stats_written(
+                current_user.id, location_ids
+            ),
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
 
 
-@router.get("", response_model=list[SessionSchema])
+@router.get(
+    "",
+    response_model=list[SessionSchema] | SessionPage,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
 def get_sessions(
+    request: Request,
+    response: Response,
     location_id: int | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
-    db: Session = Depends(get_db),
+    limit: int | None = Query(None, ge=1, le=200),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    return crud.get_sessions(
-        db,
-        user_id=current_user.id,
-        location_id=location_id,
-        start_date=start_date,
-        end_date=end_date,
+    # Paginated responses are opt-in so existing clients keep getting a list
+    if limit is not None or cursor is not None:
+        try:
+            items, next_cursor = counter_buffer.read_session(
+                lambda: crud.get_sessions_page(
+                    db,
+                    user_id=current_user.id,
+                    limit=limit or 50,
+                    cursor=cursor,
+                    location_id=location_id,
+                    start_date=start_date,
+                    end_date=end_date,
+                )
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+            ) from e
+        return SessionPage(
+            items=[SessionSchema.model_validate(item) for item in items],
+            next_cursor=next_cursor,
+        )
+
+    if wants_ndjson(request):
+        sessions = crud.iter_sessions(
+            db,
+            user_id=current_user.id,
+            location_id=location_id,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        return ndjson_response(
+            SessionSchema.model_validate(session).model_dump_json()
+            for session in sessions
+        )
+
+    # Sessions embed location names, so location changes also invalidate
+    etag = data_versions.etag(
+        user_scope(current_user.id),
+        LOCATIONS,
+        variant=(current_user.id, location_id, start_date, end_date),
+    )
+    if cached := not_modified(request, response, etag, private=True):
+        return cached
+
+    return counter_buffer.read_session(
+        lambda: crud.get_sessions(
+            db,
+            user_id=current_user.id,
+            location_id=location_id,
+            start_date=start_date,
+            end_date=end_date,
+        )
     )
 
 
 @router.get("/{session_id}", response_model=SessionSchema)
 def get_session(
     session_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    session = crud.get_session_by_id(db, session_id, current_user.id)
+    session = counter_buffer.read_session(
+        lambda: crud.get_session_by_id(db, session_id, current_user.id)
+    )
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
@@ -64,10 +199,32 @@ def get_session(
 def update_session(
     session_id: int,
     session_data: SessionUpdate,
-    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_user),
 ):
-    session = crud.update_session(db, session_id, current_user.id, session_data)
+    if session_data.location_id is not None and not crud.get_location_by_id(
+        read_db, session_data.location_id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid location"
+        )
+
+    try:
+        session = counter_buffer.update_session(
+            lambda: run_write(
+                db,
+                crud.update_session,
+                session_id,
+                current_user.id,
+                session_data,
+                schema=SessionSchema,
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
@@ -78,10 +235,17 @@ def update_session(
 @router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_session(
     session_id: int,
-    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_user),
 ):
-    success = crud.delete_session(db, session_id, current_user.id)
+    problem_ids = []
+    if counter_buffer.running:
+        problem_ids = crud.get_problem_ids(read_db, session_id)
+    success = counter_buffer.delete(
+        problem_ids,
+        lambda: run_write(db, crud.delete_session, session_id, current_user.id),
+    )
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
@@ -98,10 +262,22 @@ def delete_session(
 def create_problem(
     session_id: int,
     problem_data: ProblemCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_user),
 ):
-    problem = crud.create_problem(db, session_id, current_user.id, problem_data)
+    try:
+        problem = run_write(
+            db,
+            crud.create_problem,
+            session_id,
+            current_user.id,
+            problem_data,
+            schema=ProblemSchema,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
     if not problem:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Session not found"
@@ -113,10 +289,58 @@ def create_problem(
 def update_problem(
     problem_id: int,
     problem_data: ProblemUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_user),
 ):
-    problem = crud.update_problem(db, problem_id, current_user.id, problem_data)
+    try:
+        problem = counter_buffer.update_problem(
+            problem_id,
+            lambda: run_write(
+                db,
+                crud.update_problem,
+                problem_id,
+                current_user.id,
+                problem_data,
+                schema=ProblemSchema,
+            ),
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+    if not problem:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Problem not found"
+        )
+    return problem
+
+
+@router.post("/problems/{problem_id}/increment", response_model=ProblemSchema)
+def increment_problem(
+    problem_id: int,
+    deltas: ProblemIncrement,
+    read_db: Session = Depends(get_read_db),
+    db: Session = Depends(get_write_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        if counter_buffer.running:
+            problem = counter_buffer.increment(
+                lambda: crud.get_problem(read_db, problem_id, current_user.id),
+                current_user.id,
+                deltas,
+            )
+        else:
+            problem = run_write(
+                db,
+                crud.increment_problem,
+                problem_id,
+                current_user.id,
+                deltas,
+                schema=ProblemSchema,
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     if not problem:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Problem not found"
@@ -127,10 +351,13 @@ def update_problem(
 @router.delete("/problems/{problem_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_problem(
     problem_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_user),
 ):
-    success = crud.delete_problem(db, problem_id, current_user.id)
+    success = counter_buffer.delete(
+        [problem_id],
+        lambda: run_write(db, crud.delete_problem, problem_id, current_user.id),
+    )
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Problem not found"
@@ -1,14 +1,18 @@
 from datetime import date
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 
 from .. import crud
-from ..database import get_db
+from ..cache import stats_cache
+from ..database import get_read_db
 from ..dependencies import get_current_user
-from ..models import User
+from ..schemas import ProgressFormat, User
+from ..streaming import NDJSON_MEDIA_TYPE, dump_line, ndjson_response, wants_ndjson
+from ..timing import TimedRoute
+from ..versions import GLOBAL, data_versions, location_scope, not_modified
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/user/progress")
@@ -16,23 +20,25 @@ def get_user_progress(
     location_id: int | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
-    db: Session = Depends(get_db),
+    format: ProgressFormat = "expanded",
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    return crud.get_user_progress(
+    rows = crud.get_user_progress_counts(
         db,
         user_id=current_user.id,
         location_id=location_id,
         start_date=start_date,
         end_date=end_date,
     )
+    return crud.format_progress(rows, format)
 
 
 @router.get("/user/distribution")
 def get_user_distribution(
     location_id: int | None = None,
     period: str = "all",
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     return crud.get_user_distribution(
@@ -41,29 +47,78 @@ def get_user_distribution(
 
 
 @router.get("/location/{location_id}")
-def get_location_stats(location_id: int, db: Session = Depends(get_db)):
-    return crud.get_location_stats(db, location_id)
+def get_location_stats(
+    location_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+):
+    etag = data_versions.etag(location_scope(location_id), variant=(location_id,))
+    if cached := not_modified(request, response, etag):
+        return cached
+
+    return stats_cache.get_or_set(
+        ("location", location_id),
+        lambda: crud.get_location_stats(db, location_id),
+    )
 
 
 @router.get("/aggregate")
 def get_aggregate_stats(
+    request: Request,
+    response: Response,
     period: str = "all",
     location_id: int | None = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    return crud.get_aggregate_stats(db, period, location_id)
+    scope = location_scope(location_id) if location_id else GLOBAL
+    # Other periods count back from today, so they change daily
+    today = None if period == "all" else date.today()
+    etag = data_versions.etag(scope, variant=(period, location_id, today))
+    if cached := not_modified(request, response, etag):
+        return cached
+
+    # Periods are relative to today, so the date is part of the key
+    return stats_cache.get_or_set(
+        ("aggregate", location_id, period, date.today()),
+        lambda: crud.get_aggregate_stats(db, period, location_id),
+    )
 
 
-@router.get("/aggregate/progress")
+@router.get(
+    "/aggregate/progress", responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}}
+)
 def get_aggregate_progress(
+    request: Request,
     location_id: int | None = None,
     start_date: date | None = None,
     end_date: date | None = None,
-    db: Session = Depends(get_db),
+    format: ProgressFormat = "expanded",
+    db: Session = Depends(get_read_db),
 ):
-    return crud.get_aggregate_progress(
-        db,
-        location_id=location_id,
-        start_date=start_date,
-        end_date=end_date,
+    if wants_ndjson(request):
+        if format == "columns":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The columns format cannot be streamed",
+            )
+        counts = crud.iter_aggregate_progress_counts(
+            db,
+            location_id=location_id,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        if format == "counts":
+            return ndjson_response(dump_line(list(row)) for row in counts)
+        return ndjson_response(dump_line(item) for item in crud.expand_progress(counts))
+
+    rows = stats_cache.get_or_set(
+        ("aggregate_progress", location_id, start_date, end_date),
+        lambda: crud.get_aggregate_progress_counts(
+            db,
+            location_id=location_id,
+            start_date=start_date,
+            end_date=end_date,
+        ),
     )
+    return crud.format_progress(rows, format)
@@ -1,9 +1,14 @@
 from datetime import date as date_type
 from datetime import datetime
+from typing import Literal
 
 from better_profanity import profanity  # type: ignore[import-untyped]
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
+from .grades import DEFAULT_SCALES, grade_registry
+
+ProgressFormat = Literal["expanded", "counts", "columns"]
+
 
 class Token(BaseModel):
     access_token: str
@@ -12,6 +17,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: str
+    exp: int | None = None
 
 
 class UserBase(BaseModel):
@@ -47,16 +53,24 @@ class UserUpdate(BaseModel):
     @field_validator("default_grade")
     @classmethod
     def grade_valid(cls, v: str | None) -> str | None:
-        if v is not None:
-            valid_grades = ["VB", "V0", "V3", "V4-V6", "V6-V8", "V7-V10"]
-            if v not in valid_grades:
-                raise ValueError(f"Grade must be one of: {', '.join(valid_grades)}")
-        return v
+        return v if v is None else grade_registry.validate(v)
 
 
 class LocationBase(BaseModel):
     name: str
     slug: str
+    grade_scales: list[str] = Field(default_factory=lambda: list(DEFAULT_SCALES))
+
+    @field_validator("grade_scales", mode="before")
+    @classmethod
+    def split_scales(cls, v):
+        # Stored comma-separated
+        return v.split(",") if isinstance(v, str) else v
+
+    @field_validator("grade_scales")
+    @classmethod
+    def scales_valid(cls, v: list[str]) -> list[str]:
+        return grade_registry.validate_scales(v)
 
 
 class LocationCreate(LocationBase):
@@ -79,10 +93,7 @@ class ProblemBase(BaseModel):
     @field_validator("grade")
     @classmethod
     def grade_valid(cls, v: str) -> str:
-        valid_grades = ["VB", "V0", "V3", "V4-V6", "V6-V8", "V7-V10"]
-        if v not in valid_grades:
-            raise ValueError(f"Grade must be one of: {', '.join(valid_grades)}")
-        return v
+        return grade_registry.validate(v)
 
 
 class ProblemCreate(ProblemBase):
@@ -98,11 +109,13 @@ class ProblemUpdate(BaseModel):
     @field_validator("grade")
     @classmethod
     def grade_valid(cls, v: str | None) -> str | None:
-        if v is not None:
-            valid_grades = ["VB", "V0", "V3", "V4-V6", "V6-V8", "V7-V10"]
-            if v not in valid_grades:
-                raise ValueError(f"Grade must be one of: {', '.join(valid_grades)}")
-        return v
+        return v if v is None else grade_registry.validate(v)
+
+
+class ProblemIncrement(BaseModel):
+    # Deltas, not totals; negative values undo a mistaken tap
+    attempts: int = 0
+    sends: int = 0
 
 
 class Problem(ProblemBase):
@@ -123,6 +136,21 @@ class SessionCreate(SessionBase):
     problems: list[ProblemCreate] = Field(default_factory=list)
 
 
+class ImportRowError(BaseModel):
+    row: int
+    errors: list[str]
+
+
+class ImportReport(BaseModel):
+    imported_sessions: int = 0
+    imported_problems: int = 0
+    skipped_sessions: int = 0
+    errors: list[ImportRowError] = Field(default_factory=list)
+    errors_truncated: bool = False
+    # Set when the upload became unreadable after some chunks were imported
+    stopped: str | None = None
+
+
 class SessionUpdate(BaseModel):
     location_id: int | None = None
     date: date_type | None = None
@@ -137,3 +165,8 @@ class Session(SessionBase):
     location_name: str
     problems: list[Problem]
     created_at: datetime
+
+
+class SessionPage(BaseModel):
+    items: list[Session]
+    next_cursor: str | None = None
@@ -0,0 +1,56 @@
+import json
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Flush roughly this many bytes per chunk rather than one write per line
+CHUNK_SIZE = 64 * 1024
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def dump_line(item) -> str:
+    return json.dumps(item, separators=(",", ":"))
+
+
+def _chunks(lines: Iterable[str]) -> Iterator[str]:
+    buffer: list[str] = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        buffer.append("\n")
+        size += len(line) + 1
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+async def _achunks(lines: AsyncIterable[str]) -> AsyncIterator[str]:
+    buffer: list[str] = []
+    size = 0
+    async for line in lines:
+        buffer.append(line)
+        buffer.append("\n")
+        size += len(line) + 1
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def ndjson_response(lines: Iterable[str] | AsyncIterable[str]) -> StreamingResponse:
+    # `lines` should be lazy (e.g. backed by a yield_per query) so that
+    # memory stays flat however many rows are streamed
+    if isinstance(lines, AsyncIterable):
+        return StreamingResponse(_achunks(lines), media_type=NDJSON_MEDIA_TYPE)
+    return StreamingResponse(_chunks(lines), media_type=NDJSON_MEDIA_TYPE)
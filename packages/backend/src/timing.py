@@ -0,0 +1,225 @@
+"""Per-request timings, sent back in a Server-Timing header and logged.
+
+ServerTimingMiddleware gives each request a RequestTiming in a context
+variable. Sync routes and dependencies run in threadpool copies of that
+context and share the same object. Everything else records into it:
+
+- `db`: cursor-execute hooks on every engine (see `instrument_engine`),
+  with the statement count as its description;
+- `auth`: `get_current_user` and bcrypt hashing;
+- `serialize`: from the endpoint returning to the response being built.
+  That covers response-model validation and JSON encoding. It needs the
+  router's `route_class=TimedRoute`;
+- `total`: from the request arriving until its headers are sent.
+
+Phases overlap: the users lookup inside `auth` is also `db` time. Writes
+run by the write pipeline or the counter buffer flush happen on their own
+threads and aren't attributed to any request. Streamed bodies are
+produced after the headers, so their time only shows in the log line.
+"""
+
+import functools
+import inspect
+import logging
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import metrics
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.phases_ms = {"db": 0.0, "auth": 0.0, "serialize": 0.0}
+        self.endpoint_done: float | None = None
+
+    def add(self, phase: str, ms: float) -> None:
+        self.phases_ms[phase] += ms
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def header(self) -> str:
+        db = f'db;dur={self.phases_ms["db"]:.1f};desc="{self.statements} queries"'
+        others = [
+            f"{phase};dur={ms:.1f}"
+            for phase, ms in self.phases_ms.items()
+            if phase != "db"
+        ]
+        return ", ".join([db, *others, f"total;dur={self.elapsed_ms():.1f}"])
+
+
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+def current() -> RequestTiming | None:
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    timing = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing is not None:
+            timing.add(name, (time.perf_counter() - start) * 1000)
+
+
+def instrument_engine(engine: Engine) -> None:
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._timing_start = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        timing = _current.get()
+        if timing is not None:
+            timing.statements += 1
+            timing.add("db", (time.perf_counter() - context._timing_start) * 1000)
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+
+
+def _mark_return(endpoint: Callable) -> Callable:
+    # Records when the endpoint hands its result back to FastAPI
+    def done() -> None:
+        timing = _current.get()
+        if timing is not None:
+            timing.endpoint_done = time.perf_counter()
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                done()
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            done()
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """Route that times serialization of the endpoint's result."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _mark_return(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timing = _current.get()
+            if timing is not None and timing.endpoint_done is not None:
+                ms = (time.perf_counter() - timing.endpoint_done) * 1000
+                timing.add("serialize", ms)
+            return response
+
+        return timed_handler
+
+
+class RequestStats:
+    def __init__(self):
+        self.statements = metrics.Histogram(STATEMENT_BUCKETS)
+        self.db_ms = metrics.Histogram()
+        self.total_ms = metrics.Histogram()
+
+    def observe(self, timing: RequestTiming, total_ms: float) -> None:
+        self.statements.observe(timing.statements)
+        self.db_ms.observe(timing.phases_ms["db"])
+        self.total_ms.observe(total_ms)
+
+    def stats(self) -> dict:
+        return {
+            "statements": self.statements.stats(),
+            "db_ms": self.db_ms.stats(),
+            "total_ms": self.total_ms.stats(),
+        }
+
+
+request_stats = RequestStats()
+metrics.register("requests", request_stats.stats)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.server_timing_header:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timing.header())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total_ms = timing.elapsed_ms()
+            request_stats.observe(timing, total_ms)
+            _log(scope, status_code, timing, total_ms)
+
+
+def _log(scope: Scope, status_code: int, timing: RequestTiming, total_ms: float):
+    # Every request at DEBUG; WARNING past the statement budget, which is
+    # where an N+1 query shows up
+    limit = settings.request_statement_warning
+    level = logging.WARNING if timing.statements > limit else logging.DEBUG
+    if not logger.isEnabledFor(level):
+        return
+    phases = " ".join(f"{name}={ms:.1f}ms" for name, ms in timing.phases_ms.items())
+    logger.log(
+        level,
+        "%s %s %d total=%.1fms %s statements=%d",
+        scope["method"],
+        scope["path"],
+        status_code,
+        total_ms,
+        phases,
+        timing.statements,
+        extra={
+            "method": scope["method"],
+            "path": scope["path"],
+            "status_code": status_code,
+            "total_ms": round(total_ms, 3),
+            "statements": timing.statements,
+            **{f"{name}_ms": round(ms, 3) for name, ms in timing.phases_ms.items()},
+        },
+    )
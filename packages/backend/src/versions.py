@@ -0,0 +1,73 @@
+import hashlib
+import secrets
+import threading
+from collections.abc import Hashable
+
+from fastapi import Request, Response, status
+
+# Scopes: GLOBAL covers every session write, LOCATIONS the location list,
+# ("location", id) and ("user", id) the writes touching that location/user
+GLOBAL = "global"
+LOCATIONS = "locations"
+
+
+def location_scope(location_id: int) -> tuple[str, int]:
+    return ("location", location_id)
+
+
+def user_scope(user_id: int) -> tuple[str, int]:
+    return ("user", user_id)
+
+
+class DataVersions:
+    """Monotonic per-scope counters bumped by writes, used to derive ETags."""
+
+    def __init__(self):
+        # Counters restart with the process, so tags carry a per-process epoch
+        self.epoch = secrets.token_hex(4)
+        self._versions: dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: Hashable) -> int:
+        return self._versions.get(scope, 0)
+
+    def bump(self, *scopes: Hashable) -> None:
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def etag(self, *scopes: Hashable, variant: tuple = ()) -> str:
+        # `variant` holds whatever else picks the response (the user, query
+        # parameters, today's date), so different responses never share a
+        # tag even when their counters agree
+        parts = [self.epoch, *(str(self.get(scope)) for scope in scopes)]
+        if variant:
+            digest = hashlib.blake2b(repr(variant).encode(), digest_size=8)
+            parts.append(digest.hexdigest())
+        return '"' + "-".join(parts) + '"'
+
+
+data_versions = DataVersions()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(
+    request: Request, response: Response, etag: str, private: bool = False
+) -> Response | None:
+    # Call before doing any work: on a match the caller returns the 304
+    # as-is, otherwise the ETag is attached to the normal response.
+    # `private` marks per-user responses so shared caches don't keep them
+    headers = {"ETag": etag}
+    if private:
+        headers |= {"Cache-Control": "private", "Vary": "Authorization"}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,178 @@
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any, NamedTuple
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import metrics
+from .config import settings
+from .database import SessionLocal
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class _Job(NamedTuple):
+    fn: Callable[..., Any]
+    args: tuple
+    schema: type[BaseModel] | None
+    future: Future
+    enqueued_at: float
+
+
+class WritePipeline:
+    """Group commit: one thread runs queued mutations in shared transactions.
+
+    Jobs arriving within `max_delay_ms` of each other are executed in one
+    transaction and committed together, so a burst of writes costs one fsync
+    instead of one each. A job that raises fails only its own caller: the
+    batch is rolled back and the remaining jobs are re-run without it.
+    """
+
+    def __init__(
+        self, session_factory: sessionmaker, max_batch: int, max_delay_ms: float
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue: queue.Queue[_Job | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self.batch_size = metrics.Histogram(BATCH_SIZE_BUCKETS)
+        self.latency_ms = metrics.Histogram()
+        self.commit_ms = metrics.Histogram()
+        self.retries = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="write-pipeline", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        # Jobs queued before the sentinel are still committed
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        schema: type[BaseModel] | None = None,
+    ) -> Future:
+        # `fn(db, *args)` runs on the pipeline's session; `schema` converts
+        # its result before commit expires the ORM objects
+        future: Future = Future()
+        self._queue.put(_Job(fn, args, schema, future, time.perf_counter()))
+        return future
+
+    def _run(self) -> None:
+        while not self._stopping:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._execute(self._collect(job))
+
+    def _collect(self, first: _Job) -> list[_Job]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                job = (
+                    self._queue.get(timeout=timeout)
+                    if timeout > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if job is None:
+                self._stopping = True
+                break
+            batch.append(job)
+        return batch
+
+    def _execute(self, pending: list[_Job]) -> None:
+        while pending:
+            db = self.session_factory()
+            db.info["deferred_commit"] = True
+            done: list[tuple[_Job, Any, list]] = []
+            failed: _Job | None = None
+            try:
+                for job in pending:
+                    db.info["after_commit"] = []
+                    try:
+                        result = job.fn(db, *job.args)
+                        if job.schema is not None and result is not None:
+                            result = job.schema.model_validate(result)
+                    except Exception as e:
+                        job.future.set_exception(e)
+                        failed = job
+                        break
+                    done.append((job, result, db.info["after_commit"]))
+
+                if failed is not None:
+                    db.rollback()
+                    self.retries += 1
+                    pending = [job for job in pending if job is not failed]
+                    continue
+
+                start = time.perf_counter()
+                db.commit()
+                self.commit_ms.observe((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                db.rollback()
+                for job in pending:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                return
+            finally:
+                db.close()
+
+            self.batch_size.observe(len(done))
+            for job, result, after_commit in done:
+                for hook in after_commit:
+                    hook()
+                job.future.set_result(result)
+                self.latency_ms.observe((time.perf_counter() - job.enqueued_at) * 1000)
+            return
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "retries": self.retries,
+            "batch_size": self.batch_size.stats(),
+            "latency_ms": self.latency_ms.stats(),
+            "commit_ms": self.commit_ms.stats(),
+        }
+
+
+write_pipeline = WritePipeline(
+    SessionLocal,
+    max_batch=settings.write_pipeline_max_batch,
+    max_delay_ms=settings.write_pipeline_max_delay_ms,
+)
+metrics.register("write_pipeline", write_pipeline.stats)
+
+
+def run_write(
+    db: Session,
+    fn: Callable[..., Any],
+    *args,
+    schema: type[BaseModel] | None = None,
+) -> Any:
+    if write_pipeline.running:
+        return write_pipeline.submit(fn, *args, schema=schema).result()
+    return fn(db, *args)
@@ -4,11 +4,13 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from src.database import Base, get_db
+from src.cache import identity_cache, stats_cache, token_cache
+from src.database import Base, configure_sqlite, get_read_db, get_write_db
 from src.main import app
 
 # Import all models to ensure they're registered with Base.metadata
 from src.models import Location, Session, User  # noqa: F401
+from src.registry import location_registry
 
 
 @pytest.fixture(scope="session")
@@ -19,6 +21,7 @@ def test_engine():
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+    configure_sqlite(engine, {"foreign_keys": "ON"})
     yield engine
     engine.dispose()
 
@@ -42,6 +45,11 @@ def setup_database(test_engine, TestingSessionLocal):
     db.commit()
     db.close()
 
+    stats_cache.clear()
+    identity_cache.clear()
+    token_cache.clear()
+    location_registry.clear()
+
     # Override the dependency
     def override_get_db():
         try:
@@ -50,7 +58,8 @@ def setup_database(test_engine, TestingSessionLocal):
         finally:
             db.close()
 
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_write_db] = override_get_db
 
     yield
 
@@ -63,3 +72,19 @@ def setup_database(test_engine, TestingSessionLocal):
 def client():
     """Create a test client."""
     return TestClient(app)
+
+
+@pytest.fixture
+def auth_token(client):
+    """Register a user and return their access token."""
+    response = client.post(
+        "/auth/register",
+        json={"username": "testuser", "password": "password123", "home_location_id": 1},
+    )
+    return response.json()["access_token"]
+
+
+@pytest.fixture
+def auth_headers(auth_token):
+    """Authorization header for the `auth_token` user."""
+    return {"Authorization": f"Bearer {auth_token}"}
@@ -1,15 +1,3 @@
-import pytest
-
-
-@pytest.fixture
-def auth_token(client):
-    response = client.post(
-        "/auth/register",
-        json={"username": "testuser", "password": "password123", "home_location_id": 1},
-    )
-    return response.json()["access_token"]
-
-
 def test_get_locations(client):
     response = client.get("/locations")
     assert response.status_code == 200
@@ -115,3 +103,103 @@ def test_aggregate_stats(client, auth_token):
     assert data["total_climbs"] >= 1
     assert "by_location" in data
     assert "grade_distribution" in data
+
+
+def test_aggregate_stats_sums_by_grade(client, auth_token):
+    from datetime import date
+
+    for problems in (
+        [{"grade": "V3", "attempts": 3, "sends": 2}],
+        [
+            {"grade": "V3", "attempts": 4, "sends": 1},
+            {"grade": "VB", "attempts": 2, "sends": 0},
+        ],
+        [],
+    ):
+        client.post(
+            "/sessions",
+            json={"location_id": 1, "date": str(date.today()), "problems": problems},
+            headers={"Authorization": f"Bearer {auth_token}"},
+        )
+
+    data = client.get("/stats/aggregate").json()
+    assert data["total_climbs"] == 9
+    assert data["grade_distribution"] == {"V3": 3, "VB": 0}
+    assert data["by_location"] == [{"location_id": 1, "name": "Test Gym", "count": 3}]
+
+    location_data = client.get("/stats/location/1").json()
+    assert location_data == {
+        "total_climbs": 9,
+        "grade_distribution": {"V3": 3, "VB": 0},
+    }
+
+    distribution = client.get(
+        "/stats/user/distribution?period=week",
+        headers={"Authorization": f"Bearer {auth_token}"},
+    ).json()
+    assert distribution == {"V3": 3, "VB": 0}
+
+
+def test_progress_formats(client, auth_token):
+    from datetime import date
+
+    today = str(date.today())
+    client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": today,
+            "problems": [
+                {"grade": "V3", "attempts": 3, "sends": 2},
+                {"grade": "VB", "attempts": 1, "sends": 0},
+                {"grade": "V3", "attempts": 1, "sends": 1},
+            ],
+        },
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+    expanded = client.get("/stats/aggregate/progress").json()
+    assert expanded == [{"date": today, "grade": "V3"}] * 3
+
+    counts = client.get("/stats/aggregate/progress?format=counts").json()
+    assert counts == [[today, "V3", 3]]
+
+    columns = client.get(
+        "/stats/user/progress?format=columns",
+        headers={"Authorization": f"Bearer {auth_token}"},
+    ).json()
+    assert columns == {"date": [today], "grade": ["V3"], "count": [3]}
+
+    response = client.get("/stats/aggregate/progress?format=bogus")
+    assert response.status_code == 422
+
+
+def test_aggregate_progress_ndjson_stream(client, auth_token):
+    import json
+    from datetime import date
+
+    today = str(date.today())
+    client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": today,
+            "problems": [{"grade": "V3", "attempts": 3, "sends": 2}],
+        },
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+    ndjson = {"Accept": "application/x-ndjson"}
+    response = client.get("/stats/aggregate/progress", headers=ndjson)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"date": today, "grade": "V3"}
+    ] * 2
+
+    response = client.get("/stats/aggregate/progress?format=counts", headers=ndjson)
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        [today, "V3", 2]
+    ]
+
+    response = client.get("/stats/aggregate/progress?format=columns", headers=ndjson)
+    assert response.status_code == 400
@@ -0,0 +1,155 @@
+import json
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from src.async_database import async_database_url, get_async_db
+from src.database import Base, get_read_db, get_write_db
+from src.models import Location
+from src.routers import async_sessions, async_stats, auth
+
+
+@pytest.fixture
+def async_client(tmp_path):
+    """App wired with the async routers over a file database both engines share."""
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SyncSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SyncSession() as db:
+        db.add(Location(name="Test Gym", slug="test-gym"))
+        db.commit()
+
+    async_engine = create_async_engine(async_database_url(url), poolclass=NullPool)
+    AsyncSession = async_sessionmaker(bind=async_engine, autoflush=False)
+
+    def override_get_db():
+        with SyncSession() as db:
+            yield db
+
+    async def override_get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    app.include_router(async_sessions.router, prefix="/sessions")
+    app.include_router(async_stats.router, prefix="/stats")
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_write_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    with TestClient(app) as client:
+        yield client
+    engine.dispose()
+
+
+@pytest.fixture
+def async_headers(async_client):
+    response = async_client.post(
+        "/auth/register",
+        json={"username": "testuser", "password": "password123", "home_location_id": 1},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _create_session(client, headers, day, grade="V3"):
+    response = client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": str(day),
+            "problems": [{"grade": grade, "attempts": 3, "sends": 2}],
+        },
+        headers=headers,
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_async_session_crud(async_client, async_headers):
+    session = _create_session(async_client, async_headers, date.today())
+    assert session["location_name"] == "Test Gym"
+    assert session["problems"][0]["grade"] == "V3"
+
+    response = async_client.put(
+        f"/sessions/{session['id']}", json={"rating": 7}, headers=async_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["rating"] == 7
+
+    problem_id = session["problems"][0]["id"]
+    response = async_client.put(
+        f"/sessions/problems/{problem_id}", json={"sends": 3}, headers=async_headers
+    )
+    assert response.json()["sends"] == 3
+
+    response = async_client.post(
+        f"/sessions/problems/{problem_id}/increment",
+        json={"attempts": 1},
+        headers=async_headers,
+    )
+    assert response.json()["attempts"] == 4
+
+    response = async_client.delete(f"/sessions/{session['id']}", headers=async_headers)
+    assert response.status_code == 204
+    response = async_client.get(f"/sessions/{session['id']}", headers=async_headers)
+    assert response.status_code == 404
+
+
+def test_async_invalid_location_and_auth(async_client, async_headers):
+    response = async_client.post(
+        "/sessions",
+        json={"location_id": 999, "date": str(date.today()), "problems": []},
+        headers=async_headers,
+    )
+    assert response.status_code == 400
+
+    response = async_client.get(
+        "/sessions", headers={"Authorization": "Bearer not-a-token"}
+    )
+    assert response.status_code == 401
+
+
+def test_async_list_page_and_stream(async_client, async_headers):
+    for day in range(1, 6):
+        _create_session(async_client, async_headers, date(2024, 1, day))
+
+    listed = async_client.get("/sessions", headers=async_headers).json()
+    assert [s["date"] for s in listed][:2] == ["2024-01-05", "2024-01-04"]
+
+    page = async_client.get("/sessions?limit=2", headers=async_headers).json()
+    assert len(page["items"]) == 2
+    rest = async_client.get(
+        f"/sessions?limit=10&cursor={page['next_cursor']}", headers=async_headers
+    ).json()
+    assert len(rest["items"]) == 3
+    assert rest["next_cursor"] is None
+
+    response = async_client.get(
+        "/sessions",
+        headers={**async_headers, "Accept": "application/x-ndjson"},
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [s["id"] for s in lines] == [s["id"] for s in listed]
+
+
+def test_async_stats(async_client, async_headers):
+    _create_session(async_client, async_headers, date.today(), grade="V0")
+
+    progress = async_client.get("/stats/user/progress", headers=async_headers)
+    assert progress.json() == [{"date": str(date.today()), "grade": "V0"}] * 2
+
+    location = async_client.get("/stats/location/1").json()
+    assert location == {"total_climbs": 3, "grade_distribution": {"V0": 2}}
+
+    aggregate = async_client.get("/stats/aggregate").json()
+    assert aggregate["by_location"] == [
+        {"location_id": 1, "name": "Test Gym", "count": 1}
+    ]
@@ -98,6 +98,26 @@ def test_decode_access_token():
     assert token_data.username == "testuser"
 
 
+def test_decode_access_token_cached_until_expiry(monkeypatch):
+    from src import auth
+    from src.cache import token_cache
+
+    token = create_access_token({"sub": "testuser"})
+    first = decode_access_token(token)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("signature should not be re-verified")
+
+    monkeypatch.setattr(auth.jwt, "decode", fail)
+    assert decode_access_token(token) is first
+
+    # Entries never outlive the token itself
+    expired = create_access_token({"sub": "testuser"}, timedelta(seconds=-1))
+    monkeypatch.undo()
+    assert decode_access_token(expired) is None
+    assert token_cache.get(auth.token_digest(expired)) is None
+
+
 def test_decode_invalid_token():
     token_data = decode_access_token("invalid_token")
 
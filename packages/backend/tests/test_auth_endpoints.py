@@ -1,3 +1,6 @@
+import asyncio
+
+
 def test_register_success(client):
     response = client.post(
         "/auth/register",
@@ -36,6 +39,33 @@ def test_register_invalid_location(client):
     assert "Invalid home location" in response.json()["detail"]
 
 
+def test_register_looks_up_locations_off_the_event_loop(client, monkeypatch):
+    from src import crud
+
+    on_loop = []
+
+    def recording(lookup):
+        def wrapper(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(lookup.__name__)
+            except RuntimeError:
+                pass
+            return lookup(*args, **kwargs)
+
+        return wrapper
+
+    for name in ("get_locations", "get_location_by_id"):
+        monkeypatch.setattr(crud, name, recording(getattr(crud, name)))
+    for username, body in (("first", {}), ("second", {"home_location_id": 1})):
+        response = client.post(
+            "/auth/register",
+            json={"username": username, "password": "password123", **body},
+        )
+        assert response.status_code == 200
+    assert on_loop == []
+
+
 def test_register_offensive_username(client):
     response = client.post(
         "/auth/register",
@@ -107,3 +137,42 @@ def test_get_me_unauthenticated(client):
 def test_get_me_invalid_token(client):
     response = client.get("/auth/me", headers={"Authorization": "Bearer invalid_token"})
     assert response.status_code == 401
+
+
+def test_identity_cached_until_user_updated(client):
+    from src.cache import identity_cache
+
+    token = client.post(
+        "/auth/register",
+        json={"username": "testuser", "password": "password123", "home_location_id": 1},
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/auth/me", headers=headers).json()["default_grade"] == "V0"
+    hits = identity_cache.hits
+    client.get("/auth/me", headers=headers)
+    assert identity_cache.hits == hits + 1
+
+    response = client.patch("/auth/me", json={"default_grade": "V3"}, headers=headers)
+    assert response.json()["default_grade"] == "V3"
+    assert client.get("/auth/me", headers=headers).json()["default_grade"] == "V3"
+
+
+def test_identity_loaded_across_an_update_is_not_cached(client, auth_token):
+    from src.cache import identity_cache, invalidate_identity
+    from src.dependencies import _identity, _remember
+    from src.schemas import User as UserSchema
+
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    snapshot = UserSchema.model_validate(client.get("/auth/me", headers=headers).json())
+    identity_cache.clear()
+    identity = _identity(auth_token)
+    assert identity.cached is None
+
+    # PATCH /auth/me commits and invalidates while this request reads
+    invalidate_identity("testuser")
+    _remember(identity, snapshot)
+    assert identity_cache.get(identity.key) is None
+
+    _remember(_identity(auth_token), snapshot)
+    assert identity_cache.get(identity.key) == snapshot
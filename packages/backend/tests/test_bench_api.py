@@ -0,0 +1,25 @@
+from benchmarks.bench_api import compare, missing_routes
+
+
+def test_every_router_route_has_a_benchmark():
+    assert missing_routes() == set()
+
+
+def test_compare_flags_regressions():
+    route = {"p50_ms": 10.0, "p95_ms": 20.0, "sql_statements": 2, "peak_kib": 100.0}
+    baseline = {"scales": {"1k": {"routes": {"GET /a": route, "GET /b": route}}}}
+    results = {
+        "scales": {
+            "1k": {
+                "routes": {
+                    "GET /a": {**route, "p50_ms": 10.2, "peak_kib": 120.0},
+                    "GET /b": {**route, "p95_ms": 30.0, "sql_statements": 3},
+                    "GET /new": route,
+                }
+            },
+            "1M": {"routes": {"GET /a": route}},
+        }
+    }
+    assert compare(baseline, results, threshold=0.25) == [
+        "1k GET /b: p95_ms 20.00 -> 30.00, sql 2 -> 3"
+    ]
@@ -0,0 +1,94 @@
+import time
+from datetime import date
+
+from src import crud
+from src.cache import TTLCache, stats_cache
+from src.schemas import LocationCreate
+
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {
+        "size": 2,
+        "maxsize": 2,
+        "hits": 3,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_ttl_cache_expiry():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.get_or_set("a", lambda: 2) == 2
+    assert cache.get("a") == 2
+
+
+def test_ttl_cache_invalidate():
+    cache = TTLCache(maxsize=10, ttl=60)
+    for key in [("x", 1), ("x", 2), ("y", 1)]:
+        cache.set(key, True)
+    assert cache.invalidate(lambda key: key[1] == 1) == 2
+    assert cache.get(("x", 2)) is True
+
+
+def test_ttl_cache_drops_values_computed_across_an_invalidation():
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    def compute():
+        # A write lands while the old rows are being read
+        cache.invalidate(lambda key: True)
+        return "stale"
+
+    assert cache.get_or_set(("x", 1), compute) == "stale"
+    assert cache.get(("x", 1)) is None
+    assert cache.get_or_set(("x", 1), lambda: "fresh") == "fresh"
+    assert cache.get(("x", 1)) == "fresh"
+
+
+def log_session(client, headers, location_id, sends):
+    client.post(
+        "/sessions",
+        json={
+            "location_id": location_id,
+            "date": str(date.today()),
+            "problems": [{"grade": "V3", "attempts": sends, "sends": sends}],
+        },
+        headers=headers,
+    )
+
+
+def test_stats_cache_invalidated_per_location(
+    client, auth_headers, TestingSessionLocal
+):
+    db = TestingSessionLocal()
+    crud.create_location(db, LocationCreate(name="Other Gym", slug="other-gym"))
+    db.close()
+
+    log_session(client, auth_headers, 1, 2)
+    assert client.get("/stats/location/1").json()["total_climbs"] == 2
+    assert client.get("/stats/location/2").json()["total_climbs"] == 0
+    assert client.get("/stats/aggregate").json()["total_climbs"] == 2
+
+    hits = stats_cache.hits
+    client.get("/stats/location/1")
+    assert stats_cache.hits == hits + 1
+
+    # A write at location 2 keeps location 1 cached but drops the global view
+    log_session(client, auth_headers, 2, 3)
+    assert ("location", 1) in stats_cache._entries
+    assert ("location", 2) not in stats_cache._entries
+    assert client.get("/stats/location/2").json()["total_climbs"] == 3
+    assert client.get("/stats/aggregate").json()["total_climbs"] == 5
+
+    assert client.get("/metrics").json()["stats_cache"]["hits"] >= 1
@@ -0,0 +1,204 @@
+import threading
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from src import crud
+from src.config import settings
+from src.counter_buffer import CounterBuffer, counter_buffer
+from src.database import Base, create_write_engine
+from src.models import DailyGradeRollup, Location, Problem, User
+from src.schemas import ProblemCreate, ProblemIncrement, SessionCreate
+
+
+@pytest.fixture
+def buffer(TestingSessionLocal, monkeypatch):
+    monkeypatch.setattr(counter_buffer, "session_factory", TestingSessionLocal)
+    monkeypatch.setattr(counter_buffer, "flush_interval", 60)
+    counter_buffer.start()
+    yield counter_buffer
+    counter_buffer.stop()
+
+
+def create_session(client, headers):
+    return client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": str(date.today()),
+            "problems": [{"grade": "V3", "attempts": 2, "sends": 0}],
+        },
+        headers=headers,
+    ).json()
+
+
+def stored_counts(TestingSessionLocal, problem_id):
+    db = TestingSessionLocal()
+    try:
+        problem = db.get(Problem, problem_id)
+        rollup = db.query(DailyGradeRollup).one()
+        return (problem.attempts, problem.sends), (rollup.attempts, rollup.sends)
+    finally:
+        db.close()
+
+
+def test_increments_coalesce_until_flush(
+    client, auth_headers, TestingSessionLocal, buffer
+):
+    session = create_session(client, auth_headers)
+    problem_id = session["problems"][0]["id"]
+    url = f"/sessions/problems/{problem_id}/increment"
+
+    for _ in range(5):
+        response = client.post(url, json={"attempts": 1}, headers=auth_headers)
+    response = client.post(url, json={"sends": 1}, headers=auth_headers)
+    assert (response.json()["attempts"], response.json()["sends"]) == (7, 1)
+
+    # Nothing written yet, but reads include the pending deltas
+    assert stored_counts(TestingSessionLocal, problem_id) == ((2, 0), (2, 0))
+    fetched = client.get(f"/sessions/{session['id']}", headers=auth_headers).json()
+    assert fetched["problems"][0]["attempts"] == 7
+    listed = client.get("/sessions?limit=10", headers=auth_headers).json()
+    assert listed["items"][0]["problems"][0]["sends"] == 1
+
+    assert buffer.flush() == 1
+    assert stored_counts(TestingSessionLocal, problem_id) == ((7, 1), (7, 1))
+    fetched = client.get(f"/sessions/{session['id']}", headers=auth_headers).json()
+    assert fetched["problems"][0]["attempts"] == 7
+    db = TestingSessionLocal()
+    maintained = db.query(DailyGradeRollup.attempts, DailyGradeRollup.sends).one()
+    crud.rebuild_daily_grade_rollup(db)
+    assert db.query(DailyGradeRollup.attempts, DailyGradeRollup.sends).one() == (
+        maintained
+    )
+    db.close()
+
+
+def test_buffer_checks_ownership_and_bounds(client, auth_headers, buffer):
+    problem_id = create_session(client, auth_headers)["problems"][0]["id"]
+    url = f"/sessions/problems/{problem_id}/increment"
+
+    response = client.post(url, json={"attempts": -3}, headers=auth_headers)
+    assert response.status_code == 409
+
+    other = client.post(
+        "/auth/register",
+        json={"username": "other", "password": "password123", "home_location_id": 1},
+    ).json()["access_token"]
+    response = client.post(
+        url, json={"attempts": 1}, headers={"Authorization": f"Bearer {other}"}
+    )
+    assert response.status_code == 404
+    assert buffer.stats()["pending"] == 0
+
+
+def test_size_threshold_and_shutdown_flush(tmp_path):
+    # The flush thread needs its own connections, so use a file database
+    engine = create_write_engine(f"sqlite:///{tmp_path / 'buffer.db'}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = SessionLocal()
+    db.add(Location(name="Test Gym", slug="test-gym"))
+    db.add(User(username="u", password_hash="x", home_location_id=1))
+    db.commit()
+    problems = [
+        p.id
+        for _ in range(2)
+        for p in crud.create_session(
+            db,
+            SessionCreate(location_id=1, problems=[ProblemCreate(grade="V3")]),
+            user_id=1,
+        ).problems
+    ]
+    db.close()
+
+    def load(problem_id):
+        # Short sessions: the writer pool has a single connection
+        with SessionLocal() as read:
+            return crud.get_problem(read, problem_id, 1)
+
+    buffer = CounterBuffer(SessionLocal, flush_interval_ms=60_000, max_pending=2)
+    buffer.start()
+
+    def increment(problem_id, **deltas):
+        return buffer.increment(lambda: load(problem_id), 1, ProblemIncrement(**deltas))
+
+    increment(problems[0], attempts=1)
+    increment(problems[1], attempts=1)
+    deadline = time.monotonic() + 5
+    while buffer.flush_size.stats()["count"] == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    assert increment(problems[0], sends=1).sends == 1
+    buffer.stop()
+    assert load(problems[0]).model_dump(include={"attempts", "sends"}) == {
+        "attempts": 1,
+        "sends": 1,
+    }
+    assert buffer.flush_size.stats()["sum"] == 3
+    engine.dispose()
+
+
+def test_edits_replace_pending_counts_and_deletes_drop_them(
+    client, auth_headers, TestingSessionLocal, buffer
+):
+    session = create_session(client, auth_headers)
+    problem_id = session["problems"][0]["id"]
+    url = f"/sessions/problems/{problem_id}"
+
+    client.post(f"{url}/increment", json={"attempts": 1}, headers=auth_headers)
+    response = client.put(url, json={"attempts": 3}, headers=auth_headers)
+    assert response.json()["attempts"] == 3
+
+    # Taps after the edit are added to it, and show in later edits' responses
+    client.post(f"{url}/increment", json={"sends": 1}, headers=auth_headers)
+    response = client.put(url, json={"notes": "crimpy"}, headers=auth_headers)
+    assert (response.json()["attempts"], response.json()["sends"]) == (3, 1)
+    response = client.put(
+        f"/sessions/{session['id']}", json={"rating": 7}, headers=auth_headers
+    )
+    assert response.json()["problems"][0]["sends"] == 1
+
+    buffer.flush()
+    assert stored_counts(TestingSessionLocal, problem_id) == ((3, 1), (3, 1))
+
+    client.post(f"{url}/increment", json={"attempts": 1}, headers=auth_headers)
+    assert client.delete(url, headers=auth_headers).status_code == 204
+    assert buffer.stats()["pending"] == 0
+
+    session = create_session(client, auth_headers)
+    problem_id = session["problems"][0]["id"]
+    client.post(
+        f"/sessions/problems/{problem_id}/increment",
+        json={"attempts": 1},
+        headers=auth_headers,
+    )
+    client.delete(f"/sessions/{session['id']}", headers=auth_headers)
+    assert buffer.stats()["pending"] == 0
+
+
+def test_reads_dont_wait_while_a_flush_waits_for_the_writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "database_write_timeout_seconds", 5)
+    engine = create_write_engine(f"sqlite:///{tmp_path / 'buffer.db'}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    buffer = CounterBuffer(SessionLocal, flush_interval_ms=60_000, max_pending=10)
+    buffer.start()
+    buffer._pending[1] = (1, 0)
+
+    writer = engine.connect()
+    flusher = threading.Thread(target=buffer.flush)
+    flusher.start()
+    time.sleep(0.1)
+    assert buffer.read_session(lambda: None) is None
+    assert buffer.stats()["pending"] == 1
+
+    writer.close()
+    flusher.join()
+    assert buffer.stats()["pending"] == 0
+    assert buffer.failures == 0
+    buffer.stop()
+    engine.dispose()
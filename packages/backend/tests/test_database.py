@@ -0,0 +1,218 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src import metrics
+from src.config import settings
+from src.database import (
+    configure_sqlite,
+    contention,
+    create_read_engine,
+    create_write_engine,
+    sqlite_pragmas,
+)
+from src.migrations import SCHEMA_VERSION, migrate, schema_version
+
+
+def test_sqlite_pragmas_applied_per_connection(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    configure_sqlite(engine, sqlite_pragmas())
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -65536
+    engine.dispose()
+
+
+def test_sqlite_default_profile_is_rollback_journal(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plain.db'}")
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+    engine.dispose()
+
+
+def test_read_engine_rejects_writes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'split.db'}"
+    writer = create_write_engine(url)
+    reader = create_read_engine(url)
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 0
+        with pytest.raises(OperationalError, match="readonly"):
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+    writer.dispose()
+    reader.dispose()
+
+
+def test_readers_not_blocked_by_open_write(tmp_path):
+    url = f"sqlite:///{tmp_path / 'wal.db'}"
+    writer = create_write_engine(url)
+    reader = create_read_engine(url)
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    with writer.begin() as conn:
+        conn.execute(text("INSERT INTO t VALUES (2)"))
+        # Uncommitted write in progress: readers still see the last commit
+        with reader.connect() as read_conn:
+            assert read_conn.execute(text("SELECT count(*) FROM t")).scalar() == 1
+    writer.dispose()
+    reader.dispose()
+
+
+def test_writer_checkouts_queue_and_time_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "database_write_timeout_seconds", 0.05)
+    writer = create_write_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    waits = contention.checkout_wait_ms.stats()["count"]
+    timeouts = contention.checkout_timeouts
+
+    with writer.connect():
+        with pytest.raises(PoolTimeoutError):
+            writer.connect()
+
+    assert contention.checkout_timeouts == timeouts + 1
+    assert contention.checkout_wait_ms.stats()["count"] == waits + 2
+    assert "database" in metrics.snapshot()
+    writer.dispose()
+
+
+LEGACY_STATEMENTS = [
+    "CREATE TABLE locations (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL,"
+    " slug VARCHAR NOT NULL, created_at DATETIME)",
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR NOT NULL,"
+    " password_hash VARCHAR NOT NULL, home_location_id INTEGER NOT NULL"
+    " REFERENCES locations (id), default_grade VARCHAR NOT NULL,"
+    " created_at DATETIME)",
+    "CREATE TABLE sessions (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL"
+    " REFERENCES users (id), location_id INTEGER NOT NULL"
+    " REFERENCES locations (id), date DATE, rating INTEGER,"
+    " created_at DATETIME)",
+    "CREATE TABLE problems (id INTEGER PRIMARY KEY, session_id INTEGER"
+    " NOT NULL REFERENCES sessions (id), grade VARCHAR NOT NULL,"
+    " attempts INTEGER NOT NULL, sends INTEGER NOT NULL, notes TEXT,"
+    " created_at DATETIME)",
+    "CREATE INDEX ix_sessions_user_id ON sessions (user_id)",
+    "CREATE INDEX ix_problems_session_id ON problems (session_id)",
+    "INSERT INTO locations VALUES (1, 'Gym', 'gym', NULL)",
+    "INSERT INTO users VALUES (1, 'u', 'x', 1, 'V0', NULL)",
+    "INSERT INTO sessions VALUES (1, 1, 1, '2024-01-01', NULL, NULL)",
+    "INSERT INTO problems VALUES (1, 1, 'V3', 2, 1, NULL, '2024-01-01')",
+    # Orphaned by a delete that didn't cascade
+    "INSERT INTO problems VALUES (2, 7, 'V3', 2, 1, NULL, '2024-01-01')",
+]
+
+
+def create_legacy_database(path, *statements):
+    engine = create_write_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA foreign_keys=OFF"))
+        for statement in (*LEGACY_STATEMENTS, *statements):
+            conn.execute(text(statement))
+    return engine
+
+
+def test_migrate_upgrades_legacy_database(tmp_path):
+    engine = create_legacy_database(tmp_path / "legacy.db")
+    assert migrate(engine) == SCHEMA_VERSION
+    assert schema_version(engine) == SCHEMA_VERSION
+    with engine.begin() as conn:
+        keys = conn.execute(text("PRAGMA foreign_key_list(problems)")).mappings()
+        assert [key["on_delete"] for key in keys] == ["CASCADE"]
+        assert conn.execute(text("SELECT id, grade FROM problems")).all() == [(1, 2)]
+        assert conn.execute(text("SELECT grade_scales FROM locations")).scalar() == "v"
+        indexes = set(
+            conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index'")
+            ).scalars()
+        )
+        assert {
+            "ix_sessions_user_id_date",
+            "ix_sessions_location_id_date",
+            "ix_problems_session_id_grade_sends_attempts",
+        } <= indexes
+        assert not {"ix_sessions_user_id", "ix_problems_session_id"} & indexes
+        conn.execute(text("DELETE FROM sessions WHERE id = 1"))
+        assert conn.execute(text("SELECT count(*) FROM problems")).scalar() == 0
+    engine.dispose()
+
+
+def test_migrate_fresh_database_starts_current(tmp_path):
+    engine = create_write_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert migrate(engine) == SCHEMA_VERSION
+    assert migrate(engine) == SCHEMA_VERSION
+    engine.dispose()
+
+
+def test_migrate_drops_rollup_session_count(tmp_path):
+    engine = create_write_engine(f"sqlite:///{tmp_path / 'v3.db'}")
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "ALTER TABLE daily_grade_rollup"
+                " ADD COLUMN session_count INTEGER NOT NULL DEFAULT 0"
+            )
+        )
+        conn.execute(text("PRAGMA user_version=3"))
+
+    assert migrate(engine) == SCHEMA_VERSION
+    with engine.connect() as conn:
+        columns = conn.execute(text("PRAGMA table_info(daily_grade_rollup)")).all()
+    assert "session_count" not in [column[1] for column in columns]
+    engine.dispose()
+
+
+def schema(engine):
+    # Columns and indexes of the tables that migrations rebuild or index
+    tables = ("sessions", "problems", "daily_grade_rollup")
+    with engine.connect() as conn:
+        return {
+            table: (
+                conn.execute(text(f"PRAGMA table_info({table})")).all(),
+                sorted(
+                    conn.execute(
+                        text(
+                            "SELECT name FROM sqlite_master"
+                            " WHERE type = 'index' AND tbl_name = :table"
+                        ),
+                        {"table": table},
+                    ).scalars()
+                ),
+            )
+            for table in tables
+        }
+
+
+def test_migrated_legacy_database_matches_a_fresh_one(tmp_path):
+    # A rollup from before grade codes, with labels and session counts
+    legacy = create_legacy_database(
+        tmp_path / "legacy.db",
+        "CREATE TABLE daily_grade_rollup (location_id INTEGER NOT NULL"
+        " REFERENCES locations (id), date DATE NOT NULL, grade VARCHAR NOT NULL,"
+        " sends INTEGER NOT NULL, attempts INTEGER NOT NULL,"
+        " session_count INTEGER NOT NULL, PRIMARY KEY (location_id, date, grade))",
+        "INSERT INTO daily_grade_rollup VALUES (1, '2024-01-01', 'V3', 1, 2, 1)",
+    )
+    fresh = create_write_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert migrate(legacy) == migrate(fresh) == SCHEMA_VERSION
+
+    migrated = schema(legacy)
+    current = schema(fresh)
+    # Legacy sessions keep their own column constraints; only their indexes
+    # are migrated
+    assert migrated.pop("sessions")[1] == current.pop("sessions")[1]
+    assert migrated == current
+    with legacy.connect() as conn:
+        assert conn.execute(text("SELECT * FROM daily_grade_rollup")).all() == [
+            (1, "2024-01-01", 2, 1, 2)
+        ]
+    legacy.dispose()
+    fresh.dispose()
@@ -0,0 +1,54 @@
+from dataclasses import replace
+from datetime import date
+
+from sqlalchemy import create_engine
+
+from benchmarks.datagen import DatasetSpec, generate
+from src.migrations import SCHEMA_VERSION, migrate, schema_version
+
+SPEC = DatasetSpec(users=6, locations=2, years=0.5, seed=3, end=date(2025, 6, 30))
+
+
+def dump(engine):
+    with engine.connect() as conn:
+        return {
+            table: conn.exec_driver_sql(f"SELECT * FROM {table} ORDER BY id").all()
+            for table in ("locations", "users", "sessions", "problems")
+        }
+
+
+def test_generate_is_deterministic(tmp_path):
+    engines = [create_engine(f"sqlite:///{tmp_path / name}.db") for name in ("a", "b")]
+    counts = [generate(engine, SPEC) for engine in engines]
+    assert counts[0] == counts[1]
+    assert dump(engines[0]) == dump(engines[1])
+
+    rows = dump(engines[0])
+    assert {table: len(rows[table]) for table in rows} == counts[0]
+    assert all(row[3] <= "2025-06-30" for row in rows["sessions"])
+    assert all(0 <= sends <= attempts for *_, attempts, sends, _, _ in rows["problems"])
+    with engines[0].connect() as conn:
+        rollup = conn.exec_driver_sql(
+            "SELECT sum(attempts), sum(sends) FROM daily_grade_rollup"
+        ).one()
+        totals = conn.exec_driver_sql(
+            "SELECT sum(attempts), sum(sends) FROM problems"
+        ).one()
+    assert rollup == totals
+
+    reseeded = create_engine(f"sqlite:///{tmp_path / 'c'}.db")
+    generate(reseeded, replace(SPEC, seed=4))
+    assert dump(reseeded)["problems"] != rows["problems"]
+    for engine in [*engines, reseeded]:
+        engine.dispose()
+
+
+def test_generated_database_opens_without_migrating(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app'}.db")
+    generate(engine, SPEC)
+    assert schema_version(engine) == SCHEMA_VERSION
+    before = dump(engine)
+    # What init_db runs when the app starts on this database
+    assert migrate(engine) == SCHEMA_VERSION
+    assert dump(engine) == before
+    engine.dispose()
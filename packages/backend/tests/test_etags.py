@@ -0,0 +1,84 @@
+from datetime import date
+
+import pytest
+
+from src import crud
+
+
+def log_session(client, headers):
+    return client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": str(date.today()),
+            "problems": [{"grade": "V3", "attempts": 2, "sends": 1}],
+        },
+        headers=headers,
+    )
+
+
+@pytest.mark.parametrize(
+    "url", ["/locations", "/stats/aggregate", "/stats/location/1", "/sessions"]
+)
+def test_if_none_match_returns_304(client, auth_headers, url):
+    response = client.get(url, headers=auth_headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = client.get(url, headers=auth_headers | {"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_write_changes_etag(client, auth_headers):
+    for url in ("/stats/aggregate", "/sessions"):
+        etag = client.get(url, headers=auth_headers).headers["etag"]
+        log_session(client, auth_headers)
+
+        response = client.get(url, headers=auth_headers | {"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+
+def test_not_modified_skips_query(client, auth_headers, monkeypatch):
+    etag = client.get("/stats/aggregate").headers["etag"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("query should not run")
+
+    monkeypatch.setattr(crud, "get_aggregate_stats", fail)
+    response = client.get("/stats/aggregate", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_sessions_etag_is_per_user(client, auth_headers):
+    register = client.post(
+        "/auth/register",
+        json={"username": "otheruser", "password": "password123"},
+    )
+    other_headers = {"Authorization": f"Bearer {register.json()['access_token']}"}
+
+    response = client.get("/sessions", headers=auth_headers)
+    assert response.headers["cache-control"] == "private"
+    assert "Authorization" in response.headers["vary"]
+
+    etag = response.headers["etag"]
+    response = client.get("/sessions", headers=other_headers | {"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.parametrize(
+    "url, variants",
+    [
+        ("/sessions", ["?location_id=1", "?start_date=2024-01-01"]),
+        ("/stats/aggregate", ["?location_id=1", "?period=week", "?period=month"]),
+    ],
+)
+def test_query_parameters_change_etag(client, auth_headers, url, variants):
+    etags = {
+        client.get(url + query, headers=auth_headers).headers["etag"]
+        for query in ["", *variants]
+    }
+    assert len(etags) == len(variants) + 1
@@ -0,0 +1,106 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from src.grades import FONT, V_SCALE, GradeRegistry, GradeScale, grade_registry
+from src.models import Location, Problem
+from src.registry import location_registry
+
+
+@pytest.fixture
+def font_gym(TestingSessionLocal):
+    db = TestingSessionLocal()
+    location = Location(name="Font Gym", slug="font-gym", grade_scales="font,colour")
+    db.add(location)
+    db.commit()
+    location_id = location.id
+    db.close()
+    location_registry.clear()
+    return location_id
+
+
+def test_codes_follow_difficulty_within_a_scale():
+    codes = [grade_registry.code(grade) for grade in V_SCALE.grades]
+    assert codes == sorted(codes) == list(V_SCALE.codes)
+    assert grade_registry.code("6A") in FONT.codes
+    assert grade_registry.label(grade_registry.code("V4-V6")) == "V4-V6"
+    assert grade_registry.scale_of("blue").key == "colour"
+
+    with pytest.raises(ValueError, match="more than one scale"):
+        GradeRegistry([V_SCALE, GradeScale(id=5, key="dup", name="", grades=("V0",))])
+
+
+def test_problems_store_codes(client, auth_headers, TestingSessionLocal):
+    for grade in ("V6-V8", "VB", "V3"):
+        client.post(
+            "/sessions",
+            json={
+                "location_id": 1,
+                "date": str(date.today()),
+                "problems": [{"grade": grade, "attempts": 1, "sends": 1}],
+            },
+            headers=auth_headers,
+        )
+
+    db = TestingSessionLocal()
+    stored = db.execute(text("SELECT grade FROM problems ORDER BY grade")).scalars()
+    assert list(stored) == [0, 2, 4]
+    # Comparisons bind labels as codes, so "at least V3" is a range
+    harder = (
+        db.query(Problem.grade).filter(Problem.grade >= "V3").order_by(Problem.grade)
+    )
+    assert [grade for (grade,) in harder] == ["V3", "V6-V8"]
+    db.close()
+
+    distribution = client.get("/stats/user/distribution", headers=auth_headers).json()
+    assert list(distribution) == ["VB", "V3", "V6-V8"]
+
+
+def test_grades_must_belong_to_location_scales(client, auth_headers, font_gym):
+    def create(location_id, grade):
+        return client.post(
+            "/sessions",
+            json={
+                "location_id": location_id,
+                "date": str(date.today()),
+                "problems": [{"grade": grade, "attempts": 1, "sends": 1}],
+            },
+            headers=auth_headers,
+        )
+
+    assert create(font_gym, "V3").status_code == 400
+    assert create(1, "6A").status_code == 400
+    assert create(1, "V12").status_code == 422
+    session = create(font_gym, "6A+").json()
+
+    problem_id = session["problems"][0]["id"]
+    response = client.put(
+        f"/sessions/problems/{problem_id}", json={"grade": "V0"}, headers=auth_headers
+    )
+    assert response.status_code == 400
+    v_session = create(1, "V3").json()
+    response = client.put(
+        f"/sessions/{v_session['id']}",
+        json={"location_id": font_gym},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+    response = client.put(
+        f"/sessions/{session['id']}", json={"location_id": 1}, headers=auth_headers
+    )
+    assert response.status_code == 400
+    response = client.post(
+        f"/sessions/{session['id']}/problems",
+        json={"grade": "blue"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+
+    fetched = client.get(f"/sessions/{session['id']}", headers=auth_headers).json()
+    assert [p["grade"] for p in fetched["problems"]] == ["6A+", "blue"]
+    assert fetched["location_id"] == font_gym
+    fetched = client.get(f"/sessions/{v_session['id']}", headers=auth_headers).json()
+    assert fetched["location_id"] == 1
+    locations = client.get("/locations").json()
+    assert [loc["grade_scales"] for loc in locations] == [["v"], ["font", "colour"]]
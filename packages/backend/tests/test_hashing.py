@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+
+from src.auth import verify_password
+from src.config import settings
+from src.hashing import (
+    HashingOverloaded,
+    PasswordHasher,
+    calibrate_bcrypt_rounds,
+    password_hasher,
+)
+
+
+async def test_hash_and_verify_on_pool():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    hashed = await hasher.hash("password123")
+    assert verify_password("password123", hashed)
+    assert await hasher.verify("password123", hashed)
+    assert not await hasher.verify("wrong", hashed)
+
+    stats = hasher.stats()
+    assert stats["latency_ms"]["count"] == 3
+    assert stats["active"] == stats["queued"] == 0
+
+
+async def test_rejects_when_queue_full():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+    running = [
+        asyncio.ensure_future(hasher.run(release.wait)),
+        asyncio.ensure_future(hasher.run(release.wait)),
+    ]
+    await asyncio.sleep(0.01)
+    assert hasher.stats()["queued"] == 1
+
+    with pytest.raises(HashingOverloaded):
+        await hasher.run(release.wait)
+    assert hasher.rejected == 1
+
+    release.set()
+    await asyncio.gather(*running)
+    assert hasher.stats()["active"] == 0
+
+
+def test_login_returns_503_when_saturated(client, monkeypatch):
+    client.post(
+        "/auth/register",
+        json={"username": "testuser", "password": "password123", "home_location_id": 1},
+    )
+
+    async def overloaded(*args):
+        raise HashingOverloaded
+
+    monkeypatch.setattr(password_hasher, "verify", overloaded)
+    response = client.post(
+        "/auth/login", data={"username": "testuser", "password": "password123"}
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_calibrate_bcrypt_rounds():
+    assert calibrate_bcrypt_rounds(target_ms=50, min_rounds=4) >= 4
+    assert calibrate_bcrypt_rounds(target_ms=0, min_rounds=4) == 4
+
+
+def test_calibration_keeps_the_minimum_cost(caplog):
+    assert settings.bcrypt_min_rounds >= 10
+    with caplog.at_level(logging.WARNING, logger="src.hashing"):
+        assert calibrate_bcrypt_rounds(target_ms=0) == settings.bcrypt_min_rounds
+    assert "keeping the minimum" in caplog.text
@@ -0,0 +1,129 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from src import crud
+from src.models import User
+from src.schemas import ProblemCreate, ProblemUpdate, SessionCreate, SessionUpdate
+
+TABLES = ("sessions", "problems", "daily_grade_rollup")
+TODAY = date.today()
+
+
+@pytest.fixture
+def db(TestingSessionLocal):
+    db = TestingSessionLocal()
+    db.add(User(username="u", password_hash="x", home_location_id=1))
+    db.commit()
+    for days in range(20):
+        crud.create_session(
+            db,
+            SessionCreate(
+                location_id=1,
+                date=TODAY - timedelta(days=days),
+                problems=[ProblemCreate(grade="V3", attempts=2, sends=1)] * 3,
+            ),
+            user_id=1,
+        )
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def plans(test_engine):
+    # EXPLAIN QUERY PLAN of every statement run, with the same parameters
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(
+            ("SELECT", "INSERT", "UPDATE", "DELETE")
+        ):
+            statements.append((statement, parameters))
+
+    def explain():
+        with test_engine.connect() as conn:
+            rows = [
+                row[3]
+                for statement, parameters in statements
+                for row in conn.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                )
+            ]
+        statements.clear()
+        return rows
+
+    event.listen(test_engine, "before_cursor_execute", record)
+    yield explain
+    event.remove(test_engine, "before_cursor_execute", record)
+
+
+def assert_no_table_scans(plan):
+    # Scanning a covering index is fine: it's read in order, without lookups
+    for step in plan:
+        for table in TABLES:
+            if step.startswith(f"SCAN {table}"):
+                assert "COVERING INDEX" in step, plan
+
+
+@pytest.mark.parametrize(
+    "query, index",
+    [
+        (
+            lambda db: crud.get_sessions(db, 1, start_date=TODAY - timedelta(days=7)),
+            "ix_sessions_user_id_date",
+        ),
+        (
+            lambda db: crud.get_sessions_page(db, 1, limit=10),
+            "ix_sessions_user_id_date",
+        ),
+        (
+            lambda db: crud.get_session_by_id(db, 3, 1),
+            "ix_problems_session_id_grade_sends_attempts",
+        ),
+        (
+            lambda db: crud.get_user_progress_counts(db, 1, location_id=1),
+            "ix_problems_session_id_grade_sends_attempts",
+        ),
+        (
+            lambda db: crud.get_user_distribution(db, 1, period="month"),
+            "ix_sessions_user_id_date",
+        ),
+        (
+            lambda db: crud.get_location_stats(db, 1),
+            "sqlite_autoindex_daily_grade_rollup_1",
+        ),
+        (
+            lambda db: crud.get_aggregate_stats(db, "month", None),
+            "ix_daily_grade_rollup_date",
+        ),
+        (
+            lambda db: crud.get_aggregate_progress_counts(
+                db, location_id=1, start_date=TODAY - timedelta(days=7)
+            ),
+            "sqlite_autoindex_daily_grade_rollup_1",
+        ),
+    ],
+)
+def test_reads_use_indexes(db, plans, query, index):
+    query(db)
+    plan = plans()
+    assert_no_table_scans(plan)
+    assert any(index in step for step in plan), plan
+
+
+@pytest.mark.parametrize(
+    "write",
+    [
+        lambda db: crud.update_session(db, 3, 1, SessionUpdate(date=TODAY)),
+        lambda db: crud.update_problem(db, 5, 1, ProblemUpdate(sends=2)),
+        lambda db: crud.delete_problem(db, 6, 1),
+        lambda db: crud.delete_session(db, 4, 1),
+        lambda db: crud.create_problem(db, 2, 1, ProblemCreate(grade="V0")),
+    ],
+)
+def test_writes_use_indexes(db, plans, write):
+    write(db)
+    plan = plans()
+    assert_no_table_scans(plan)
+    assert any("ix_sessions_location_id_date" in step for step in plan), plan
@@ -0,0 +1,64 @@
+from sqlalchemy import event
+
+from src import crud
+from src.config import settings
+from src.models import Location
+from src.registry import LocationRegistry
+from src.schemas import LocationCreate
+
+
+def test_lookups_served_from_memory(TestingSessionLocal, test_engine):
+    registry = LocationRegistry()
+    db = TestingSessionLocal()
+    try:
+        registry.load(db)
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+
+        event.listen(test_engine, "before_cursor_execute", count)
+        try:
+            assert registry.by_id(db, 1).slug == "test-gym"
+            assert registry.by_slug(db, "test-gym").id == 1
+            assert [loc.name for loc in registry.all(db)] == ["Test Gym"]
+            assert b'"slug":"test-gym"' in registry.json(db)
+        finally:
+            event.remove(test_engine, "before_cursor_execute", count)
+        assert statements == []
+    finally:
+        db.close()
+
+
+def test_create_location_reloads_registry(client, TestingSessionLocal):
+    etag = client.get("/locations").headers["etag"]
+
+    db = TestingSessionLocal()
+    try:
+        created = crud.create_location(
+            db, LocationCreate(name="New Gym", slug="new-gym")
+        )
+        assert crud.get_location_by_slug(db, "new-gym").id == created.id
+    finally:
+        db.close()
+
+    response = client.get("/locations", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [loc["slug"] for loc in response.json()] == ["test-gym", "new-gym"]
+
+
+def test_miss_picks_up_out_of_process_inserts(TestingSessionLocal, monkeypatch):
+    registry = LocationRegistry()
+    db = TestingSessionLocal()
+    try:
+        registry.load(db)
+        db.add(Location(name="Seeded Gym", slug="seeded-gym"))
+        db.commit()
+
+        # Within the refresh interval a miss does not go back to the database
+        assert registry.by_slug(db, "seeded-gym") is None
+
+        monkeypatch.setattr(settings, "location_registry_refresh_seconds", 0)
+        assert registry.by_slug(db, "seeded-gym").name == "Seeded Gym"
+    finally:
+        db.close()
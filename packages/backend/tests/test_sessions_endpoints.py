@@ -1,15 +1,9 @@
+import json
 from datetime import date, timedelta
 
-import pytest
+from sqlalchemy import event
 
-
-@pytest.fixture
-def auth_token(client):
-    response = client.post(
-        "/auth/register",
-        json={"username": "testuser", "password": "password123", "home_location_id": 1},
-    )
-    return response.json()["access_token"]
+from src.models import Problem
 
 
 def test_create_session_success(client, auth_token):
@@ -201,8 +195,360 @@ def test_delete_session(client, auth_token):
     assert get_response.status_code == 404
 
 
+def test_update_session_invalid_location(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    session_id = client.post(
+        "/sessions",
+        json={"location_id": 1, "date": str(date.today()), "problems": []},
+        headers=headers,
+    ).json()["id"]
+
+    response = client.put(
+        f"/sessions/{session_id}", json={"location_id": 999}, headers=headers
+    )
+    assert response.status_code == 400
+
+
+def test_delete_session_cascades_to_problems(
+    client, auth_token, test_engine, TestingSessionLocal
+):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    session_id = client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": str(date.today()),
+            "problems": [{"grade": "V3", "attempts": 3, "sends": 2}] * 10,
+        },
+        headers=headers,
+    ).json()["id"]
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(test_engine, "before_cursor_execute", record)
+    try:
+        response = client.delete(f"/sessions/{session_id}", headers=headers)
+    finally:
+        event.remove(test_engine, "before_cursor_execute", record)
+
+    assert response.status_code == 204
+    # The problems go in the database, not one ORM delete at a time
+    assert not any(s.startswith("DELETE FROM problems") for s in statements)
+    db = TestingSessionLocal()
+    assert db.query(Problem).count() == 0
+    db.close()
+
+
+def test_problem_writes_check_ownership(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    session = client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": str(date.today()),
+            "problems": [{"grade": "V3", "attempts": 3, "sends": 2}],
+        },
+        headers=headers,
+    ).json()
+    problem_id = session["problems"][0]["id"]
+
+    other = client.post(
+        "/auth/register",
+        json={"username": "other", "password": "password123", "home_location_id": 1},
+    ).json()["access_token"]
+    other_headers = {"Authorization": f"Bearer {other}"}
+
+    response = client.put(
+        f"/sessions/problems/{problem_id}", json={"sends": 0}, headers=other_headers
+    )
+    assert response.status_code == 404
+    response = client.delete(f"/sessions/problems/{problem_id}", headers=other_headers)
+    assert response.status_code == 404
+    response = client.put(
+        f"/sessions/{session['id']}", json={"rating": 1}, headers=other_headers
+    )
+    assert response.status_code == 404
+    response = client.delete(f"/sessions/{session['id']}", headers=other_headers)
+    assert response.status_code == 404
+
+    fetched = client.get(f"/sessions/{session['id']}", headers=headers).json()
+    assert fetched == session
+
+
+def test_increment_problem(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    problem_id = client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": str(date.today()),
+            "problems": [{"grade": "V3", "attempts": 3, "sends": 1}],
+        },
+        headers=headers,
+    ).json()["problems"][0]["id"]
+    url = f"/sessions/problems/{problem_id}/increment"
+
+    for _ in range(3):
+        response = client.post(url, json={"attempts": 1}, headers=headers)
+    assert response.status_code == 200
+    assert (response.json()["attempts"], response.json()["sends"]) == (6, 1)
+
+    response = client.post(url, json={"attempts": 1, "sends": 1}, headers=headers)
+    assert (response.json()["attempts"], response.json()["sends"]) == (7, 2)
+
+    response = client.post(url, json={"sends": -3}, headers=headers)
+    assert response.status_code == 409
+    response = client.post(url, json={"sends": -1}, headers=headers)
+    assert response.json()["sends"] == 1
+
+    response = client.post(
+        "/sessions/problems/999/increment", json={"attempts": 1}, headers=headers
+    )
+    assert response.status_code == 404
+
+
 def test_delete_session_not_found(client, auth_token):
     response = client.delete(
         "/sessions/999", headers={"Authorization": f"Bearer {auth_token}"}
     )
     assert response.status_code == 404
+
+
+def test_get_sessions_ndjson_stream(client, auth_token):
+    for days_ago in range(3):
+        client.post(
+            "/sessions",
+            json={
+                "location_id": 1,
+                "date": str(date.today() - timedelta(days=days_ago)),
+                "problems": [{"grade": "V3", "attempts": 3, "sends": days_ago}],
+            },
+            headers={"Authorization": f"Bearer {auth_token}"},
+        )
+
+    response = client.get(
+        "/sessions",
+        headers={
+            "Authorization": f"Bearer {auth_token}",
+            "Accept": "application/x-ndjson",
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert (
+        lines
+        == client.get(
+            "/sessions", headers={"Authorization": f"Bearer {auth_token}"}
+        ).json()
+    )
+    assert [line["problems"][0]["sends"] for line in lines] == [0, 1, 2]
+
+
+def test_get_sessions_keyset_pagination(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    for days_ago in (0, 0, 1, 2, 2):
+        client.post(
+            "/sessions",
+            json={
+                "location_id": 1,
+                "date": str(date.today() - timedelta(days=days_ago)),
+                "problems": [{"grade": "V3", "attempts": 1, "sends": 1}],
+            },
+            headers=headers,
+        )
+    expected = [s["id"] for s in client.get("/sessions", headers=headers).json()]
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        page = client.get("/sessions", params=params, headers=headers).json()
+        assert len(page["items"]) <= 2
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert len(seen) == 5
+
+
+def test_get_sessions_invalid_cursor(client, auth_token):
+    response = client.get(
+        "/sessions?limit=2&cursor=not-a-cursor",
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+    assert response.status_code == 400
+
+
+def test_import_sessions_csv(client, auth_token, monkeypatch):
+    monkeypatch.setattr("src.config.settings.import_chunk_size", 2)
+    headers = {"Authorization": f"Bearer {auth_token}", "Content-Type": "text/csv"}
+    body = "\n".join(
+        [
+            "date,location_id,rating,grade,attempts,sends,notes",
+            "2024-01-01,1,,V0,2,1,",
+            "2024-01-01,1,7,V3,4,1,crimpy",
+            "2024-01-01,1,8,V3,1,0,",
+            "2024-01-02,1,,VB,1,1,",
+            "2024-01-03,1,,V99,1,1,",
+            "2024-01-03,1,,V0,1,1,",
+            "2024-01-04,999,,V0,1,1,",
+            "2024-01-05,1,,V0,1,1,",
+        ]
+    )
+    response = client.post("/sessions/import", content=body, headers=headers)
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported_sessions"] == 3
+    assert report["imported_problems"] == 5
+    assert report["skipped_sessions"] == 2
+    assert [error["row"] for error in report["errors"]] == [6, 8]
+    assert report["errors"][0]["errors"][0].startswith("grade:")
+
+    sessions = client.get("/sessions", headers=headers).json()
+    assert [s["date"] for s in sessions] == ["2024-01-05", "2024-01-02", "2024-01-01"]
+    # The rating only on later rows still belongs to the one session
+    assert len(sessions[2]["problems"]) == 3
+    assert sessions[2]["rating"] == 7
+
+    # Rollup and stats cache reflect the import
+    stats = client.get("/stats/location/1").json()
+    assert stats["total_climbs"] == 9
+
+
+def test_import_csv_quoted_fields_span_lines(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}", "Content-Type": "text/csv"}
+    body = "\n".join(
+        [
+            "date,location_id,rating,grade,attempts,sends,notes",
+            '2024-01-01,1,,V0,1,1,"line one',
+            "",
+            'line ""two"""',
+            '2024-01-01,1,,V3,2,1,6" reach',
+            "2024-01-01,1,,V99,1,1,",
+        ]
+    )
+    response = client.post("/sessions/import", content=body, headers=headers)
+    report = response.json()
+    assert report["skipped_sessions"] == 1
+    assert [error["row"] for error in report["errors"]] == [6]
+
+    body = body.rsplit("\n", 1)[0]
+    response = client.post("/sessions/import", content=body, headers=headers)
+    assert response.json()["imported_problems"] == 2
+    [session] = client.get("/sessions", headers=headers).json()
+    notes = [problem["notes"] for problem in session["problems"]]
+    assert notes == ['line one\n\nline "two"', '6" reach']
+
+
+def test_import_stops_partway_after_a_chunk_is_inserted(
+    client, auth_token, monkeypatch
+):
+    monkeypatch.setattr("src.config.settings.import_chunk_size", 1)
+    headers = {"Authorization": f"Bearer {auth_token}", "Content-Type": "text/csv"}
+    rows = [
+        b"date,location_id,rating,grade,attempts,sends,notes",
+        b"2024-01-01,1,,V0,1,1,",
+        b"2024-01-02,1,,V0,1,1,",
+        b"2024-01-03,1,,V0,1,1,\xff",
+    ]
+    assert client.get("/stats/location/1").json()["total_climbs"] == 0
+
+    response = client.post(
+        "/sessions/import", content=b"\n".join(rows), headers=headers
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported_sessions"] == 1
+    assert "utf-8" in report["stopped"]
+    assert client.get("/stats/location/1").json()["total_climbs"] == 1
+
+    # Nothing inserted yet: the whole upload is rejected
+    response = client.post(
+        "/sessions/import", content=b"\n".join(rows[:1] + rows[3:]), headers=headers
+    )
+    assert response.status_code == 400
+    assert len(client.get("/sessions", headers=headers).json()) == 1
+
+
+def test_import_sessions_ndjson(client, auth_token):
+    lines = [
+        {"location_id": 1, "date": "2024-02-01", "problems": [{"grade": "V0"}]},
+        {"location_id": 1, "date": "2024-02-02", "rating": 11},
+        {"location_id": 1, "date": "2024-02-03"},
+    ]
+    response = client.post(
+        "/sessions/import",
+        content="\n".join(json.dumps(line) for line in lines),
+        headers={
+            "Authorization": f"Bearer {auth_token}",
+            "Content-Type": "application/x-ndjson",
+        },
+    )
+    report = response.json()
+    assert report["imported_sessions"] == 2
+    assert report["errors"] == [
+        {"row": 2, "errors": ["rating: Input should be less than or equal to 10"]}
+    ]
+
+
+def test_import_sessions_rejects_bad_input(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = client.post(
+        "/sessions/import",
+        content="date,grade\n2024-01-01,V0",
+        headers={**headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 400
+    assert "location_id" in response.json()["detail"]
+
+    response = client.post(
+        "/sessions/import",
+        content="{}",
+        headers={**headers, "Content-Type": "application/json"},
+    )
+    assert response.status_code == 415
+
+
+def test_create_session_statement_count_is_constant(client, auth_token, test_engine):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    def create(problem_count):
+        return client.post(
+            "/sessions",
+            json={
+                "location_id": 1,
+                "date": str(date.today()),
+                "problems": [{"grade": "V0", "attempts": 2, "sends": 1}]
+                * problem_count,
+            },
+            headers=headers,
+        )
+
+    create(1)  # warm the identity and location caches
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(test_engine, "before_cursor_execute", record)
+    try:
+        one = create(1)
+        before = len(statements)
+        many = create(25)
+    finally:
+        event.remove(test_engine, "before_cursor_execute", record)
+
+    assert len(statements) - before == before
+    assert len(many.json()["problems"]) == 25
+    assert [p["id"] for p in many.json()["problems"]] == sorted(
+        p["id"] for p in many.json()["problems"]
+    )
+    assert one.json()["location_name"] == "Test Gym"
+    fetched = client.get(f"/sessions/{many.json()['id']}", headers=headers).json()
+    assert fetched == many.json()
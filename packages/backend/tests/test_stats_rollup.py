@@ -0,0 +1,171 @@
+from datetime import date, timedelta
+
+from src import crud
+from src.models import DailyGradeRollup
+
+
+def rollup_rows(db):
+    return sorted(
+        (
+            row.location_id,
+            row.date,
+            row.grade,
+            row.sends,
+            row.attempts,
+        )
+        for row in db.query(DailyGradeRollup).all()
+    )
+
+
+def assert_rollup_consistent(TestingSessionLocal):
+    db = TestingSessionLocal()
+    try:
+        maintained = rollup_rows(db)
+        crud.rebuild_daily_grade_rollup(db)
+        assert rollup_rows(db) == maintained
+        return maintained
+    finally:
+        db.close()
+
+
+def test_rollup_tracks_session_writes(client, auth_headers, TestingSessionLocal):
+    today = date.today()
+    response = client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": str(today),
+            "problems": [
+                {"grade": "V3", "attempts": 3, "sends": 2},
+                {"grade": "V3", "attempts": 2, "sends": 1},
+                {"grade": "VB", "attempts": 1, "sends": 1},
+            ],
+        },
+        headers=auth_headers,
+    )
+    session_id = response.json()["id"]
+    client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": str(today),
+            "problems": [{"grade": "V3", "attempts": 1, "sends": 0}],
+        },
+        headers=auth_headers,
+    )
+
+    assert assert_rollup_consistent(TestingSessionLocal) == [
+        (1, today, "V3", 3, 6),
+        (1, today, "VB", 1, 1),
+    ]
+
+    yesterday = today - timedelta(days=1)
+    client.put(
+        f"/sessions/{session_id}", json={"date": str(yesterday)}, headers=auth_headers
+    )
+    rows = assert_rollup_consistent(TestingSessionLocal)
+    assert (1, yesterday, "V3", 3, 5) in rows
+    assert (1, today, "V3", 0, 1) in rows
+
+    client.delete(f"/sessions/{session_id}", headers=auth_headers)
+    assert assert_rollup_consistent(TestingSessionLocal) == [(1, today, "V3", 0, 1)]
+
+
+def test_rollup_tracks_problem_writes(client, auth_headers, TestingSessionLocal):
+    today = date.today()
+    session_id = client.post(
+        "/sessions",
+        json={"location_id": 1, "date": str(today), "problems": []},
+        headers=auth_headers,
+    ).json()["id"]
+    assert assert_rollup_consistent(TestingSessionLocal) == []
+
+    problem_id = client.post(
+        f"/sessions/{session_id}/problems",
+        json={"grade": "V3", "attempts": 2, "sends": 1},
+        headers=auth_headers,
+    ).json()["id"]
+    client.put(
+        f"/sessions/problems/{problem_id}",
+        json={"grade": "V0", "sends": 2},
+        headers=auth_headers,
+    )
+    assert assert_rollup_consistent(TestingSessionLocal) == [(1, today, "V0", 2, 2)]
+    assert client.get("/stats/location/1").json() == {
+        "total_climbs": 2,
+        "grade_distribution": {"V0": 2},
+    }
+
+    client.delete(f"/sessions/problems/{problem_id}", headers=auth_headers)
+    assert assert_rollup_consistent(TestingSessionLocal) == []
+    assert client.get("/stats/aggregate").json()["by_location"][0]["count"] == 1
+
+
+def test_rollup_tracks_increments(client, auth_headers, TestingSessionLocal):
+    today = date.today()
+    problem_id = client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": str(today),
+            "problems": [
+                {"grade": "V3", "attempts": 2, "sends": 1},
+                {"grade": "V3", "attempts": 1, "sends": 0},
+            ],
+        },
+        headers=auth_headers,
+    ).json()["problems"][0]["id"]
+    assert client.get("/stats/location/1").json()["total_climbs"] == 3
+
+    client.post(
+        f"/sessions/problems/{problem_id}/increment",
+        json={"attempts": 3, "sends": 1},
+        headers=auth_headers,
+    )
+    assert assert_rollup_consistent(TestingSessionLocal) == [(1, today, "V3", 2, 6)]
+    # The cached stats were invalidated
+    assert client.get("/stats/location/1").json()["total_climbs"] == 6
+
+
+def test_ensure_rollup_backfills_empty_table(client, auth_headers, TestingSessionLocal):
+    client.post(
+        "/sessions",
+        json={
+            "location_id": 1,
+            "date": str(date.today()),
+            "problems": [{"grade": "V3", "attempts": 3, "sends": 2}],
+        },
+        headers=auth_headers,
+    )
+
+    db = TestingSessionLocal()
+    try:
+        db.query(DailyGradeRollup).delete()
+        db.commit()
+        crud.ensure_daily_grade_rollup(db)
+        assert len(rollup_rows(db)) == 1
+    finally:
+        db.close()
+
+
+def test_rollup_refresh_batches_many_buckets(
+    client, auth_headers, TestingSessionLocal, monkeypatch
+):
+    # One chunk touching more (location, date) buckets than one SQLite
+    # expression can hold
+    monkeypatch.setattr("src.config.settings.import_chunk_size", 5000)
+    start = date(2020, 1, 1)
+    rows = [
+        f"{start + timedelta(days=day)},1,,V3,2,1,"
+        for day in range(crud._BUCKETS_PER_STATEMENT * 2 + 200)
+    ]
+    response = client.post(
+        "/sessions/import",
+        content="\n".join(
+            ["date,location_id,rating,grade,attempts,sends,notes", *rows]
+        ),
+        headers=auth_headers | {"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    assert response.json()["imported_sessions"] == len(rows)
+    assert len(assert_rollup_consistent(TestingSessionLocal)) == len(rows)
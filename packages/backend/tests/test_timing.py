@@ -0,0 +1,88 @@
+import logging
+import re
+from datetime import date
+
+import pytest
+
+from src.config import Settings, settings
+from src.timing import instrument_engine, request_stats
+
+
+@pytest.fixture(scope="module", autouse=True)
+def instrumented(test_engine):
+    # The app's own engines are instrumented in src.database; the tests
+    # swap in their own
+    instrument_engine(test_engine)
+
+
+@pytest.fixture(autouse=True)
+def server_timing_header(monkeypatch):
+    monkeypatch.setattr(settings, "server_timing_header", True)
+
+
+def server_timing(response) -> dict[str, str]:
+    return {
+        entry.split(";")[0].strip(): entry
+        for entry in response.headers["server-timing"].split(",")
+    }
+
+
+def statements(response) -> int:
+    return int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"])[1])
+
+
+def log_sessions(client, headers, count):
+    for _ in range(count):
+        client.post(
+            "/sessions",
+            json={
+                "location_id": 1,
+                "date": str(date.today()),
+                "problems": [{"grade": "V3", "attempts": 2, "sends": 1}],
+            },
+            headers=headers,
+        )
+
+
+def test_server_timing_header_has_all_phases(client, auth_headers):
+    response = client.get("/sessions", headers=auth_headers)
+    assert response.status_code == 200
+    entries = server_timing(response)
+    assert list(entries) == ["db", "auth", "serialize", "total"]
+    assert all(re.search(r"dur=\d+\.\d", entry) for entry in entries.values())
+    assert statements(response) > 0
+
+
+def test_statement_count_does_not_grow_with_sessions(client, auth_headers):
+    log_sessions(client, auth_headers, 1)
+    one = statements(client.get("/sessions", headers=auth_headers))
+    log_sessions(client, auth_headers, 5)
+    six = statements(client.get("/sessions", headers=auth_headers))
+    assert six == one
+
+
+def test_header_is_off_by_default(client, monkeypatch):
+    assert Settings.model_fields["server_timing_header"].default is False
+    monkeypatch.setattr(settings, "server_timing_header", False)
+    response = client.post(
+        "/auth/login", data={"username": "nobody", "password": "wrong"}
+    )
+    assert "server-timing" not in response.headers
+
+
+def test_requests_over_statement_budget_log_a_warning(
+    client, auth_headers, caplog, monkeypatch
+):
+    monkeypatch.setattr(settings, "request_statement_warning", 0)
+    with caplog.at_level(logging.WARNING, logger="src.timing"):
+        client.get("/sessions", headers=auth_headers)
+    [record] = [r for r in caplog.records if r.name == "src.timing"]
+    assert record.path == "/sessions"
+    assert record.statements > 0
+    assert "statements=" in record.getMessage()
+
+
+def test_requests_are_counted_in_metrics(client):
+    before = request_stats.stats()["statements"]["count"]
+    client.get("/locations")
+    assert request_stats.stats()["statements"]["count"] == before + 1
@@ -0,0 +1,97 @@
+from datetime import date
+
+import pytest
+
+from src import crud
+from src.models import Session as SessionModel
+from src.schemas import ProblemCreate, SessionCreate
+from src.schemas import Session as SessionSchema
+from src.write_pipeline import WritePipeline, write_pipeline
+
+
+def session_data(grade="V3"):
+    return SessionCreate(
+        location_id=1,
+        date=date.today(),
+        problems=[ProblemCreate(grade=grade, attempts=2, sends=1)],
+    )
+
+
+def fail(db, *args):
+    db.add(SessionModel(user_id=1, location_id=1, date=date.today()))
+    db.flush()
+    raise RuntimeError("boom")
+
+
+def test_queued_writes_commit_as_one_batch(client, auth_headers, TestingSessionLocal):
+    pipeline = WritePipeline(TestingSessionLocal, max_batch=64, max_delay_ms=20)
+    # Queue before starting so the first batch deterministically takes all
+    futures = [
+        pipeline.submit(crud.create_session, session_data(), 1, schema=SessionSchema)
+        for _ in range(5)
+    ]
+    pipeline.start()
+    results = [future.result(timeout=5) for future in futures]
+    pipeline.stop()
+
+    assert len({result.id for result in results}) == 5
+    assert results[0].location_name == "Test Gym"
+    stats = pipeline.stats()
+    assert stats["batch_size"]["count"] == 1
+    assert stats["batch_size"]["sum"] == 5
+
+    # Cache invalidation ran after the commit
+    aggregate = client.get("/stats/aggregate").json()
+    assert aggregate["by_location"][0]["count"] == 5
+
+
+def test_failing_job_only_fails_its_caller(client, auth_headers, TestingSessionLocal):
+    pipeline = WritePipeline(TestingSessionLocal, max_batch=64, max_delay_ms=20)
+    first = pipeline.submit(crud.create_session, session_data("V0"), 1)
+    bad = pipeline.submit(fail)
+    last = pipeline.submit(crud.create_session, session_data("VB"), 1)
+    pipeline.start()
+
+    with pytest.raises(RuntimeError, match="boom"):
+        bad.result(timeout=5)
+    assert first.result(timeout=5) is not None
+    assert last.result(timeout=5) is not None
+    pipeline.stop()
+
+    assert pipeline.stats()["retries"] == 1
+    db = TestingSessionLocal()
+    assert db.query(SessionModel).count() == 2
+    db.close()
+
+
+def test_routes_write_through_pipeline(
+    client, auth_headers, TestingSessionLocal, monkeypatch
+):
+    monkeypatch.setattr(write_pipeline, "session_factory", TestingSessionLocal)
+    write_pipeline.start()
+    try:
+        response = client.post(
+            "/sessions",
+            json={
+                "location_id": 1,
+                "date": str(date.today()),
+                "problems": [{"grade": "V3", "attempts": 3, "sends": 2}],
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == 201
+        problem_id = response.json()["problems"][0]["id"]
+
+        response = client.put(
+            f"/sessions/problems/{problem_id}", json={"sends": 3}, headers=auth_headers
+        )
+        assert response.json()["sends"] == 3
+
+        response = client.put(
+            "/sessions/problems/999", json={"sends": 3}, headers=auth_headers
+        )
+        assert response.status_code == 404
+    finally:
+        write_pipeline.stop()
+
+    assert write_pipeline.stats()["batch_size"]["sum"] >= 3